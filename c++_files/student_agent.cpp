@@ -6,7 +6,23 @@
 #include <random>
 #include <algorithm>
 #include <climits>
+#include <limits>
 #include <iostream>
+#include <optional>
+#include <cstdint>
+#include <atomic>
+#include <mutex>
+#include <thread>
+#include <memory>
+#include <chrono>
+#include <cmath>
+#include <cstring>
+#ifndef _WIN32
+#include <fcntl.h>
+#include <sys/mman.h>
+#include <sys/stat.h>
+#include <unistd.h>
+#endif
 
 namespace py = pybind11;
 
@@ -53,12 +69,388 @@ struct MinMaxNode {
 };
 
 
+// ---- Zobrist hashing ----
+// Keys come from splitmix64 so that they are identical on every build and can be
+// reproduced outside of C++. A piece kind is owner*3 + shape with
+// owner: circle=0, square=1 and shape: stone=0, horizontal river=1, vertical river=2.
+static inline uint64_t splitmix64(uint64_t x) {
+    x += 0x9E3779B97F4A7C15ULL;
+    uint64_t z = x;
+    z = (z ^ (z >> 30)) * 0xBF58476D1CE4E5B9ULL;
+    z = (z ^ (z >> 27)) * 0x94D049BB133111EBULL;
+    return z ^ (z >> 31);
+}
+
+static const uint64_t SIDE_TO_MOVE_KEY = splitmix64(0xFFFFFFFFULL);
+
+static uint64_t position_hash(
+    const std::vector<std::vector<std::map<std::string, std::string>>>& board
+) {
+    const int rows = (int)board.size();
+    const int cols = rows ? (int)board[0].size() : 0;
+    uint64_t h = splitmix64(((uint64_t)rows << 16) | (uint64_t)cols);
+    for (int y = 0; y < rows; ++y) {
+        for (int x = 0; x < cols; ++x) {
+            const auto& cell = board[y][x];
+            if (cell.empty()) continue;
+            auto owner = cell.find("owner");
+            auto side = cell.find("side");
+            auto orientation = cell.find("orientation");
+            int kind = (owner != cell.end() && owner->second == "square") ? 3 : 0;
+            if (side != cell.end() && side->second == "river") {
+                kind += (orientation != cell.end() && orientation->second == "vertical") ? 2 : 1;
+            }
+            h ^= splitmix64(((uint64_t)(y * cols + x) << 3) | (uint64_t)kind);
+        }
+    }
+    return h;
+}
+
+
+// ---- Opening book ----
+// Reader for the book files written by client_server/opening_book.py. The file is
+// memory-mapped and probed by binary search over fixed-size records:
+//   header : "RSOB", version u16, score width u8, win count u8, count u32
+//   record : hash u64, colour u8, action u8, fx fy tx ty px py i8, orientation u8, pad u8, weight u16
+// Records are sorted by (hash, colour), so all candidates of a position are adjacent.
+// The hash covers only the pieces, so a book built for another scoring geometry is
+// refused (version 1 books have none and were built for width 4, win count 4).
+class OpeningBook {
+public:
+    OpeningBook() = default;
+    OpeningBook(const OpeningBook&) = delete;
+    OpeningBook& operator=(const OpeningBook&) = delete;
+    ~OpeningBook() { close(); }
+
+    bool open(const std::string& path, int scoreWidth, int winCount) {
+        close();
+#ifndef _WIN32
+        int fd = ::open(path.c_str(), O_RDONLY);
+        if (fd < 0) return false;
+        struct stat st;
+        if (fstat(fd, &st) != 0 || (size_t)st.st_size < HEADER_SIZE) { ::close(fd); return false; }
+        void* p = mmap(nullptr, (size_t)st.st_size, PROT_READ, MAP_PRIVATE, fd, 0);
+        ::close(fd);
+        if (p == MAP_FAILED) return false;
+        data = static_cast<const unsigned char*>(p);
+        size = (size_t)st.st_size;
+
+        uint16_t version;
+        uint32_t n;
+        std::memcpy(&version, data + 4, sizeof(version));
+        std::memcpy(&n, data + 8, sizeof(n));
+        const int width = version == 1 ? 4 : data[6], wins = version == 1 ? 4 : data[7];
+        if (std::memcmp(data, "RSOB", 4) != 0 || (version != 1 && version != 2)
+            || HEADER_SIZE + (size_t)n * RECORD_SIZE > size || width != scoreWidth || wins != winCount) {
+            close();
+            return false;
+        }
+        count = n;
+        return true;
+#else
+        (void)path; (void)scoreWidth; (void)winCount;
+        return false;
+#endif
+    }
+
+    void close() {
+#ifndef _WIN32
+        if (data) munmap(const_cast<unsigned char*>(data), size);
+#endif
+        data = nullptr; size = 0; count = 0;
+    }
+
+    bool loaded() const { return data != nullptr; }
+
+    // Candidate moves (with weights) for the position, best first.
+    std::vector<std::pair<Move,int>> probe(uint64_t hash, const std::string& colour) const {
+        std::vector<std::pair<Move,int>> out;
+        if (!data) return out;
+        const uint8_t c = (colour == "square") ? 1 : 0;
+        size_t lo = 0, hi = count;
+        while (lo < hi) {
+            size_t mid = (lo + hi) / 2;
+            if (key_less(mid, hash, c)) lo = mid + 1; else hi = mid;
+        }
+        static const char* ACTIONS[] = {"move", "push", "flip", "rotate"};
+        static const char* ORIENTATIONS[] = {"", "horizontal", "vertical"};
+        for (size_t i = lo; i < count; ++i) {
+            const unsigned char* r = data + HEADER_SIZE + i * RECORD_SIZE;
+            uint64_t h;
+            std::memcpy(&h, r, sizeof(h));
+            if (h != hash || r[8] != c) break;
+            const int8_t* f = reinterpret_cast<const int8_t*>(r + 10);
+            const uint8_t action = r[9] < 4 ? r[9] : 0;
+            const uint8_t ori = r[16] < 3 ? r[16] : 0;
+            uint16_t weight;
+            std::memcpy(&weight, r + 18, sizeof(weight));
+            Move m{ACTIONS[action], {f[0], f[1]}, {f[2], f[3]}, {}, ORIENTATIONS[ori]};
+            if (action >= 2) m.to = m.from;              // flips/rotates carry to == from
+            if (action == 1) m.pushed_to = {f[4], f[5]};
+            out.push_back({m, (int)weight});
+        }
+        return out;
+    }
+
+private:
+    static constexpr size_t HEADER_SIZE = 12;
+    static constexpr size_t RECORD_SIZE = 20;
+    const unsigned char* data = nullptr;
+    size_t size = 0;
+    size_t count = 0;
+
+    bool key_less(size_t i, uint64_t hash, uint8_t colour) const {
+        const unsigned char* r = data + HEADER_SIZE + i * RECORD_SIZE;
+        uint64_t h;
+        std::memcpy(&h, r, sizeof(h));
+        return h < hash || (h == hash && r[8] < colour);
+    }
+};
+
+
+// ---- Shared lock-free transposition table ----
+// Each slot stores (key ^ data, data) in two relaxed atomics. A torn write from a
+// concurrent store makes the xor check fail, so a reader never trusts a half-written
+// entry and no locking is needed between search threads.
+class TranspositionTable {
+public:
+    enum Bound : uint64_t { EXACT = 0, LOWER = 1, UPPER = 2 };
+
+    explicit TranspositionTable(size_t log2_entries = 20)
+        : mask((size_t(1) << log2_entries) - 1),
+          slots(new Slot[size_t(1) << log2_entries]) {}
+
+    bool probe(uint64_t key, int& value, int& depth, Bound& bound) const {
+        const Slot& s = slots[key & mask];
+        uint64_t data = s.data.load(std::memory_order_relaxed);
+        uint64_t check = s.check.load(std::memory_order_relaxed);
+        if ((check ^ data) != key) return false;
+        value = (int32_t)(uint32_t)(data & 0xFFFFFFFFULL);
+        depth = (int)((data >> 32) & 0xFF);
+        bound = (Bound)((data >> 40) & 0x3);
+        return true;
+    }
+
+    void store(uint64_t key, int value, int depth, Bound bound) {
+        Slot& s = slots[key & mask];
+        uint64_t data = (uint64_t)(uint32_t)value
+                      | ((uint64_t)(depth & 0xFF) << 32)
+                      | ((uint64_t)bound << 40);
+        s.data.store(data, std::memory_order_relaxed);
+        s.check.store(key ^ data, std::memory_order_relaxed);
+    }
+
+private:
+    struct Slot {
+        std::atomic<uint64_t> check{0};
+        std::atomic<uint64_t> data{0};
+    };
+    size_t mask;
+    std::unique_ptr<Slot[]> slots;
+};
+
+
+// ---- Move ordering ----
+// Killer, history/butterfly and counter-move tables, as in client_server/ordering.py.
+// History is keyed by (action, from-cell, to-cell) and ranks moves by
+// history / butterfly. A dense table would need 4 * cells^2 entries (67M on 64x64)
+// and be walked on every aging, so the tables are hashed into TABLE_SLOTS slots
+// instead, like the dicts of the Python side holding only the moves searched.
+// All entries are relaxed atomics shared by the root threads: a lost update or two
+// moves sharing a slot only costs ordering quality.
+class MoveOrdering {
+public:
+    static constexpr int MAX_PLY = 64;
+    static constexpr int KILLER_SLOTS = 2;
+    static constexpr size_t TABLE_SLOTS = 1 << 16;   // power of two
+
+    MoveOrdering()
+        : history_(new std::atomic<int>[TABLE_SLOTS]), butterfly_(new std::atomic<int>[TABLE_SLOTS]),
+          counters_(new std::atomic<uint64_t>[TABLE_SLOTS]) { clear(); }
+
+    void resize(int rows, int cols) {
+        if (rows == rows_ && cols == cols_) return;
+        rows_ = rows; cols_ = cols;
+        clear();
+    }
+
+    void clear() {
+        for (size_t i = 0; i < TABLE_SLOTS; ++i) { history_[i] = 0; butterfly_[i] = 0; counters_[i] = 0; }
+        for (auto& ply : killers_) for (auto& k : ply) k = 0;
+    }
+
+    // Halve history and drop killers before a new search
+    void new_search() {
+        for (size_t i = 0; i < TABLE_SLOTS; ++i) {
+            history_[i].store(history_[i].load(std::memory_order_relaxed) / 2, std::memory_order_relaxed);
+            butterfly_[i].store(butterfly_[i].load(std::memory_order_relaxed) / 2, std::memory_order_relaxed);
+        }
+        for (auto& ply : killers_) for (auto& k : ply) k = 0;
+    }
+
+    // (action, from-cell, to-cell); flips and rotates use their own cell as target
+    size_t index(const Move& m) const {
+        const size_t cells = (size_t)rows_ * cols_;
+        const int action = m.action == "move" ? 0 : m.action == "push" ? 1 : m.action == "flip" ? 2 : 3;
+        const auto& to = m.to.size() == 2 ? m.to : m.from;
+        return (action * cells + (size_t)(m.from[1] * cols_ + m.from[0])) * cells + (size_t)(to[1] * cols_ + to[0]);
+    }
+
+    // Full identity of a move (index plus pushed_to and orientation); 0 means none
+    uint64_t code(const Move& m) const {
+        const uint64_t pushed = m.pushed_to.size() == 2 ? (uint64_t)(m.pushed_to[1] * cols_ + m.pushed_to[0]) + 1 : 0;
+        const uint64_t ori = m.orientation == "horizontal" ? 1 : m.orientation == "vertical" ? 2 : 0;
+        return (1ULL << 63) | ((uint64_t)index(m) << 20) | (pushed << 2) | ori;
+    }
+
+    // Higher is searched earlier: killers, then the counter move, then relative history
+    int64_t score(const Move& m, int ply, uint64_t previous) const {
+        const uint64_t c = code(m);
+        if (ply < MAX_PLY) {
+            for (int k = 0; k < KILLER_SLOTS; ++k)
+                if (killers_[ply][k].load(std::memory_order_relaxed) == c) return (1LL << 40) - k;
+        }
+        if (previous && counters_[slot(previous_index(previous))].load(std::memory_order_relaxed) == c) return 1LL << 39;
+        const size_t i = slot(index(m));
+        return (int64_t)history_[i].load(std::memory_order_relaxed) * 1024
+             / (1 + butterfly_[i].load(std::memory_order_relaxed));
+    }
+
+    void order(std::vector<Move>& moves, int ply, uint64_t previous) const {
+        std::vector<std::pair<int64_t, size_t>> keyed(moves.size());
+        for (size_t i = 0; i < moves.size(); ++i) keyed[i] = { score(moves[i], ply, previous), i };
+        std::stable_sort(keyed.begin(), keyed.end(), [](const auto& a, const auto& b){ return a.first > b.first; });
+        std::vector<Move> sorted;
+        sorted.reserve(moves.size());
+        for (const auto& k : keyed) sorted.push_back(std::move(moves[k.second]));
+        moves.swap(sorted);
+    }
+
+    void searched(const Move& m) { butterfly_[slot(index(m))].fetch_add(1, std::memory_order_relaxed); }
+
+    void cutoff(const Move& m, int ply, int depth, uint64_t previous) {
+        history_[slot(index(m))].fetch_add(depth * depth, std::memory_order_relaxed);
+        const uint64_t c = code(m);
+        if (ply < MAX_PLY && killers_[ply][0].load(std::memory_order_relaxed) != c) {
+            killers_[ply][1].store(killers_[ply][0].load(std::memory_order_relaxed), std::memory_order_relaxed);
+            killers_[ply][0].store(c, std::memory_order_relaxed);
+        }
+        if (previous) counters_[slot(previous_index(previous))].store(c, std::memory_order_relaxed);
+    }
+
+private:
+    int rows_ = 0, cols_ = 0;
+    std::unique_ptr<std::atomic<int>[]> history_, butterfly_;
+    std::unique_ptr<std::atomic<uint64_t>[]> counters_;
+    std::atomic<uint64_t> killers_[MAX_PLY][KILLER_SLOTS] = {};
+
+    static size_t previous_index(uint64_t code) { return (size_t)((code & ~(1ULL << 63)) >> 20); }
+    static size_t slot(size_t index) { return (size_t)splitmix64(index) & (TABLE_SLOTS - 1); }
+};
+
+
+// ---- Time management ----
+// Same budget as client_server/timeman.py: the remaining time spread over the moves
+// expected to remain (never fewer than a share of those left before the turn cap), plus
+// part of any lead on the opponent, scaled by position complexity. No iteration starts
+// that is not expected to finish before the soft limit; search aborts at the hard one.
+// Inside the reserve (a fixed part plus a per-move overhead for every move still
+// possible) both limits are zero and the move is played instantly.
+class TimeManager {
+public:
+    using Clock = std::chrono::steady_clock;
+
+    int movesToGo = 60;
+    int minMovesToGo = 20;
+    double reserve = 0.5;
+    double maxFraction = 0.25;
+    double hardFactor = 2.0;
+    int typicalMoves = 60;
+    double threatFactor = 1.5;
+    double minTime = 0.01;
+    double deepenFraction = 0.5;
+    int maxPlies = 1000;
+    double capFraction = 0.25;
+    double moveOverhead = 0.005;
+    double growth = 4.0;
+
+    void start(double current_player_time, double opponent_time, int legal_moves, bool threat) {
+        movesMade++;
+        // Own moves still to play if the game runs to the turn cap, this one included
+        const int movesToCap = std::max(1, maxPlies / 2 - movesMade + 1);
+        const double usable = current_player_time - reserve - moveOverhead * movesToCap;
+        if (usable <= 0) { set(0.0, 0.0); return; }
+        if (legal_moves <= 1) { set(std::min(minTime, usable), std::min(minTime, usable)); return; }
+
+        const int expected = std::max({minMovesToGo, movesToGo - movesMade / 2, (int)(movesToCap * capFraction)});
+        const int movesLeft = std::max(1, std::min(movesToCap, expected));
+        double soft = usable / movesLeft;
+        if (current_player_time > opponent_time)
+            soft += (current_player_time - opponent_time) / (2.0 * movesLeft);
+        soft *= std::min(1.5, std::max(0.6, std::sqrt((double)legal_moves / typicalMoves)));
+        if (threat) soft *= threatFactor;
+
+        const double hard = std::min(soft * hardFactor, usable * maxFraction);
+        soft = std::max(std::min(soft, hard), std::min(minTime, usable));
+        set(soft, std::max(hard, soft));
+    }
+
+    bool should_stop() const { return Clock::now() >= hardDeadline; }
+    bool soft_expired() const { return Clock::now() >= softDeadline; }
+    void iteration_done() { iterations.push_back(elapsed()); }
+    // Whether the next iteration, predicted from the last one and the growth between the
+    // last two, finishes before the soft limit
+    bool can_deepen() const {
+        const double now = elapsed();
+        const size_t n = iterations.size();
+        if (n == 0) return now < softLimit * deepenFraction;
+        const double last = iterations[n - 1] - (n > 1 ? iterations[n - 2] : 0.0);
+        const double before = n > 1 ? iterations[n - 2] - (n > 2 ? iterations[n - 3] : 0.0) : 0.0;
+        const double g = before > 1e-3 ? std::max(1.0, last / before) : growth;
+        return now + last * g < softLimit;
+    }
+    double elapsed() const { return std::chrono::duration<double>(Clock::now() - started).count(); }
+    double soft_limit() const { return softLimit; }
+    double hard_limit() const { return hardLimit; }
+
+private:
+    int movesMade = 0;
+    double softLimit = 0.0, hardLimit = 0.0;
+    std::vector<double> iterations;   // elapsed() at the end of each completed iteration
+    Clock::time_point started{}, softDeadline{}, hardDeadline{};
+
+    void set(double soft, double hard) {
+        softLimit = soft; hardLimit = hard;
+        iterations.clear();
+        const auto now = started = Clock::now();
+        softDeadline = now + std::chrono::duration_cast<Clock::duration>(std::chrono::duration<double>(soft));
+        hardDeadline = now + std::chrono::duration_cast<Clock::duration>(std::chrono::duration<double>(hard));
+    }
+};
+
+
 // ---- Student Agent ----
 class StudentAgent {
     private:
         int movesCount = 0;
 public:
-    explicit StudentAgent(std::string side) : side(std::move(side)), gen(rd()) {}
+    explicit StudentAgent(std::string side, int threads = 0)
+        : side(std::move(side)), gen(rd()), tt(std::make_unique<TranspositionTable>()) {
+        set_threads(threads);
+    }
+
+    // Number of search threads; 0 or less means one per hardware thread.
+    void set_threads(int n) {
+        if (n <= 0) n = (int)std::thread::hardware_concurrency();
+        numThreads = std::max(1, n);
+    }
+    int get_threads() const { return numThreads; }
+
+    // Memory-map an opening book written by opening_book.py; returns false if it cannot be
+    // read or was built for another scoring geometry than (score_width, win_count).
+    bool load_opening_book(const std::string& path, int score_width, int win_count) {
+        return book.open(path, score_width, win_count);
+    }
 
     Move choose(const std::vector<std::vector<std::map<std::string, std::string>>>& board, int row, int col, const std::vector<int>& score_cols, float current_player_time, float opponent_time) {
         int rows = board.size();
@@ -72,13 +464,29 @@ public:
         const int alpha = INT_MIN;
         const int beta = INT_MAX;
         
-        // time constraint, MOve Strategy
-        constexpr float TOTAL_TIME = 60.0f;
-        constexpr float MINMAX_TIME_LIMIT = 0.7f * TOTAL_TIME;
+        // Per-move deadlines from the clocks; see TimeManager
+        auto legal = generate_all_possible_moves(board, me, my_score_cols, opp_score_cols);
+        const std::string opp = (me == "circle" ? "square" : "circle");
+        const bool threat = stonesHome(board, me, score_cols) >= 2 || stonesHome(board, opp, score_cols) >= 2;
+        timer.start(current_player_time, opponent_time, (int)legal.size(), threat);
+        if (timer.hard_limit() <= 0 && !legal.empty()) {   // no time left to search
+            movesCount++;
+            return legal.front();
+        }
 
-        //Set the DePTH based on the time left
-        const int DEPTH = current_player_time < 0.4f * TOTAL_TIME ? 3 : current_player_time < 0.6f * TOTAL_TIME ? 2 : 1;
 
+        if (book.loaded()) {
+            auto candidates = book.probe(position_hash(board), me);
+            int total = 0;
+            for (const auto& c : candidates) total += c.second;
+            if (total > 0) {
+                int pick = std::uniform_int_distribution<>(0, total - 1)(gen);
+                for (const auto& c : candidates) {
+                    pick -= c.second;
+                    if (pick < 0) { movesCount++; return c.first; }
+                }
+            }
+        }
 
         auto openingMove = generate_opening_move(board, me, my_score_cols, opp_score_cols);
         if (openingMove.has_value()) {
@@ -87,13 +495,21 @@ public:
             return openingMove.value();
         }
 
-        if(current_player_time > MINMAX_TIME_LIMIT && current_player_time > opponent_time) {
-            auto result = minMaxWithAlphaBeta(board, DEPTH, alpha, beta, me, me, my_score_cols, opp_score_cols);
-            if (!result.bestMove.action.empty()) {
-                //std::cout<<"MovesCount="<<movesCount<<" MinMax MOve played="<<std::endl;
-                movesCount++;
-                return result.bestMove;
-            }
+        // Iterative deepening; an iteration cut short by the hard deadline is discarded
+        stopSearch.store(false);
+        ordering.resize(rows, cols);
+        ordering.new_search();
+        MinMaxNode best{ std::numeric_limits<int>::min(), {} };
+        for (int depth = 1; depth <= MAX_DEPTH; ++depth) {
+            if (depth > 1 && !timer.can_deepen()) break;
+            auto result = searchRootParallel(board, depth, alpha, beta, me, my_score_cols, opp_score_cols);
+            if (stopSearch.load()) break;
+            timer.iteration_done();
+            if (!result.bestMove.action.empty()) best = result;
+        }
+        if (!best.bestMove.action.empty()) {
+            movesCount++;
+            return best.bestMove;
         }
 
         auto moves = generate_all_possible_moves(board, side, score_cols, score_cols);
@@ -108,6 +524,37 @@ private:
     std::string side;
     std::random_device rd;
     std::mt19937 gen;
+    int numThreads = 1;
+    std::unique_ptr<TranspositionTable> tt;
+    OpeningBook book;
+    TimeManager timer;
+    MoveOrdering ordering;
+    std::atomic<bool> stopSearch{false};
+    static constexpr int MAX_DEPTH = 32;
+
+    // True once the hard deadline has passed; latched so every thread sees it.
+    bool timeUp() {
+        if (stopSearch.load(std::memory_order_relaxed)) return true;
+        if (timer.should_stop()) { stopSearch.store(true); return true; }
+        return false;
+    }
+
+    // Stones of `owner` on its scoring row within the scoring columns, as the engine counts them
+    static int stonesHome(
+        const std::vector<std::vector<std::map<std::string, std::string>>>& board,
+        const std::string& owner,
+        const std::vector<int>& score_cols
+    ) {
+        const int rows = (int)board.size();
+        const int y = (owner == "circle") ? 2 : rows - 3;
+        if (y < 0 || y >= rows) return 0;
+        int count = 0;
+        for (int x : score_cols) {
+            if (x >= 0 && x < (int)board[y].size() && owner_at(board, x, y) == owner && is_stone(board, x, y))
+                count++;
+        }
+        return count;
+    }
 
 
     //Helper Functions
@@ -660,18 +1107,98 @@ private:
         });
     }
 
+    // Root splitting: root moves are handed out to worker threads through an atomic
+    // index. Every worker searches its subtree with the best root value found so far
+    // as alpha, and all of them share the transposition table.
+    MinMaxNode searchRootParallel(
+        const std::vector<std::vector<std::map<std::string, std::string>>>& board,
+        int depth, int alpha, int beta,
+        const std::string& me,
+        const std::vector<int>& my_score_cols,
+        const std::vector<int>& opp_score_cols
+    ) {
+        const std::string opp = (me=="circle" ? "square" : "circle");
+        auto moves = generate_all_possible_moves(board, me, my_score_cols, opp_score_cols);
+        if (moves.empty() || depth <= 0) {
+            return { evaluate(board, me, my_score_cols, opp_score_cols), {} };
+        }
+        order_moves(moves);
+        ordering.order(moves, 0, 0);
+
+        MinMaxNode bestNode{ std::numeric_limits<int>::min(), {} };
+        size_t bestIndex = moves.size();
+        std::atomic<int> sharedAlpha{alpha};
+        std::atomic<size_t> next{0};
+        std::mutex bestMutex;
+
+        auto worker = [&]() {
+            while (true) {
+                const size_t i = next.fetch_add(1);
+                if (i >= moves.size() || timeUp()) return;
+                const int a = sharedAlpha.load();
+                if (a >= beta) return;
+                auto newBoard = apply_move(board, moves[i]);
+                auto result = minMaxWithAlphaBeta(newBoard, depth-1, a, beta, opp, me, my_score_cols, opp_score_cols,
+                                                  1, ordering.code(moves[i]));
+                // Searched with a raised alpha, a move failing low returns an upper bound, and
+                // with integer scores often exactly alpha: re-search it just below alpha so that
+                // it either proves the tie exactly or scores below it. Other fail-lows are below
+                // alpha, hence below the best score, and cannot win.
+                if (result.value == a && a > alpha && !timeUp())
+                    result = minMaxWithAlphaBeta(newBoard, depth-1, a - 1, beta, opp, me, my_score_cols, opp_score_cols,
+                                                 1, ordering.code(moves[i]));
+
+                std::lock_guard<std::mutex> lock(bestMutex);
+                // Ties (now between exact scores only) go to the earlier (better ordered)
+                // move so that the choice does not depend on thread scheduling.
+                if (result.value > bestNode.value || (result.value == bestNode.value && i < bestIndex)) {
+                    bestNode.value = result.value;
+                    bestNode.bestMove = moves[i];
+                    bestIndex = i;
+                }
+                int cur = sharedAlpha.load();
+                while (result.value > cur && !sharedAlpha.compare_exchange_weak(cur, result.value)) {}
+            }
+        };
+
+        const int n = std::min<int>(numThreads, (int)moves.size());
+        std::vector<std::thread> pool;
+        pool.reserve(n > 0 ? n - 1 : 0);
+        for (int t = 1; t < n; ++t) pool.emplace_back(worker);
+        worker();
+        for (auto& th : pool) th.join();
+        return bestNode;
+    }
+
     MinMaxNode minMaxWithAlphaBeta(
         const std::vector<std::vector<std::map<std::string, std::string>>>& board,
         int depth, int alpha, int beta,
         const std::string& side_to_move,
         const std::string& me,
         const std::vector<int>& my_score_cols,
-        const std::vector<int>& opp_score_cols
+        const std::vector<int>& opp_score_cols,
+        int ply = 1,
+        uint64_t previous = 0
     ) {
         const std::string opp = (me=="circle" ? "square" : "circle");
         if (depth == 0) {
             return { evaluate(board, me, my_score_cols, opp_score_cols), {} };
         }
+        if (timeUp()) return { 0, {} };   // the whole iteration is discarded
+
+        // Values are always from `me`'s point of view, so entries stay valid for the
+        // whole game; the side to move is folded into the key.
+        const uint64_t key = position_hash(board) ^ (side_to_move == me ? 0 : SIDE_TO_MOVE_KEY);
+        int ttValue, ttDepth;
+        TranspositionTable::Bound ttBound;
+        if (tt->probe(key, ttValue, ttDepth, ttBound) && ttDepth >= depth) {
+            if (ttBound == TranspositionTable::EXACT) return { ttValue, {} };
+            if (ttBound == TranspositionTable::LOWER) alpha = std::max(alpha, ttValue);
+            if (ttBound == TranspositionTable::UPPER) beta = std::min(beta, ttValue);
+            if (alpha >= beta) return { ttValue, {} };
+        }
+        const int alphaOrig = alpha;
+        const int betaOrig = beta;
 
         const bool myTurn = (side_to_move == me);
         const auto& cur_my_cols  = myTurn ? my_score_cols  : opp_score_cols;
@@ -682,30 +1209,41 @@ private:
             return { evaluate(board, me, my_score_cols, opp_score_cols), {} };
         }
         order_moves(moves);
+        ordering.order(moves, ply, previous);
 
+        MinMaxNode bestNode;
         if (myTurn) {
             // Max Nodes
-            MinMaxNode bestNode{ std::numeric_limits<int>::min(), {} };
+            bestNode = { std::numeric_limits<int>::min(), {} };
             for (const auto& m : moves) {
                 std::vector<std::vector<std::map<std::string, std::string>>> newBoard = apply_move(board, m);
-                auto result = minMaxWithAlphaBeta(newBoard, depth-1, alpha, beta, opp, me, my_score_cols, opp_score_cols);
+                auto result = minMaxWithAlphaBeta(newBoard, depth-1, alpha, beta, opp, me, my_score_cols, opp_score_cols,
+                                                  ply + 1, ordering.code(m));
                 if (result.value > bestNode.value) { bestNode.value = result.value; bestNode.bestMove = m; }
                 alpha = std::max(alpha, result.value);
-                if (alpha >= beta) break; // prune
+                if (alpha >= beta) { ordering.cutoff(m, ply, depth, previous); break; } // prune
+                ordering.searched(m);
             }
-            return bestNode;
         } else {
             // Min Nodes
-            MinMaxNode bestNode{ std::numeric_limits<int>::max(), {} };
+            bestNode = { std::numeric_limits<int>::max(), {} };
             for (const auto& m : moves) {
                 std::vector<std::vector<std::map<std::string, std::string>>> newBoard = apply_move(board, m);
-                auto result = minMaxWithAlphaBeta(newBoard, depth-1, alpha, beta, me, me, my_score_cols, opp_score_cols);
+                auto result = minMaxWithAlphaBeta(newBoard, depth-1, alpha, beta, me, me, my_score_cols, opp_score_cols,
+                                                  ply + 1, ordering.code(m));
                 if (result.value < bestNode.value) { bestNode.value = result.value; bestNode.bestMove = m; }
                 beta = std::min(beta, result.value);
-                if (beta <= alpha) break; // prune
+                if (beta <= alpha) { ordering.cutoff(m, ply, depth, previous); break; } // prune
+                ordering.searched(m);
             }
-            return bestNode;
         }
+
+        if (stopSearch.load(std::memory_order_relaxed)) return bestNode;   // partial results stay out of the TT
+        TranspositionTable::Bound bound = TranspositionTable::EXACT;
+        if (bestNode.value <= alphaOrig) bound = TranspositionTable::UPPER;
+        else if (bestNode.value >= betaOrig) bound = TranspositionTable::LOWER;
+        tt->store(key, bestNode.value, depth, bound);
+        return bestNode;
     }
 
 };
@@ -720,6 +1258,11 @@ PYBIND11_MODULE(student_agent_module, m) {
         .def_readonly("orientation", &Move::orientation);
 
     py::class_<StudentAgent>(m, "StudentAgent")
-        .def(py::init<std::string>())
-        .def("choose", &StudentAgent::choose);
+        .def(py::init<std::string, int>(), py::arg("side"), py::arg("threads") = 0)
+        .def("set_threads", &StudentAgent::set_threads)
+        .def("get_threads", &StudentAgent::get_threads)
+        .def("load_opening_book", &StudentAgent::load_opening_book)
+        // The board is converted to C++ types before the call, so the search itself
+        // never touches Python objects and can run without the GIL.
+        .def("choose", &StudentAgent::choose, py::call_guard<py::gil_scoped_release>());
 }
\ No newline at end of file
@@ -14,7 +14,7 @@ Game Rules Summary:
 """
 
 import random
-import copy
+from gameEngine import copy_board, PieceIndex, owned_cells, score_cols_for   # scoring columns follow --score-width
 from typing import List, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
 
@@ -25,12 +25,6 @@ def in_bounds(x: int, y: int, rows: int, cols: int) -> bool:
     """Check if coordinates are within board boundaries."""
     return 0 <= x < cols and 0 <= y < rows
 
-def score_cols_for(cols: int) -> List[int]:
-    """Get the column indices for scoring areas."""
-    w = 4
-    start = max(0, (cols - w) // 2)
-    return list(range(start, start + w))
-
 def top_score_row() -> int:
     """Get the row index for Circle's scoring area."""
     return 2
@@ -421,107 +415,141 @@ class BaseAgent(ABC):
         """
         pass
     
-    def generate_all_moves(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int]) -> List[Dict[str, Any]]:
+    def generate_all_moves(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int],
+                           pieces: Optional[PieceIndex] = None) -> List[Dict[str, Any]]:
         """
         Generate all legal moves for the current player.
         
         This is a helper method that students can use in their implementations.
+        pieces is an optional PieceIndex of the board; with it only this player's pieces are visited.
         """
         moves = []
         directions = [(1, 0), (-1, 0), (0, 1), (0, -1)]
         
-        for y in range(rows):
-            for x in range(cols):
-                piece = board[y][x]
-                if not piece or piece.owner != self.player:
-                    continue
-                
-                if piece.side == "stone":
-                    # Generate moves for stones
-                    for dx, dy in directions:
-                        nx, ny = x + dx, y + dy
-                        if not in_bounds(nx, ny, rows, cols):
-                            continue
-                        
-                        # Block destination in opponent score
-                        if is_opponent_score_cell(nx, ny, self.player, rows, cols, score_cols):
-                            continue
-                        
-                        if board[ny][nx] is None:
-                            moves.append({"action": "move", "from": [x, y], "to": [nx, ny]})
-                        else:
-                            if board[ny][nx].owner != self.player:
-                                px, py = nx + dx, ny + dy
-                                if (in_bounds(px, py, rows, cols) and 
-                                    board[py][px] is None and 
-                                    not is_opponent_score_cell(px, py, self.player, rows, cols, score_cols)):
-                                    moves.append({"action": "push", "from": [x, y], "to": [nx, ny], "pushed_to": [px, py]})
+        for x, y in owned_cells(board, self.player, rows, cols, pieces):
+            piece = board[y][x]
+            
+            if piece.side == "stone":
+                # Generate moves for stones
+                for dx, dy in directions:
+                    nx, ny = x + dx, y + dy
+                    if not in_bounds(nx, ny, rows, cols):
+                        continue
                     
-                    # Generate flip moves (stone -> river)
-                    for orientation in ("horizontal", "vertical"):
-                        # Check if flip is safe
-                        temp = copy.deepcopy(board)
-                        temp[y][x].side = "river"
-                        temp[y][x].orientation = orientation
-                        flow = agent_river_flow(temp, x, y, x, y, self.player, rows, cols, score_cols)
-                        
-                        if not any(is_opponent_score_cell(dx, dy, self.player, rows, cols, score_cols) for dx, dy in flow):
-                            moves.append({"action": "flip", "from": [x, y], "orientation": orientation})
-                
-                else:  # River piece
-                    # Flip river -> stone
-                    moves.append({"action": "flip", "from": [x, y]})
+                    # Block destination in opponent score
+                    if is_opponent_score_cell(nx, ny, self.player, rows, cols, score_cols):
+                        continue
                     
-                    # Rotate if safe
-                    new_orientation = "vertical" if piece.orientation == "horizontal" else "horizontal"
-                    temp = copy.deepcopy(board)
-                    temp[y][x].orientation = new_orientation
+                    if board[ny][nx] is None:
+                        moves.append({"action": "move", "from": [x, y], "to": [nx, ny]})
+                    else:
+                        if board[ny][nx].owner != self.player:
+                            px, py = nx + dx, ny + dy
+                            if (in_bounds(px, py, rows, cols) and 
+                                board[py][px] is None and 
+                                not is_opponent_score_cell(px, py, self.player, rows, cols, score_cols)):
+                                moves.append({"action": "push", "from": [x, y], "to": [nx, ny], "pushed_to": [px, py]})
+                
+                # Generate flip moves (stone -> river)
+                for orientation in ("horizontal", "vertical"):
+                    # Check if flip is safe
+                    temp = copy_board(board)
+                    temp[y][x].side = "river"
+                    temp[y][x].orientation = orientation
                     flow = agent_river_flow(temp, x, y, x, y, self.player, rows, cols, score_cols)
                     
                     if not any(is_opponent_score_cell(dx, dy, self.player, rows, cols, score_cols) for dx, dy in flow):
-                        moves.append({"action": "rotate", "from": [x, y]})
-        
+                        moves.append({"action": "flip", "from": [x, y], "orientation": orientation})
+            
+            else:  # River piece
+                # Flip river -> stone
+                moves.append({"action": "flip", "from": [x, y]})
+                
+                # Rotate if safe
+                new_orientation = "vertical" if piece.orientation == "horizontal" else "horizontal"
+                temp = copy_board(board)
+                temp[y][x].orientation = new_orientation
+                flow = agent_river_flow(temp, x, y, x, y, self.player, rows, cols, score_cols)
+                
+                if not any(is_opponent_score_cell(dx, dy, self.player, rows, cols, score_cols) for dx, dy in flow):
+                    moves.append({"action": "rotate", "from": [x, y]})
+    
         return moves
     
-    def evaluate_board(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int]) -> float:
+    def evaluate_board(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int],
+                       pieces: Optional[PieceIndex] = None) -> float:
         """
         Evaluate the current board state from this player's perspective.
         Higher values indicate better positions for this player.
         
         This is a basic evaluation function that students can override.
+        pieces is an optional PieceIndex of the board; with it only the stones are visited.
         """
         score = 0.0
         top_row = top_score_row()
         bottom_row = bottom_score_row(rows)
         
-        for y in range(rows):
-            for x in range(cols):
-                piece = board[y][x]
-                if not piece:
-                    continue
+        if pieces is not None:
+            # Both sides' stones in row-major order, i.e. the order of the full scan
+            cells = sorted(pieces.stones[self.player] | pieces.stones[self.opponent], key=lambda c: (c[1], c[0]))
+        else:
+            cells = [(x, y) for y in range(rows) for x in range(cols)]
+        for x, y in cells:
+            piece = board[y][x]
+            if not piece:
+                continue
+            
+            if piece.owner == self.player and piece.side == "stone":
+                score += 1.0
                 
-                if piece.owner == self.player and piece.side == "stone":
-                    score += 1.0
-                    
-                    # Bonus for stones in own scoring area
-                    if is_own_score_cell(x, y, self.player, rows, cols, score_cols):
-                        score += 10.0
-                    
-                    # Small bonus for advancing toward opponent
-                    if self.player == "circle":
-                        score += (rows - y) * 0.1
-                    else:
-                        score += y * 0.1
+                # Bonus for stones in own scoring area
+                if is_own_score_cell(x, y, self.player, rows, cols, score_cols):
+                    score += 10.0
                 
-                elif piece.owner == self.opponent and piece.side == "stone":
-                    score -= 1.0
-                    
-                    # Penalty if opponent has stones in their scoring area
-                    if is_own_score_cell(x, y, self.opponent, rows, cols, score_cols):
-                        score -= 10.0
+                # Small bonus for advancing toward opponent
+                if self.player == "circle":
+                    score += (rows - y) * 0.1
+                else:
+                    score += y * 0.1
+            
+            elif piece.owner == self.opponent and piece.side == "stone":
+                score -= 1.0
+                
+                # Penalty if opponent has stones in their scoring area
+                if is_own_score_cell(x, y, self.opponent, rows, cols, score_cols):
+                    score -= 10.0
         
         return score
     
+    def opponent_moved(self, move: Dict[str, Any]) -> None:
+        """Called by the engine after the opponent's move is applied. No-op by default."""
+    
+    def close(self) -> None:
+        """Called by the engine when the game ends; release background workers here."""
+    
+    def progress(self) -> Optional[Dict[str, Any]]:
+        """
+        Live report of a choose() running on another thread (see gameEngine.MoveWorker),
+        e.g. {"move": best move so far, "depth": ...}. None (the default) reports nothing.
+        """
+        return None
+    
+    def interrupt(self) -> None:
+        """Called from another thread to ask a running choose() to return its best move now. Ignored by default."""
+    
+    def opening_book_move(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int]) -> Optional[Dict[str, Any]]:
+        """
+        Look up the current position in the shared opening book (see opening_book.py).
+        
+        Returns:
+            A weighted random book move, or None when out of book or no book is installed
+        """
+        from opening_book import load_book
+        book = load_book()
+        if book is None:
+            return None
+        return book.choose_move(board, self.player, rows, cols)
+    
     def simulate_move(self, board: List[List[Any]], move: Dict[str, Any], rows: int, cols: int, score_cols: List[int]) -> Tuple[bool, Any]:
         """
         Simulate a move on a copy of the board.
@@ -529,7 +557,7 @@ class BaseAgent(ABC):
         Returns:
             (success: bool, new_board or error_message)
         """
-        board_copy = copy.deepcopy(board)
+        board_copy = copy_board(board)
         success, message = agent_apply_move(board_copy, move, self.player, rows, cols, score_cols)
         
         if success:
@@ -555,28 +583,54 @@ class RandomAgent(BaseAgent):
 
 
 # ==================== STUDENT AGENT IMPORT ====================
+# student_agent (and the search modules it pulls in) is imported on first use, not when
+# this module loads; `agent.StudentAgent` still works through the module __getattr__.
 
-try:
-    from student_agent import StudentAgent
-except ImportError:
-    print("Warning: student_agent.py not found. Creating placeholder StudentAgent.")
+class _PlaceholderStudentAgent(BaseAgent):
+    """Placeholder StudentAgent - implement in student_agent.py"""
     
-    class StudentAgent(BaseAgent):
-        """Placeholder StudentAgent - implement in student_agent.py"""
-        
-        def choose(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int], current_player_time: float, opponent_time: float) -> Optional[Dict[str, Any]]:
-            moves = self.generate_all_moves(board, rows, cols, score_cols)
-            return random.choice(moves) if moves else None
+    def __init__(self, player: str, ponder: bool = False):
+        super().__init__(player)
+    
+    def choose(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int], current_player_time: float, opponent_time: float) -> Optional[Dict[str, Any]]:
+        moves = self.generate_all_moves(board, rows, cols, score_cols)
+        return random.choice(moves) if moves else None
+
+_student_agent_class = None
+
+def load_student_agent():
+    """The StudentAgent class from student_agent.py, or a random placeholder if it is missing."""
+    global _student_agent_class
+    if _student_agent_class is None:
+        try:
+            from student_agent import StudentAgent
+        except ImportError:
+            print("Warning: student_agent.py not found. Creating placeholder StudentAgent.")
+            StudentAgent = _PlaceholderStudentAgent
+        _student_agent_class = StudentAgent
+    return _student_agent_class
+
+def __getattr__(name: str):
+    if name == "StudentAgent":
+        return load_student_agent()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # ==================== AGENT FACTORY ====================
 
-def get_agent(player: str, strategy: str) -> BaseAgent:
+def _student_agent(player: str, ponder: bool) -> BaseAgent:
+    """The StudentAgent; ponder is passed only when on, so template constructors (player only) still work."""
+    if ponder:
+        return load_student_agent()(player, ponder=True)
+    return load_student_agent()(player)
+
+def get_agent(player: str, strategy: str, ponder: bool = False) -> BaseAgent:
     """
     Factory function to create agents based on strategy name.
     
     Args:
         player: "circle" or "square"
-        strategy: Strategy name ("random", "student")
+        strategy: Strategy name ("random", "student", "student_cpp", "mcts")
+        ponder: Let the agent think on the opponent's clock (Python student agent only)
     
     Returns:
         Agent instance
@@ -586,7 +640,7 @@ def get_agent(player: str, strategy: str) -> BaseAgent:
     if strategy == "random":
         return RandomAgent(player)
     elif strategy == "student":
-        return StudentAgent(player)
+        return _student_agent(player, ponder)
     elif strategy == "student_cpp":
         try:
             import student_agent_cpp as student_agent
@@ -597,6 +651,9 @@ def get_agent(player: str, strategy: str) -> BaseAgent:
             return StudentAgentCpp(player)
         else:
             print("C++ StudentAgent not available. Falling back to Python StudentAgent.")
-            return StudentAgent(player)
+            return _student_agent(player, ponder)
+    elif strategy == "mcts":
+        from mcts_agent import MCTSAgent
+        return MCTSAgent(player)
     else:
-        raise ValueError(f"Unknown strategy: {strategy}. Available: random, student")
+        raise ValueError(f"Unknown strategy: {strategy}. Available: random, student, student_cpp, mcts")
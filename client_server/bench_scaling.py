@@ -0,0 +1,134 @@
+"""
+River and Stones Game - Board Scaling Benchmark
+
+Times the engine's hot paths on growing boards (default_start_board scales
+the number of pieces with the board) so that super-linear paths stand out:
+- generate_legal_moves (with the valid-target cache off, i.e. raw cost), by
+  scanning the board and from a PieceIndex
+- validate_and_apply_move of every legal move (applied and undone in place)
+- compute_valid_targets of every piece (raw)
+- count_reachable_in_one (scoring, adjudication; scan and PieceIndex),
+  check_win, position_hash
+
+Each size is measured on a few positions reached by random play from the
+start position. The last column of the report is the fitted exponent of
+time against the number of cells (log-log slope over all sizes): about 1
+for linear paths; clearly above 1 means the path grows super-linearly.
+
+    python bench_scaling.py                       # 13x12 ... 64x64
+    python bench_scaling.py --sizes 13x12 31x30 --score-width 8
+"""
+
+import math
+import time
+import random
+import argparse
+from typing import List, Dict, Any, Tuple, Callable
+
+from gameEngine import (default_start_board, score_cols_for, generate_legal_moves, validate_and_apply_move,
+                        board_geometry, _valid_targets, count_reachable_in_one, check_win, position_hash, opponent,
+                        PieceIndex, TARGET_CACHE)
+from search import make_move, unmake_move
+
+DEFAULT_SIZES = ((13, 12), (21, 20), (31, 30), (45, 44), (64, 64))
+
+def scaled_positions(rows: int, cols: int, score_cols: List[int], count: int = 3, plies: int = 20,
+                     seed: int = 11) -> List[Tuple[Any, str]]:
+    """Positions `plies` random moves from the (scaled) start position."""
+    rng = random.Random(seed)
+    positions = []
+    for _ in range(count):
+        board, player = default_start_board(rows, cols), "circle"
+        for _ in range(plies):
+            moves = generate_legal_moves(board, player, rows, cols, score_cols)
+            if not moves:
+                break
+            validate_and_apply_move(board, rng.choice(moves), player, rows, cols, score_cols)
+            player = opponent(player)
+        positions.append((board, player))
+    return positions
+
+def _timed(fn: Callable[[], Any], repeat: int) -> float:
+    """Seconds per call of fn, best of `repeat` runs."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def measure_size(rows: int, cols: int, score_width: int, count: int = 3, repeat: int = 3) -> Dict[str, Any]:
+    """Mean seconds per call of each path over scaled_positions() of one board size."""
+    score_cols = score_cols_for(cols, score_width)
+    geo = board_geometry(rows, cols, score_cols)
+    positions = scaled_positions(rows, cols, score_cols, count)
+    totals: Dict[str, float] = {}
+    pieces = moves = 0
+
+    def add(name: str, seconds: float) -> None:
+        totals[name] = totals.get(name, 0.0) + seconds / len(positions)
+
+    enabled = TARGET_CACHE.enabled
+    TARGET_CACHE.enabled = False
+    try:
+        for board, player in positions:
+            index = PieceIndex(board)
+            own = index.owned(player)
+            legal = generate_legal_moves(board, player, rows, cols, score_cols)
+            pieces += len(own)
+            moves += len(legal)
+
+            def validate_all():
+                for move in legal:
+                    undo = make_move(board, move, player, rows, cols, score_cols)
+                    if undo is not None:
+                        unmake_move(board, undo)
+
+            add("movegen", _timed(lambda: generate_legal_moves(board, player, rows, cols, score_cols), repeat))
+            add("movegen (indexed)", _timed(
+                lambda: generate_legal_moves(board, player, rows, cols, score_cols, pieces=index), repeat))
+            add("validate (all moves)", _timed(validate_all, repeat))
+            add("valid targets (all pieces)", _timed(
+                lambda: [_valid_targets(board, x, y, player, geo) for x, y in own], repeat))
+            add("reachable_in_one", _timed(lambda: count_reachable_in_one(board, player, rows, cols, score_cols), repeat))
+            add("reachable_in_one (indexed)", _timed(
+                lambda: count_reachable_in_one(board, player, rows, cols, score_cols, index), repeat))
+            add("check_win", _timed(lambda: check_win(board, rows, cols, score_cols), repeat))
+            add("position_hash", _timed(lambda: position_hash(board, rows, cols), repeat))
+    finally:
+        TARGET_CACHE.enabled = enabled
+    return {"rows": rows, "cols": cols, "cells": rows * cols, "pieces": pieces / len(positions),
+            "moves": moves / len(positions), "seconds": totals}
+
+def fitted_exponent(xs: List[float], ys: List[float]) -> float:
+    """Least-squares slope of log(y) against log(x)."""
+    points = [(math.log(x), math.log(y)) for x, y in zip(xs, ys) if x > 0 and y > 0]
+    if len(points) < 2:
+        return float("nan")
+    mx = sum(p[0] for p in points) / len(points)
+    my = sum(p[1] for p in points) / len(points)
+    den = sum((p[0] - mx) ** 2 for p in points)
+    return sum((p[0] - mx) * (p[1] - my) for p in points) / den if den else float("nan")
+
+def benchmark_scaling(sizes=DEFAULT_SIZES, score_width: int = 4, count: int = 3, repeat: int = 3) -> List[Dict[str, Any]]:
+    results = [measure_size(rows, cols, score_width, count, repeat) for rows, cols in sizes]
+    header = "".join(f"{r['rows']}x{r['cols']:<3d}".rjust(11) for r in results)
+    print(f"{'':32s}{header}   exponent vs cells")
+    print(f"{'pieces (side to move)':32s}" + "".join(f"{r['pieces']:11.0f}" for r in results))
+    print(f"{'legal moves':32s}" + "".join(f"{r['moves']:11.0f}" for r in results))
+    cells = [r["cells"] for r in results]
+    for path in results[0]["seconds"]:
+        times = [r["seconds"][path] for r in results]
+        print(f"{path + ' (ms)':32s}" + "".join(f"{t * 1000:11.3f}" for t in times)
+              + f"   {fitted_exponent(cells, times):6.2f}")
+    return results
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Engine cost against board size")
+    ap.add_argument("--sizes", nargs="+", default=[f"{r}x{c}" for r, c in DEFAULT_SIZES], help="Board sizes as ROWSxCOLS")
+    ap.add_argument("--score-width", type=int, default=4)
+    ap.add_argument("--positions", type=int, default=3, help="Positions per size")
+    ap.add_argument("--repeat", type=int, default=3, help="Timing runs per path (best is kept)")
+    args = ap.parse_args()
+    sizes = [tuple(int(v) for v in s.lower().split("x")) for s in args.sizes]
+    benchmark_scaling(sizes, args.score_width, args.positions, args.repeat)
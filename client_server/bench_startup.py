@@ -0,0 +1,89 @@
+"""
+River and Stones Game - Startup Benchmark
+
+Measures how long a fresh interpreter takes to become ready for a headless
+(--nogui) game: import gameEngine and create the agents. Each run is a new
+process started with `python -X importtime`, so the report shows both the wall
+time (median of several runs) and the modules that dominate the import time.
+Heavy optional modules (pygame, numpy, the student agent's search) should only
+appear when a run actually needs them.
+
+    python bench_startup.py                       # headless, random vs random
+    python bench_startup.py --circle student      # include the student agent
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from typing import List, Dict, Any, Tuple
+
+HEAVY_MODULES = ("pygame", "numpy", "student_agent", "search")
+
+_IMPORTTIME = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+def startup_script(circle: str = "random", square: str = "random") -> str:
+    """The code a headless game runs before its first move."""
+    return ("import gameEngine\n"
+            f"gameEngine.create_agents({{'circle': 'ai', 'square': 'ai'}}, {circle!r}, {square!r})\n")
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """(module, self_us, cumulative_us) for each top-level import in `-X importtime` output."""
+    modules = []
+    for line in stderr.splitlines():
+        match = _IMPORTTIME.match(line)
+        if match and len(match.group(3)) <= 1:
+            modules.append((match.group(4), int(match.group(1)), int(match.group(2))))
+    return modules
+
+def imported_modules(stderr: str) -> set:
+    """Every module named in `-X importtime` output, nested imports included."""
+    return {m.group(4) for m in map(_IMPORTTIME.match, stderr.splitlines()) if m}
+
+def measure_startup(script: str, repeats: int = 5) -> Dict[str, Any]:
+    """Run script in fresh interpreters; wall times plus the import profile of the last run."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [here, os.environ.get("PYTHONPATH")])),
+               PYGAME_HIDE_SUPPORT_PROMPT="1")
+    walls = []
+    stderr = ""
+    for _ in range(repeats):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", script], cwd=here, env=env,
+                              capture_output=True, text=True)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"startup script failed:\n{proc.stderr[-2000:]}")
+        stderr = proc.stderr
+    top = parse_importtime(stderr)
+    loaded = imported_modules(stderr)
+    return {
+        "wall_median": statistics.median(walls),
+        "wall_min": min(walls),
+        "import_total_us": sum(cumulative for _, _, cumulative in top),
+        "top": sorted(top, key=lambda m: m[2], reverse=True),
+        "heavy": {name: name in loaded for name in HEAVY_MODULES},
+    }
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Startup time of a headless River and Stones game")
+    ap.add_argument("--circle", default="random", help="Circle strategy")
+    ap.add_argument("--square", default="random", help="Square strategy")
+    ap.add_argument("--repeats", type=int, default=5, help="Fresh interpreters to time")
+    ap.add_argument("--top", type=int, default=10, help="Top-level imports to list")
+    args = ap.parse_args()
+
+    result = measure_startup(startup_script(args.circle, args.square), args.repeats)
+    print(f"startup ({args.circle} vs {args.square}, {args.repeats} runs): "
+          f"median {result['wall_median'] * 1000:.0f} ms, min {result['wall_min'] * 1000:.0f} ms")
+    print(f"imports: {result['import_total_us'] / 1000:.1f} ms")
+    for name, _, cumulative in result["top"][:args.top]:
+        print(f"  {cumulative / 1000:8.1f} ms  {name}")
+    print("heavy modules: " + ", ".join(f"{name}={'yes' if loaded else 'no'}"
+                                         for name, loaded in result["heavy"].items()))
+
+if __name__ == "__main__":
+    main()
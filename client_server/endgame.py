@@ -0,0 +1,194 @@
+"""
+River and Stones Game - Endgame Threat Solver
+
+Proves or refutes forced wins in near-win positions (two or three stones
+already home) far faster than full-width search:
+- Depth-first AND/OR threat search with iterative deepening on the number of
+  attacker moves
+- The attacker only plays threats: moves that change count_scoring_pieces or
+  count_reachable_in_one for the attacker, plus moves touching a cell next to
+  its scoring cells (push and flip set-ups that count_reachable_in_one misses)
+- The defender is searched full width, replies that block the scoring row first
+- Proven and refuted positions are cached by position hash across calls
+
+A "win" result is a proof. A "none" result means no forced win made only of
+threat moves exists within the depth, which in practice covers the short wins
+this solver is for.
+"""
+
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from gameEngine import (generate_legal_moves, count_scoring_pieces, count_reachable_in_one,
+                        check_win, opponent, position_hash, top_score_row, bottom_score_row, win_count)
+from search import make_move, unmake_move, SearchTimeout
+
+WIN = "win"
+NO_WIN = "none"
+UNKNOWN = "unknown"
+
+# Most stones a single move can bring home (a push can land both the pusher and the pushed stone)
+MAX_GAIN_PER_MOVE = 2
+
+def is_near_win(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                missing: int = 2) -> bool:
+    """True when player is at most `missing` stones away from win_count()."""
+    return count_scoring_pieces(board, player, rows, cols, score_cols) >= win_count() - missing
+
+class EndgameSolver:
+    """
+    Win-in-N threat solver.
+
+    Args:
+        max_depth: Default maximum number of attacker moves in a proof
+    """
+
+    def __init__(self, max_depth: int = 3):
+        self.max_depth = max_depth
+        self.nodes = 0
+        # (position hash, attacker) -> smallest depth proven winning / largest depth refuted
+        self._proven: Dict[Tuple[int, str], int] = {}
+        self._refuted: Dict[Tuple[int, str], int] = {}
+        self._deadline = float("inf")
+
+    def clear(self) -> None:
+        """Forget cached proofs (e.g. between games)."""
+        self._proven.clear()
+        self._refuted.clear()
+
+    def solve(self, board: List[List[Any]], attacker: str, rows: int, cols: int, score_cols: List[int],
+              time_limit: float, max_depth: Optional[int] = None) -> Tuple[str, Optional[Dict[str, Any]], int]:
+        """
+        Look for a forced win for attacker, who is to move.
+
+        Args:
+            board: Current board (restored before returning)
+            attacker: Side to move and trying to win
+            rows, cols: Board dimensions
+            score_cols: Scoring column indices
+            time_limit: Seconds allowed
+            max_depth: Maximum attacker moves in the win (self.max_depth by default)
+
+        Returns:
+            (status, first move of the win or None, attacker moves needed).
+            status is WIN, NO_WIN (no threat win within max_depth) or UNKNOWN (out of time).
+        """
+        self._board, self._rows, self._cols, self._score_cols = board, rows, cols, score_cols
+        self._attacker = attacker
+        self._deadline = time.perf_counter() + time_limit
+        self.nodes = 0
+        limit = max_depth or self.max_depth
+        home = count_scoring_pieces(board, attacker, rows, cols, score_cols)
+        first = max(1, -(-(win_count() - home) // MAX_GAIN_PER_MOVE))
+        for depth in range(first, limit + 1):
+            try:
+                move = self._attack(depth)
+            except SearchTimeout:
+                return UNKNOWN, None, depth
+            if move is not None:
+                return WIN, move, depth
+        return NO_WIN, None, limit
+
+    # ---------- internals ----------
+
+    def _tick(self) -> None:
+        # Nodes are expensive (threat detection evaluates every legal move), so check the clock each time
+        self.nodes += 1
+        if time.perf_counter() >= self._deadline:
+            raise SearchTimeout()
+
+    def _near_home(self, move: Dict[str, Any]) -> bool:
+        """True if the move touches a cell within one step of the attacker's scoring cells."""
+        row = top_score_row() if self._attacker == "circle" else bottom_score_row(self._rows)
+        lo, hi = self._score_cols[0] - 1, self._score_cols[-1] + 1
+        for key in ("from", "to", "pushed_to"):
+            pos = move.get(key)
+            if pos and abs(int(pos[1]) - row) <= 1 and lo <= int(pos[0]) <= hi:
+                return True
+        return False
+
+    def _threats(self) -> List[Dict[str, Any]]:
+        """Attacker moves that change its scoring or reachable-in-one count or set up near home, scoring moves first."""
+        board, rows, cols, score_cols, me = self._board, self._rows, self._cols, self._score_cols, self._attacker
+        n0 = count_scoring_pieces(board, me, rows, cols, score_cols)
+        m0 = count_reachable_in_one(board, me, rows, cols, score_cols)
+        scored = []
+        for move in generate_legal_moves(board, me, rows, cols, score_cols):
+            undo = make_move(board, move, me, rows, cols, score_cols, trusted=True)
+            if undo is None:
+                continue
+            n = count_scoring_pieces(board, me, rows, cols, score_cols)
+            m = count_reachable_in_one(board, me, rows, cols, score_cols)
+            unmake_move(board, undo)
+            if time.perf_counter() >= self._deadline:
+                raise SearchTimeout()
+            if n != n0 or m != m0 or self._near_home(move):
+                scored.append((-(n - n0), -(m - m0), move))
+        scored.sort(key=lambda t: (t[0], t[1]))
+        return [move for _, _, move in scored]
+
+    def _defences(self, defender: str) -> List[Dict[str, Any]]:
+        """All defender moves, those ending near the attacker's scoring row first."""
+        rows = self._rows
+        target = top_score_row() if self._attacker == "circle" else bottom_score_row(rows)
+        moves = generate_legal_moves(self._board, defender, rows, self._cols, self._score_cols)
+
+        def distance(move: Dict[str, Any]) -> int:
+            cells = [move.get("to") or move["from"]]
+            if move.get("pushed_to"):
+                cells.append(move["pushed_to"])
+            return min(abs(int(c[1]) - target) for c in cells)
+
+        moves.sort(key=distance)
+        return moves
+
+    def _attack(self, depth: int) -> Optional[Dict[str, Any]]:
+        """A move winning by force within `depth` attacker moves, or None."""
+        self._tick()
+        board, rows, cols, score_cols, me = self._board, self._rows, self._cols, self._score_cols, self._attacker
+        key = (position_hash(board, rows, cols), me)
+        if self._refuted.get(key, 0) >= depth:
+            return None
+        home = count_scoring_pieces(board, me, rows, cols, score_cols)
+        if win_count() - home > MAX_GAIN_PER_MOVE * depth:
+            return None
+
+        defender = opponent(me)
+        for move in self._threats():
+            undo = make_move(board, move, me, rows, cols, score_cols, trusted=True)
+            try:
+                winner = check_win(board, rows, cols, score_cols)
+                if winner == me:
+                    self._proven[key] = 1
+                    return move
+                if depth > 1 and winner is None and self._defend(defender, depth - 1):
+                    self._proven[key] = min(self._proven.get(key, depth), depth)
+                    return move
+            finally:
+                unmake_move(board, undo)
+        self._refuted[key] = depth
+        return None
+
+    def _defend(self, defender: str, depth: int) -> bool:
+        """True if every defender reply still loses within `depth` attacker moves."""
+        self._tick()
+        board, rows, cols, score_cols = self._board, self._rows, self._cols, self._score_cols
+        replies = self._defences(defender)
+        if not replies:
+            # The engine passes the turn when a player has no move
+            return self._attack(depth) is not None
+        for reply in replies:
+            undo = make_move(board, reply, defender, rows, cols, score_cols, trusted=True)
+            if undo is None:
+                continue
+            try:
+                if check_win(board, rows, cols, score_cols) == defender:
+                    return False
+                key = (position_hash(board, rows, cols), self._attacker)
+                if self._proven.get(key, depth + 1) <= depth:
+                    continue
+                if self._attack(depth) is None:
+                    return False
+            finally:
+                unmake_move(board, undo)
+        return True
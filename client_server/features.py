@@ -0,0 +1,236 @@
+"""
+River and Stones Game - Feature Planes and Batched Evaluation
+
+Encodes boards as NumPy feature planes and scores whole batches of positions
+with one vectorized call:
+- Piece planes: stones and horizontal/vertical rivers per owner, indexed by
+  gameEngine.piece_kind (circle 0-2, square 3-5)
+- Geometry planes per player: scoring-cell mask and distance to the scoring row
+- Linear evaluators expressed as weight planes, so a batch score is a single
+  tensordot; basic_weights reproduces student_agent.basic_evaluate_board and
+  base_agent_weights reproduces BaseAgent.evaluate_board
+- Children of a node are described by sparse plane deltas (the few cells a
+  move changes) computed without applying the move; a whole batch of children
+  is then scored as parent score + one bincount over the deltas
+
+    evaluator = get_batch_evaluator(rows, cols, score_cols)
+    scores = evaluator.evaluate(batch_planes(boards, rows, cols), player)
+    scores, winners = evaluator.evaluate_children(board, moves, player)
+"""
+
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+import numpy as np
+
+from gameEngine import PieceIndex, piece_kind, top_score_row, bottom_score_row, win_count
+
+NUM_PLANES = 6
+CIRCLE_STONE, CIRCLE_RIVER_H, CIRCLE_RIVER_V, SQUARE_STONE, SQUARE_RIVER_H, SQUARE_RIVER_V = range(NUM_PLANES)
+STONE_PLANE = {"circle": CIRCLE_STONE, "square": SQUARE_STONE}
+
+# ==================== ENCODING ====================
+
+def board_planes(board: List[List[Any]], rows: int, cols: int, out: Optional[np.ndarray] = None,
+                 pieces: Optional[PieceIndex] = None) -> np.ndarray:
+    """Encode a board as a (NUM_PLANES, rows, cols) array of 0/1 piece planes (pieces: PieceIndex of board)."""
+    if out is None:
+        out = np.zeros((NUM_PLANES, rows, cols))
+    else:
+        out.fill(0.0)
+    if pieces is not None:
+        for owner in ("circle", "square"):
+            for x, y in pieces.stones[owner]:
+                out[STONE_PLANE[owner], y, x] = 1.0
+            for x, y in pieces.rivers[owner]:
+                out[piece_kind(board[y][x]), y, x] = 1.0
+        return out
+    for y, row in enumerate(board):
+        for x, p in enumerate(row):
+            if p:
+                out[piece_kind(p), y, x] = 1.0
+    return out
+
+def batch_planes(boards: List[List[List[Any]]], rows: int, cols: int) -> np.ndarray:
+    """Encode several boards as a (N, NUM_PLANES, rows, cols) array."""
+    out = np.zeros((len(boards), NUM_PLANES, rows, cols))
+    for i, board in enumerate(boards):
+        board_planes(board, rows, cols, out[i])
+    return out
+
+class BoardGeometry:
+    """Per-player numpy planes for one board size (gameEngine.BoardGeometry holds the cell tables); shared through board_geometry()."""
+
+    def __init__(self, rows: int, cols: int, score_cols: Tuple[int, ...]):
+        self.rows, self.cols, self.score_cols = rows, cols, score_cols
+        ys = np.arange(rows, dtype=np.float64)[:, None] * np.ones((1, cols))
+        self.score_row = {"circle": top_score_row(), "square": bottom_score_row(rows)}
+        self.score_mask: Dict[str, np.ndarray] = {}
+        self.row_distance: Dict[str, np.ndarray] = {}
+        for player, row in self.score_row.items():
+            mask = np.zeros((rows, cols))
+            if 0 <= row < rows:
+                mask[row, [x for x in score_cols if 0 <= x < cols]] = 1.0
+            self.score_mask[player] = mask
+            self.row_distance[player] = np.abs(ys - row)
+        # Rows still to cover toward the far edge, as used by the positional terms of the evaluators
+        self.advance = {"circle": rows - ys, "square": ys.copy()}
+
+    def planes(self, player: str) -> np.ndarray:
+        """(3, rows, cols) geometry planes for player: scoring mask, row distance, advance."""
+        return np.stack([self.score_mask[player], self.row_distance[player], self.advance[player]])
+
+@lru_cache(maxsize=None)
+def board_geometry(rows: int, cols: int, score_cols: Tuple[int, ...]) -> BoardGeometry:
+    return BoardGeometry(rows, cols, score_cols)
+
+# ==================== LINEAR WEIGHTS ====================
+# A weights function returns (NUM_PLANES, rows, cols) weights for one player's point of view.
+
+WeightsFn = Callable[[BoardGeometry, str], np.ndarray]
+
+def basic_weights(geo: BoardGeometry, player: str) -> np.ndarray:
+    """Weight planes equal to student_agent.basic_evaluate_board."""
+    opp = "square" if player == "circle" else "circle"
+    w = np.zeros((NUM_PLANES, geo.rows, geo.cols))
+    w[STONE_PLANE[player]] = 100.0 * geo.score_mask[player] + 0.1 * geo.advance[player]
+    w[STONE_PLANE[opp]] = -100.0 * geo.score_mask[opp]
+    return w
+
+def base_agent_weights(geo: BoardGeometry, player: str) -> np.ndarray:
+    """Weight planes equal to agent.BaseAgent.evaluate_board."""
+    opp = "square" if player == "circle" else "circle"
+    w = np.zeros((NUM_PLANES, geo.rows, geo.cols))
+    w[STONE_PLANE[player]] = 1.0 + 10.0 * geo.score_mask[player] + 0.1 * geo.advance[player]
+    w[STONE_PLANE[opp]] = -1.0 - 10.0 * geo.score_mask[opp]
+    return w
+
+# ==================== MOVE DELTAS ====================
+
+_RIVER_KIND = {"horizontal": 1, "vertical": 2}
+
+def move_cells(board: List[List[Any]], move: Dict[str, Any]) -> List[Tuple[int, int, int]]:
+    """
+    Cells a legal move changes, as (x, y, new piece kind or -1 for empty), without
+    touching the board. Mirrors the board updates of validate_and_apply_move.
+    """
+    action = move["action"]
+    fx, fy = int(move["from"][0]), int(move["from"][1])
+    piece = board[fy][fx]
+    kind = piece_kind(piece)
+    owner_base = kind - kind % 3
+    if action == "move":
+        tx, ty = int(move["to"][0]), int(move["to"][1])
+        return [(fx, fy, -1), (tx, ty, kind)]
+    if action == "push":
+        tx, ty = int(move["to"][0]), int(move["to"][1])
+        px, py = int(move["pushed_to"][0]), int(move["pushed_to"][1])
+        # A river that pushes turns into a stone
+        return [(fx, fy, -1), (tx, ty, owner_base), (px, py, piece_kind(board[ty][tx]))]
+    if action == "flip":
+        if piece.side == "stone":
+            return [(fx, fy, owner_base + _RIVER_KIND[move["orientation"]])]
+        return [(fx, fy, owner_base)]
+    # rotate
+    return [(fx, fy, owner_base + (1 if piece.orientation == "vertical" else 2))]
+
+# ==================== BATCH EVALUATOR ====================
+
+class BatchEvaluator:
+    """
+    Scores batches of positions of one board size with a linear weights function.
+
+    Args:
+        rows, cols: Board dimensions
+        score_cols: Scoring column indices
+        weights: Weights function (basic_weights by default)
+    """
+
+    def __init__(self, rows: int, cols: int, score_cols: List[int], weights: WeightsFn = basic_weights):
+        self.rows, self.cols, self.score_cols = rows, cols, list(score_cols)
+        self.geometry = board_geometry(rows, cols, tuple(score_cols))
+        self.weights = {player: weights(self.geometry, player) for player in ("circle", "square")}
+        self._flat = {player: w.ravel() for player, w in self.weights.items()}
+        # Flattened planes counting each player's stones on its scoring cells
+        self._home: Dict[str, np.ndarray] = {}
+        for player in ("circle", "square"):
+            home = np.zeros((NUM_PLANES, rows, cols))
+            home[STONE_PLANE[player]] = self.geometry.score_mask[player]
+            self._home[player] = home.ravel()
+
+    def evaluate(self, planes: np.ndarray, player: str) -> np.ndarray:
+        """Scores of a (N, NUM_PLANES, rows, cols) batch from player's point of view."""
+        return np.tensordot(planes, self.weights[player], axes=3)
+
+    def evaluate_boards(self, boards: List[List[List[Any]]], player: str) -> np.ndarray:
+        return self.evaluate(batch_planes(boards, self.rows, self.cols), player)
+
+    def winners(self, planes: np.ndarray) -> np.ndarray:
+        """Per position: 1 if Circle has won, -1 if Square has, 0 otherwise (Circle checked first, as check_win)."""
+        flat = planes.reshape(len(planes), -1)
+        return self._winners(flat @ self._home["circle"], flat @ self._home["square"])
+
+    def child_deltas(self, board: List[List[Any]],
+                     moves: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Sparse plane changes of every child reached by moves, as parallel arrays
+        (child index, flat plane index, +1/-1). Moves must be legal (e.g. from
+        generate_legal_moves); the board is not modified.
+        """
+        cols, plane_size = self.cols, self.rows * self.cols
+        child, index, sign = [], [], []
+        for i, move in enumerate(moves):
+            for x, y, kind in move_cells(board, move):
+                cell = y * cols + x
+                old = board[y][x]
+                if old:
+                    child.append(i); index.append(piece_kind(old) * plane_size + cell); sign.append(-1.0)
+                if kind >= 0:
+                    child.append(i); index.append(kind * plane_size + cell); sign.append(1.0)
+        return np.array(child, dtype=np.intp), np.array(index, dtype=np.intp), np.array(sign)
+
+    def child_planes(self, board: List[List[Any]], moves: List[Dict[str, Any]]) -> np.ndarray:
+        """Planes of every child reached by moves, shape (len(moves), NUM_PLANES, rows, cols)."""
+        out = np.empty((len(moves), NUM_PLANES * self.rows * self.cols))
+        out[:] = board_planes(board, self.rows, self.cols).ravel()
+        child, index, sign = self.child_deltas(board, moves)
+        np.add.at(out, (child, index), sign)
+        return out.reshape(len(moves), NUM_PLANES, self.rows, self.cols)
+
+    def evaluate_children(self, board: List[List[Any]], moves: List[Dict[str, Any]],
+                          perspective: str, pieces: Optional[PieceIndex] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score all children in one vectorized call, without materialising their planes.
+
+        Returns:
+            (scores from perspective, winners as in winners())
+        """
+        n = len(moves)
+        parent = board_planes(board, self.rows, self.cols, pieces=pieces).ravel()
+        child, index, sign = self.child_deltas(board, moves)
+
+        def batch(weights: np.ndarray) -> np.ndarray:
+            return parent @ weights + np.bincount(child, weights=sign * weights[index], minlength=n)
+
+        scores = batch(self._flat[perspective])
+        return scores, self._winners(batch(self._home["circle"]), batch(self._home["square"]))
+
+    # ---------- internals ----------
+
+    @staticmethod
+    def _winners(circle_home: np.ndarray, square_home: np.ndarray) -> np.ndarray:
+        need = win_count() - 0.5
+        circle = circle_home >= need
+        square = square_home >= need
+        return np.where(circle, 1, np.where(square, -1, 0)).astype(np.int8)
+
+_EVALUATORS: Dict[Tuple[int, int, Tuple[int, ...], WeightsFn], BatchEvaluator] = {}
+
+def get_batch_evaluator(rows: int, cols: int, score_cols: List[int],
+                        weights: WeightsFn = basic_weights) -> BatchEvaluator:
+    """Shared evaluator for a board size and weights function."""
+    key = (rows, cols, tuple(score_cols), weights)
+    evaluator = _EVALUATORS.get(key)
+    if evaluator is None:
+        evaluator = _EVALUATORS[key] = BatchEvaluator(rows, cols, score_cols, weights)
+    return evaluator
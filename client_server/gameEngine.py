@@ -1,14 +1,17 @@
-import argparse, json, copy, time
-from typing import List, Optional, Dict, Any, Tuple
+import json, copy, time, sys, threading, itertools
+from collections import OrderedDict
+from types import MappingProxyType
+from typing import List, Optional, Dict, Any, Tuple, Iterator, Callable
 
-# Agent factory now expects only (side, strategy)
-from agent import get_agent
+# When run as a script, let `import gameEngine` in other modules return this module
+# rather than a second copy, so both share one set of module state (caches, issued tokens)
+if __name__ == "__main__":
+    sys.modules.setdefault("gameEngine", sys.modules[__name__])
 
-# pygame optional
-try:
-    import pygame
-except Exception:
-    pygame = None
+# pygame is optional and only imported when the GUI starts (see load_pygame), and the
+# agent factory only when a game creates its agents, so headless users of the engine
+# functions do not pay for either at import time (argparse likewise waits for main)
+pygame = None
 
 # ---------------- Config ----------------
 DEFAULT_ROWS = 13
@@ -17,7 +20,22 @@ CELL = 48
 MARGIN = 60
 FPS = 30
 TIME_PER_PLAYER = 1 * 60  # Default 1 minute per player
-WIN_COUNT = 4
+WIN_COUNT = 4     # stones a player needs in its scoring area
+SCORE_WIDTH = 4   # width of each scoring area (see score_cols_for)
+
+def configure_geometry(score_width:Optional[int]=None, win_count:Optional[int]=None) -> None:
+    """Change the scoring-area width and stones needed to win for this process (before agents are created)."""
+    global SCORE_WIDTH, WIN_COUNT
+    if score_width is not None: SCORE_WIDTH = score_width
+    if win_count is not None: WIN_COUNT = win_count
+
+def score_width() -> int:
+    """Width of each scoring area (read at call time: configure_geometry may change it)."""
+    return SCORE_WIDTH
+
+def win_count() -> int:
+    """Stones a player needs in its scoring area (read at call time: configure_geometry may change it)."""
+    return WIN_COUNT
 
 # Colors - Light yellow background color scheme
 BG = (255, 253, 240)  # Light yellow background
@@ -53,11 +71,13 @@ def empty_board(rows:int, cols:int) -> List[List[Optional[Piece]]]:
     return [[None for _ in range(cols)] for __ in range(rows)]
 
 def default_start_board(rows:int, cols:int) -> List[List[Optional[Piece]]]:
+    # 2 rows of 6 stones each on the default board; larger boards get proportionally more
     board = empty_board(rows, cols)
-    width = min(6, max(2, cols - 6))
+    width = min(max(6, cols//2), max(2, cols - 6))
+    depth = max(2, rows//6)
     start_cols = list(range((cols - width)//2, (cols - width)//2 + width))
-    top_rows = [3,4]   # buffer at 0
-    bot_rows = [rows-5, rows-4]  # buffer at rows-1
+    top_rows = list(range(3, 3 + depth))   # buffer at 0
+    bot_rows = list(range(rows - 3 - depth, rows - 3))  # buffer at rows-1
     for r in top_rows:
         for c in start_cols:
             board[r][c] = Piece("square","stone")
@@ -80,8 +100,8 @@ def save_board_to_file(board, path:str):
         json.dump(data, fh, indent=2)
 
 # ---------------- Score helpers ----------------
-def score_cols_for(cols:int) -> List[int]:
-    w=4
+def score_cols_for(cols:int, width:Optional[int]=None) -> List[int]:
+    w = SCORE_WIDTH if width is None else width
     start = max(0, (cols - w)//2)
     return list(range(start, start+w))
 
@@ -91,6 +111,72 @@ def top_score_row() -> int:
 def bottom_score_row(rows:int) -> int:
     return rows - 3
 
+# ---------------- Board geometry ----------------
+# The hot paths (river flow, valid targets, move generation and validation) take a
+# BoardGeometry instead of rows, cols and score_cols and look cells up in its tables
+# rather than recomputing bounds and scoring-area tests per neighbour and per ray step.
+DIRECTIONS = ((1,0),(-1,0),(0,1),(0,-1))
+_HORIZONTAL_DIRS = (0, 1)   # indices into DIRECTIONS (and each cell's rays)
+_VERTICAL_DIRS = (2, 3)
+
+class BoardGeometry:
+    """
+    Immutable tables for one (rows, cols, score_cols); get it from board_geometry(), which
+    builds each configuration once and shares it. Cells are (x,y) tuples.
+      blocked[player]     cells player may not enter (the opponent's scoring cells)
+      own_score[player]   player's scoring cells
+      neighbours[y][x]    ((dx,dy,nx,ny), ...) in-bounds neighbours, in DIRECTIONS order
+      rays[player][y][x]  per direction, the cells from (x,y) (exclusive) toward the edge,
+                          cut before the first cell blocked for player
+    """
+    __slots__ = ("rows", "cols", "score_cols", "blocked", "own_score", "neighbours", "rays")
+
+    def __init__(self, rows:int, cols:int, score_cols:Tuple[int,...]):
+        cells = tuple(tuple((x, y) for x in range(cols)) for y in range(rows))
+        own = {"circle": frozenset(cells[top_score_row()][x] for x in score_cols
+                                   if 0 <= x < cols and 0 <= top_score_row() < rows),
+               "square": frozenset(cells[bottom_score_row(rows)][x] for x in score_cols
+                                   if 0 <= x < cols and 0 <= bottom_score_row(rows) < rows)}
+        blocked = {"circle": own["square"], "square": own["circle"]}
+        neighbours = tuple(tuple(tuple((dx, dy, x+dx, y+dy) for dx, dy in DIRECTIONS
+                                       if 0 <= x+dx < cols and 0 <= y+dy < rows)
+                                 for x in range(cols)) for y in range(rows))
+        columns = tuple(tuple(cells[y][x] for y in range(rows)) for x in range(cols))
+
+        full = tuple(tuple((cells[y][x+1:], cells[y][x-1::-1] if x else (),
+                            columns[x][y+1:], columns[x][y-1::-1] if y else ())
+                           for x in range(cols)) for y in range(rows))
+
+        def cut(ray, stop):
+            # rays that never cross a blocked cell are shared by both players
+            for i, cell in enumerate(ray):
+                if cell in stop:
+                    return ray[:i]
+            return ray
+
+        rays = {player: tuple(tuple(tuple(cut(ray, stop) for ray in cell) for cell in row) for row in full)
+                for player, stop in blocked.items()}
+        for name, value in (("rows", rows), ("cols", cols), ("score_cols", tuple(score_cols)),
+                            ("blocked", MappingProxyType(blocked)), ("own_score", MappingProxyType(own)),
+                            ("neighbours", neighbours), ("rays", MappingProxyType(rays))):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("BoardGeometry is immutable")
+
+    def in_bounds(self, x:int, y:int) -> bool:
+        return 0 <= x < self.cols and 0 <= y < self.rows
+
+_GEOMETRIES:Dict[Tuple[int,int,Tuple[int,...]],BoardGeometry] = {}
+
+def board_geometry(rows:int, cols:int, score_cols) -> BoardGeometry:
+    """The shared BoardGeometry of a configuration (built on first use)."""
+    key = (rows, cols, tuple(score_cols))
+    geo = _GEOMETRIES.get(key)
+    if geo is None:
+        geo = _GEOMETRIES[key] = BoardGeometry(*key)
+    return geo
+
 # ---------------- Scoring helpers ----------------
 def is_own_score_cell(x:int, y:int, player:str, rows:int, cols:int, score_cols:List[int]) -> bool:
     """Return True if (x,y) is player's own scoring cell."""
@@ -99,56 +185,61 @@ def is_own_score_cell(x:int, y:int, player:str, rows:int, cols:int, score_cols:L
     return is_opponent_score_cell(x, y, opponent(player), rows, cols, score_cols)
 
 def count_scoring_pieces(board:List[List[Optional[Piece]]],
-                         player:str, rows:int, cols:int, score_cols:List[int]) -> int:
+                         player:str, rows:int, cols:int, score_cols:List[int],
+                         pieces:Optional["PieceIndex"]=None) -> int:
     """n_self: number of player's pieces (stone side up) already in player's scoring area."""
+    own = board_geometry(rows, cols, score_cols).own_score[player]
+    if pieces is not None:
+        return len(own.intersection(pieces.stones[player]))
     n = 0
-    for y,row in enumerate(board):
-        for x,p in enumerate(row):
-            if p and p.owner == player and p.side == "stone" and is_own_score_cell(x, y, player, rows, cols, score_cols):
-                n += 1
+    for x,y in own:
+        p = board[y][x]
+        if p and p.owner == player and p.side == "stone":
+            n += 1
     return n
 
 def count_reachable_in_one(board:List[List[Optional[Piece]]],
-                           player:str, rows:int, cols:int, score_cols:List[int]) -> int:
+                           player:str, rows:int, cols:int, score_cols:List[int],
+                           pieces:Optional["PieceIndex"]=None) -> int:
     """
     m_self: number of player's pieces (stone side up) that can reach the player's scoring
     area in one legal move (including moves produced by river flow and pushes returned
-    by compute_valid_targets).
+    by compute_valid_targets). Given a PieceIndex in sync with board, only player's pieces
+    are visited.
     """
+    geo = board_geometry(rows, cols, score_cols)
+    own = geo.own_score[player]
+    if pieces is None:
+        pieces = PieceIndex(board)
     m = 0
-    for y,row in enumerate(board):
-        for x,p in enumerate(row):
-            if p and p.owner == player and p.side == "stone":
-                if is_own_score_cell(x, y, player, rows, cols, score_cols):
-                    continue
-                info = compute_valid_targets(board, x, y, player, rows, cols, score_cols)
-                # moves is a set of (tx,ty)
-                for (tx,ty) in info.get('moves', set()):
-                    if is_own_score_cell(tx, ty, player, rows, cols, score_cols):
-                        m += 1
-                        break
-                else:
-                    # check pushes: pushes is list of ((tx,ty),(ptx,pty))
-                    for of,pushed in info.get('pushes', []):
-                        ptx, pty = pushed
-                        if is_own_score_cell(ptx, pty, player, rows, cols, score_cols):
-                            m += 1
-                            break
-            if p and p.owner == player and p.side == "river":
-                # if the river piece is in the scoring area already then can be flipped to get a stone in the scoring area
-                if is_own_score_cell(x, y, player, rows, cols, score_cols):
+    for x,y in pieces.stones[player]:
+        if (x,y) in own:
+            continue
+        info = valid_targets(board, x, y, player, geo)
+        # moves is a set of (tx,ty)
+        if not own.isdisjoint(info.get('moves', ())):
+            m += 1
+        else:
+            # check pushes: pushes is list of ((tx,ty),(ptx,pty))
+            for of,pushed in info.get('pushes', []):
+                if pushed in own:
                     m += 1
+                    break
+    # a river piece in the scoring area already can be flipped to get a stone in the scoring area
+    m += len(own.intersection(pieces.rivers[player]))
     return m
 
 def compute_final_scores(board:List[List[Optional[Piece]]],
                          winner:Optional[str],
                          rows:int, cols:int, score_cols:List[int],
-                         remaining_times:Optional[Dict[str,float]] = None) -> Dict[str,float]:
+                         remaining_times:Optional[Dict[str,float]] = None,
+                         counts:Optional[Callable[[str],Tuple[int,int]]] = None) -> Dict[str,float]:
     """
     Return dict {'circle':score, 'square':score}.
     winner may be 'circle', 'square', or None (draw).
     If remaining_times provided (dict with keys 'circle' and 'square' containing remaining time),
     then if one player's clock is <= 0 and the other player's clock > 0 the latter is declared winner.
+    counts(player) may supply (n, m) for the board, e.g. GameState.scoring_counts.
     Implements the scoring rules from the spec:
       - Victory: winner gets 100 - (n_lose + m_lose/10), loser gets (n_lose + m_lose/10)
       - Draw: each player gets DrawScore (30) + MarginScore/4
@@ -167,8 +258,11 @@ def compute_final_scores(board:List[List[Optional[Piece]]],
 
     # helper to obtain n and m for a player or opponent
     def nm_for(player):
-        n = count_scoring_pieces(board, player, rows, cols, score_cols)
-        m = count_reachable_in_one(board, player, rows, cols, score_cols)
+        if counts is not None:
+            n, m = counts(player)
+        else:
+            n = count_scoring_pieces(board, player, rows, cols, score_cols)
+            m = count_reachable_in_one(board, player, rows, cols, score_cols)
         return float(n), float(m)
 
     scores = {'circle': 0.0, 'square': 0.0}
@@ -200,99 +294,408 @@ def is_opponent_score_cell(x:int,y:int,player:str,rows:int,cols:int,score_cols:L
     else:
         return (y == top_score_row()) and (x in score_cols)
 
+# ---------------- Position hashing ----------------
+# Zobrist keys come from splitmix64 so every process (and the C++ agent) derives the
+# same values. A piece kind is owner*3 + shape with owner circle=0, square=1 and
+# shape stone=0, horizontal river=1, vertical river=2.
+_MASK64 = (1 << 64) - 1
+
+def splitmix64(x:int) -> int:
+    x = (x + 0x9E3779B97F4A7C15) & _MASK64
+    z = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & _MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK64
+    return z ^ (z >> 31)
+
+SIDE_TO_MOVE_KEY = splitmix64(0xFFFFFFFF)
+_ZOBRIST_TABLES:Dict[Tuple[int,int],Tuple[int,List[List[int]]]] = {}
+
+def zobrist_table(rows:int, cols:int) -> Tuple[int,List[List[int]]]:
+    """(base key, keys[cell][kind]) for a board size; cell = y*cols + x."""
+    table = _ZOBRIST_TABLES.get((rows, cols))
+    if table is None:
+        base = splitmix64((rows << 16) | cols)
+        keys = [[splitmix64((i << 3) | k) for k in range(6)] for i in range(rows*cols)]
+        table = _ZOBRIST_TABLES[(rows, cols)] = (base, keys)
+    return table
+
+def piece_kind(p:Piece) -> int:
+    kind = 3 if p.owner == "square" else 0
+    if p.side == "river":
+        kind += 2 if p.orientation == "vertical" else 1
+    return kind
+
+def position_hash(board:List[List[Optional[Piece]]], rows:int, cols:int) -> int:
+    """64-bit Zobrist hash of the pieces on the board (side to move not included)."""
+    h, keys = zobrist_table(rows, cols)
+    for y,row in enumerate(board):
+        base = y*cols
+        for x,p in enumerate(row):
+            if p:
+                h ^= keys[base + x][piece_kind(p)]
+    return h
+
+# ---------------- Engine counters ----------------
+# Cheap always-on counters for finding hot spots (dump them with --counters). They count
+# work in this process only (not in ponder or rollout worker processes).
+COUNTERS:Dict[str,int] = {"river_flow_calls": 0, "river_cells_expanded": 0, "deep_copies": 0}
+
+def reset_counters() -> None:
+    for key in COUNTERS:
+        COUNTERS[key] = 0
+
+def engine_counters() -> Dict[str,Any]:
+    """Snapshot of COUNTERS plus the valid-target cache statistics."""
+    snapshot:Dict[str,Any] = dict(COUNTERS)
+    snapshot["target_cache"] = TARGET_CACHE.stats()
+    return snapshot
+
+def format_counters(counters:Optional[Dict[str,Any]]=None) -> str:
+    counters = counters if counters is not None else engine_counters()
+    lines = ["Engine counters:"]
+    for key, value in counters.items():
+        if isinstance(value, dict):
+            value = ", ".join(f"{k}={v:.3g}" if isinstance(v, float) else f"{k}={v}" for k, v in value.items())
+        lines.append(f"  {key:22s} {value}")
+    return "\n".join(lines)
+
+def copy_board(board:List[List[Optional[Piece]]]) -> List[List[Optional[Piece]]]:
+    """copy.deepcopy of a board, counted in COUNTERS["deep_copies"]."""
+    COUNTERS["deep_copies"] += 1
+    return copy.deepcopy(board)
+
+# ---------------- Piece index ----------------
+# Where each side's pieces are, for code that would otherwise scan all rows*cols cells to
+# find a few dozen pieces. An index is kept in sync by the move-application path: pass it
+# as pieces= to validate_and_apply_move (or search.make_move / unmake_move); GameState and
+# the search keep one each.
+def _row_major(cell:Tuple[int,int]) -> Tuple[int,int]:
+    return cell[1], cell[0]
+
+class PieceIndex:
+    """
+    stones[owner] and rivers[owner] are sets of (x,y). Build it from a board (one scan);
+    update() re-reads cells after a move changed them.
+    """
+    __slots__ = ("stones", "rivers")
+
+    def __init__(self, board:Optional[List[List[Optional[Piece]]]]=None):
+        self.stones:Dict[str,set] = {"circle": set(), "square": set()}
+        self.rivers:Dict[str,set] = {"circle": set(), "square": set()}
+        if board is not None:
+            for y,row in enumerate(board):
+                for x,p in enumerate(row):
+                    if p:
+                        (self.stones if p.side == "stone" else self.rivers)[p.owner].add((x,y))
+
+    def update(self, board:List[List[Optional[Piece]]], cells) -> None:
+        """Re-read cells (x,y) of board, e.g. the from/to/pushed_to cells of a move just made or unmade."""
+        stones, rivers = self.stones, self.rivers
+        for x,y in cells:
+            cell = (x,y)
+            stones["circle"].discard(cell); stones["square"].discard(cell)
+            rivers["circle"].discard(cell); rivers["square"].discard(cell)
+            p = board[y][x]
+            if p:
+                (stones if p.side == "stone" else rivers)[p.owner].add(cell)
+
+    def owned(self, owner:str) -> List[Tuple[int,int]]:
+        """owner's cells in row-major order, i.e. the order a board scan finds them in."""
+        return sorted(self.stones[owner] | self.rivers[owner], key=_row_major)
+
+def owned_cells(board:List[List[Optional[Piece]]], player:str, rows:int, cols:int,
+                pieces:Optional[PieceIndex]=None) -> List[Tuple[int,int]]:
+    """player's cells in row-major order: from pieces when given, else by scanning the board."""
+    if pieces is not None:
+        return pieces.owned(player)
+    return [(x,y) for y in range(rows) for x in range(cols) if board[y][x] and board[y][x].owner == player]
+
+def move_cells_touched(move:Dict[str,Any]) -> List[Tuple[int,int]]:
+    """The from/to/pushed_to cells of a move (the only cells applying it can change)."""
+    return [(int(move[k][0]), int(move[k][1])) for k in ("from", "to", "pushed_to") if move.get(k)]
+
 # ---------------- River flow & validation (authoritative) ----------------
 def get_river_flow_destinations(board:List[List[Optional[Piece]]],
                                 rx:int, ry:int, sx:int, sy:int, player:str,
                                 rows:int, cols:int, score_cols:List[int],
                                 river_push:bool=False) -> List[Tuple[int,int]]:
-    destinations=[]; visited=set(); queue=[(rx,ry)]
-    while queue:
-        x,y = queue.pop(0)
-        if (x,y) in visited or not in_bounds(x,y,rows,cols): continue
+    return flow_destinations(board, rx, ry, sx, sy, player, board_geometry(rows, cols, score_cols), river_push)
+
+def flow_destinations(board:List[List[Optional[Piece]]],
+                      rx:int, ry:int, sx:int, sy:int, player:str,
+                      geo:BoardGeometry, river_push:bool=False) -> List[Tuple[int,int]]:
+    """Empty cells a piece of player at (sx,sy) reaches by flowing through the river at (rx,ry), in BFS order."""
+    if not geo.in_bounds(rx, ry):
+        return []
+    blocked = geo.blocked[player]; rays = geo.rays[player]
+    destinations=[]; seen=set(); visited=set(); queue=[(rx,ry)]; i = 0
+    while i < len(queue):
+        x,y = queue[i]; i += 1
+        if (x,y) in visited: continue
         visited.add((x,y))
         cell = board[y][x]
         if river_push and x==rx and y==ry:
             cell = board[sy][sx]
         if cell is None:
-            if is_opponent_score_cell(x,y,player,rows,cols,score_cols):
-                # block entering opponent score
-                pass
-            else:
-                destinations.append((x,y))
+            # block entering opponent score
+            if (x,y) not in blocked and (x,y) not in seen:
+                seen.add((x,y)); destinations.append((x,y))
             continue
         if cell.side != "river":
             continue
-        dirs = [(1,0),(-1,0)] if cell.orientation == "horizontal" else [(0,1),(0,-1)]
-        for dx,dy in dirs:
-            nx, ny = x+dx, y+dy
-            while in_bounds(nx,ny,rows,cols):
-                if is_opponent_score_cell(nx,ny,player,rows,cols,score_cols):
-                    break
+        cell_rays = rays[y][x]
+        for d in (_HORIZONTAL_DIRS if cell.orientation == "horizontal" else _VERTICAL_DIRS):
+            for nxy in cell_rays[d]:
+                nx, ny = nxy
                 next_cell = board[ny][nx]
                 if next_cell is None:
-                    destinations.append((nx,ny)); nx += dx; ny += dy; continue
+                    if nxy not in seen:
+                        seen.add(nxy); destinations.append(nxy)
+                    continue
                 if nx==sx and ny==sy:
-                    nx += dx; ny += dy; continue
+                    continue
                 if next_cell.side == "river":
-                    queue.append((nx,ny)); break
+                    queue.append(nxy)
                 break
-    out=[]; seen=set()
-    for d in destinations:
-        if d not in seen:
-            seen.add(d); out.append(d)
-    return out
+    COUNTERS["river_flow_calls"] += 1
+    COUNTERS["river_cells_expanded"] += len(visited)
+    return destinations
+
+# ---------------- Valid-target cache ----------------
+# compute_valid_targets only depends on the cells it reads: the piece, its neighbours
+# and the cells river flow walks over. Results are cached per (cell, player) together
+# with a snapshot of those cells, and reused while the snapshot still matches, so a
+# move elsewhere on the board does not invalidate them.
+class _RecordingRow:
+    __slots__ = ("row", "y", "seen")
+    def __init__(self, row, y:int, seen:Dict[Tuple[int,int],Any]):
+        self.row = row; self.y = y; self.seen = seen
+    def __getitem__(self, x:int):
+        p = self.row[x]
+        self.seen[(x, self.y)] = (p.owner, p.side, p.orientation) if p else None
+        return p
+
+class _RecordingBoard:
+    """Read-only board view that records every cell read and its contents."""
+    __slots__ = ("board", "seen", "rows")
+    def __init__(self, board):
+        self.board = board; self.seen = {}; self.rows = {}
+    def __getitem__(self, y:int) -> _RecordingRow:
+        row = self.rows.get(y)
+        if row is None:
+            row = self.rows[y] = _RecordingRow(self.board[y], y, self.seen)
+        return row
+
+class TargetCache:
+    """
+    Bounded LRU cache of compute_valid_targets results keyed by (cell, player) and
+    validated against the cells the result depends on. Keeps up to `variants`
+    results per key. Entries are valid for one BoardGeometry; a query with another
+    geometry clears the cache. Cached results are shared: do not modify them.
+    """
+    def __init__(self, maxsize:int=20_000, variants:int=4):
+        self.maxsize = maxsize
+        self.variants = variants
+        self.enabled = True
+        self.hits = 0
+        self.misses = 0
+        self._entries:OrderedDict = OrderedDict()
+        self._geometry:Optional[BoardGeometry] = None
+
+    def lookup(self, board, sx:int, sy:int, player:str, geo:BoardGeometry) -> Dict[str,Any]:
+        if geo is not self._geometry:
+            self._entries.clear()
+            self._geometry = geo
+        key = (sx, sy, player)
+        entries = self._entries
+        variants = entries.get(key)
+        if variants is not None:
+            for i, (deps, info) in enumerate(variants):
+                for x, y, state in deps:
+                    p = board[y][x]
+                    if p is None:
+                        if state is not None: break
+                    elif state is None or p.side != state[1] or p.orientation != state[2] or p.owner != state[0]:
+                        break
+                else:
+                    self.hits += 1
+                    entries.move_to_end(key)
+                    if i:
+                        variants.insert(0, variants.pop(i))
+                    return info
+        self.misses += 1
+        view = _RecordingBoard(board)
+        info = _valid_targets(view, sx, sy, player, geo)
+        deps = tuple((x, y, state) for (x, y), state in view.seen.items())
+        if variants is None:
+            variants = entries[key] = []
+            if len(entries) > self.maxsize:
+                entries.popitem(last=False)
+        else:
+            entries.move_to_end(key)
+        variants.insert(0, (deps, info))
+        del variants[self.variants:]
+        return info
+
+    def stats(self) -> Dict[str,Any]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._entries),
+                "maxsize": self.maxsize, "hit_rate": self.hits / total if total else 0.0}
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+TARGET_CACHE = TargetCache()
 
 # ---------------- Compute valid targets (authoritative) ----------------
 def compute_valid_targets(board:List[List[Optional[Piece]]],
                           sx:int, sy:int, player:str,
                           rows:int, cols:int, score_cols:List[int]) -> Dict[str,Any]:
-    if not in_bounds(sx,sy,rows,cols):
+    """
+    {'moves': set of (tx,ty), 'pushes': [((tx,ty),(px,py)), ...]} for the piece at (sx,sy).
+    Served from TARGET_CACHE when enabled; the result must not be modified.
+    """
+    return valid_targets(board, sx, sy, player, board_geometry(rows, cols, score_cols))
+
+def valid_targets(board:List[List[Optional[Piece]]], sx:int, sy:int, player:str,
+                  geo:BoardGeometry) -> Dict[str,Any]:
+    """compute_valid_targets on a BoardGeometry."""
+    if TARGET_CACHE.enabled:
+        return TARGET_CACHE.lookup(board, sx, sy, player, geo)
+    return _valid_targets(board, sx, sy, player, geo)
+
+def _valid_targets(board:List[List[Optional[Piece]]], sx:int, sy:int, player:str,
+                   geo:BoardGeometry) -> Dict[str,Any]:
+    if not geo.in_bounds(sx,sy):
         return {'moves': set(), 'pushes': []}
     p = board[sy][sx]
     if p is None or p.owner != player:
         return {'moves': set(), 'pushes': []}
     moves=set(); pushes=[]
-    dirs=[(1,0),(-1,0),(0,1),(0,-1)]
-    for dx,dy in dirs:
-        tx,ty = sx+dx, sy+dy
-        if not in_bounds(tx,ty,rows,cols): continue
+    blocked = geo.blocked[player]
+    for dx,dy,tx,ty in geo.neighbours[sy][sx]:
         # block entering opponent score cell
-        if is_opponent_score_cell(tx,ty,player,rows,cols,score_cols):
+        if (tx,ty) in blocked:
             continue
         target = board[ty][tx]
         if target is None:
             moves.add((tx,ty))
         elif target.side == "river":
-            flow = get_river_flow_destinations(board, tx, ty, sx, sy, player, rows, cols, score_cols)
-            for d in flow: moves.add(d)
+            moves.update(flow_destinations(board, tx, ty, sx, sy, player, geo))
         else:
             # stone occupied
             if p.side == "stone":
                 px,py = tx+dx, ty+dy
-                if in_bounds(px,py,rows,cols) and board[py][px] is None and not is_opponent_score_cell(px,py,p.owner,rows,cols,score_cols):
+                if geo.in_bounds(px,py) and board[py][px] is None and (px,py) not in blocked:
                     pushes.append(((tx,ty),(px,py)))
             else:
                 pushed_player = target.owner
-                flow = get_river_flow_destinations(board, tx, ty, sx, sy, pushed_player, rows, cols, score_cols, river_push=True)
-                for d in flow:
-                    if not is_opponent_score_cell(d[0],d[1],pushed_player,rows,cols,score_cols):
-                        pushes.append(((tx,ty),(d[0],d[1])))
+                pushed_blocked = geo.blocked[pushed_player]
+                for d in flow_destinations(board, tx, ty, sx, sy, pushed_player, geo, river_push=True):
+                    if d not in pushed_blocked:
+                        pushes.append(((tx,ty),d))
     return {'moves': moves, 'pushes': pushes}
 
+# ---------------- Trusted moves ----------------
+# generate_legal_moves(..., tokens=True) stamps each move with a token and records, in a
+# registry held here, the move that token was issued for and the position (hash) and
+# player it was generated for. validate_and_apply_move applies a move whose token was
+# issued for exactly this move in the current position without re-validating it; every
+# other move, including any with a stale, copied or made-up token, gets the full checks.
+# A token thus only ever vouches for a move the generator produced, so knowing or
+# guessing one gains nothing. Game strips tokens from the moves agents return: their
+# moves always get the full checks.
+_ISSUED:"OrderedDict[Tuple[int,str],Dict[int,Tuple]]" = OrderedDict()   # (hash, player) -> {token: move fields}
+_ISSUED_POSITIONS = 256   # positions whose tokens stay valid (least recently issued dropped first)
+_next_token = itertools.count(1)
+
+def _move_fields(move:Dict[str,Any]) -> Tuple:
+    def cell(key):
+        pos = move.get(key)
+        return (int(pos[0]), int(pos[1])) if pos else None
+    return (move.get("action"), cell("from"), cell("to"), cell("pushed_to"), move.get("orientation"))
+
+def issue_tokens(moves:List[Dict[str,Any]], player:str, pos_hash:int) -> None:
+    """Stamp moves, generated for player in the position with hash pos_hash, with registered tokens."""
+    key = (pos_hash, player)
+    issued = _ISSUED.get(key)
+    if issued is None:
+        issued = _ISSUED[key] = {}
+        while len(_ISSUED) > _ISSUED_POSITIONS:
+            _ISSUED.popitem(last=False)
+    else:
+        _ISSUED.move_to_end(key)
+    for m in moves:
+        token = m["token"] = next(_next_token)
+        issued[token] = _move_fields(m)
+
+def display_move(move:Any) -> Any:
+    """The move without its token, for logs (and for Game, which never trusts agents' tokens)."""
+    if isinstance(move, dict) and "token" in move:
+        return {k:v for k,v in move.items() if k != "token"}
+    return move
+
+def has_valid_token(board:List[List[Optional[Piece]]], move:Dict[str,Any], player:str, rows:int, cols:int) -> bool:
+    issued = _ISSUED.get((position_hash(board, rows, cols), player))
+    return issued is not None and issued.get(move.get("token")) == _move_fields(move)
+
+def apply_trusted_move(board:List[List[Optional[Piece]]], move:Dict[str,Any]) -> Tuple[bool,str]:
+    """Apply a move known to be legal here, without checks. Same board updates and messages as validate_and_apply_move."""
+    action = move["action"]
+    fx,fy = int(move["from"][0]), int(move["from"][1])
+    piece = board[fy][fx]
+    if action == "move":
+        tx,ty = int(move["to"][0]), int(move["to"][1])
+        board[ty][tx] = piece; board[fy][fx] = None
+        return True, "moved"
+    if action == "push":
+        tx,ty = int(move["to"][0]), int(move["to"][1])
+        px,py = int(move["pushed_to"][0]), int(move["pushed_to"][1])
+        board[py][px] = board[ty][tx]; board[ty][tx] = piece; board[fy][fx] = None
+        if piece.side == "river":
+            piece.side = "stone"; piece.orientation = None
+        return True, "push applied"
+    if action == "flip":
+        if piece.side == "stone":
+            piece.side = "river"; piece.orientation = move["orientation"]
+            return True, "flipped to river"
+        piece.side = "stone"; piece.orientation = None
+        return True, "flipped to stone"
+    piece.orientation = "horizontal" if piece.orientation == "vertical" else "vertical"
+    return True, "rotated"
+
 # ---------------- Validate & apply move (authoritative) ----------------
 def validate_and_apply_move(board:List[List[Optional[Piece]]],
                             move:Dict[str,Any],
                             player:str,
-                            rows:int, cols:int, score_cols:List[int]) -> Tuple[bool,str]:
+                            rows:int, cols:int, score_cols:List[int],
+                            trusted:bool=False, pieces:Optional[PieceIndex]=None) -> Tuple[bool,str]:
+    """
+    Check move for player and apply it if legal. A move carrying a token issued for it in
+    this position skips the checks, as does trusted=True, which callers may only pass for
+    moves they generated for this exact board (e.g. a search making its own moves).
+    A PieceIndex passed as pieces is updated when the move is applied.
+    """
+    ok, info = _validate_and_apply_move(board, move, player, rows, cols, score_cols, trusted)
+    if ok and pieces is not None:
+        pieces.update(board, move_cells_touched(move))
+    return ok, info
+
+def _validate_and_apply_move(board:List[List[Optional[Piece]]], move:Dict[str,Any], player:str,
+                             rows:int, cols:int, score_cols:List[int], trusted:bool) -> Tuple[bool,str]:
     if not isinstance(move, dict):
         return False, "move must be dict"
+    if trusted or ("token" in move and has_valid_token(board, move, player, rows, cols)):
+        return apply_trusted_move(board, move)
+    geo = board_geometry(rows, cols, score_cols)
+    in_bounds = geo.in_bounds
     action = move.get("action")
     if action == "move":
         fr = move.get("from"); to = move.get("to")
         if not fr or not to: return False, "move needs from & to"
         fx,fy = int(fr[0]), int(fr[1]); tx,ty = int(to[0]), int(to[1])
-        if not in_bounds(fx,fy,rows,cols) or not in_bounds(tx,ty,rows,cols): return False, "oob"
-        if is_opponent_score_cell(tx,ty,player,rows,cols,score_cols): return False, "can't go into opponent score"
+        if not in_bounds(fx,fy) or not in_bounds(tx,ty): return False, "oob"
+        if (tx,ty) in geo.blocked[player]: return False, "can't go into opponent score"
         piece = board[fy][fx]
         if piece is None or piece.owner != player: return False, "invalid piece"
         if board[ty][tx] is None:
@@ -302,8 +705,8 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
         ptx,pty = int(pushed[0]), int(pushed[1])
         dx = tx - fx; dy = ty - fy
         if (ptx,pty) != (tx+dx, ty+dy): return False, "invalid pushed_to"
-        if not in_bounds(ptx,pty,rows,cols): return False, "oob"
-        if is_opponent_score_cell(ptx,pty,player,rows,cols,score_cols): return False, "can't push into opponent score"
+        if not in_bounds(ptx,pty): return False, "oob"
+        if (ptx,pty) in geo.blocked[player]: return False, "can't push into opponent score"
         if board[pty][ptx] is not None: return False, "pushed_to not empty"
         board[pty][ptx] = board[ty][tx]; board[ty][tx] = piece; board[fy][fx] = None
         return True, "move+push applied"
@@ -317,11 +720,11 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
         tx, ty = int(to[0]), int(to[1])
         px, py = int(pushed[0]), int(pushed[1])
 
-        if not (in_bounds(fx,fy,rows,cols) and in_bounds(tx,ty,rows,cols) and in_bounds(px,py,rows,cols)):
+        if not (in_bounds(fx,fy) and in_bounds(tx,ty) and in_bounds(px,py)):
             return False, "oob"
         pushed_player = board[ty][tx].owner if board[ty][tx] else None
-        if (is_opponent_score_cell(tx,ty,player,rows,cols,score_cols) or
-            is_opponent_score_cell(px,py,pushed_player,rows,cols,score_cols)):
+        if ((tx,ty) in geo.blocked[player] or
+            (pushed_player is not None and (px,py) in geo.blocked[pushed_player])):
             return False, "push would enter opponent score cell"
 
         piece = board[fy][fx]
@@ -336,7 +739,7 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
         if piece.side == "river" and board[ty][tx].side == "river":
             return False, "rivers cannot push rivers"
 
-        info = compute_valid_targets(board, fx, fy, player, rows, cols, score_cols)
+        info = valid_targets(board, fx, fy, player, geo)
         valid_pairs = info['pushes']
         if ((tx,ty), (px,py)) not in valid_pairs:
             return False, "push pair invalid"
@@ -363,7 +766,7 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
         fr = move.get("from")
         if not fr: return False, "flip needs from"
         fx,fy = int(fr[0]), int(fr[1])
-        if not in_bounds(fx,fy,rows,cols): return False, "oob"
+        if not in_bounds(fx,fy): return False, "oob"
         piece = board[fy][fx]
         if piece is None or piece.owner != player: return False, "invalid piece"
         if piece.side == "stone":
@@ -371,11 +774,11 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
             if ori not in ("horizontal","vertical"): return False, "stone->river needs orientation"
             # check resulting river flow doesn't reach opponent score
             piece.side="river"; piece.orientation=ori
-            flow = get_river_flow_destinations(board, fx, fy, fx, fy, player, rows, cols, score_cols)
+            flow = flow_destinations(board, fx, fy, fx, fy, player, geo)
             # revert for now; we will finalize only if safe
             piece.side="stone"; piece.orientation=None
             for (dx,dy) in flow:
-                if is_opponent_score_cell(dx,dy,player,rows,cols,score_cols):
+                if (dx,dy) in geo.blocked[player]:
                     return False, "flip would allow flow into opponent score"
             # commit flip
             piece.side="river"; piece.orientation=ori
@@ -388,14 +791,14 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
         fr = move.get("from")
         if not fr: return False, "rotate needs from"
         fx,fy = int(fr[0]), int(fr[1])
-        if not in_bounds(fx,fy,rows,cols): return False, "oob"
+        if not in_bounds(fx,fy): return False, "oob"
         piece = board[fy][fx]
         if piece is None or piece.owner != player: return False, "invalid"
         if piece.side != "river": return False, "rotate only on river"
         piece.orientation = "horizontal" if piece.orientation=="vertical" else "vertical"
-        flow = get_river_flow_destinations(board, fx, fy, fx, fy, player, rows, cols, score_cols)
+        flow = flow_destinations(board, fx, fy, fx, fy, player, geo)
         for (dx,dy) in flow:
-            if is_opponent_score_cell(dx,dy,player,rows,cols,score_cols):
+            if (dx,dy) in geo.blocked[player]:
                 piece.orientation = "horizontal" if piece.orientation=="vertical" else "vertical"
                 return False, "rotation allows flow into opponent score"
         return True, "rotated"
@@ -404,67 +807,111 @@ def validate_and_apply_move(board:List[List[Optional[Piece]]],
 
 # ---------------- Generate moves for agents (compatibility) ----------------
 def generate_all_moves(board:List[List[Optional[Piece]]],
-                       player:str, rows:int, cols:int, score_cols:List[int]) -> List[Dict[str,Any]]:
+                       player:str, rows:int, cols:int, score_cols:List[int],
+                       pieces:Optional[PieceIndex]=None) -> List[Dict[str,Any]]:
     # This is a convenience implementation; agents have their own generators,
     # but main provides this as well for reference or alternative usage.
     moves=[]
     dirs=[(1,0),(-1,0),(0,1),(0,-1)]
-    for y in range(rows):
-        for x in range(cols):
-            p = board[y][x]
-            if not p or p.owner != player: continue
-            if p.side == "stone":
-                for dx,dy in dirs:
-                    nx,ny = x+dx,y+dy
-                    if not in_bounds(nx,ny,rows,cols): continue
-                    if is_opponent_score_cell(nx,ny,player,rows,cols,score_cols): continue
-                    if board[ny][nx] is None:
-                        moves.append({"action":"move","from":[x,y],"to":[nx,ny]})
+    for x,y in owned_cells(board, player, rows, cols, pieces):
+        p = board[y][x]
+        if p.side == "stone":
+            for dx,dy in dirs:
+                nx,ny = x+dx,y+dy
+                if not in_bounds(nx,ny,rows,cols): continue
+                if is_opponent_score_cell(nx,ny,player,rows,cols,score_cols): continue
+                if board[ny][nx] is None:
+                    moves.append({"action":"move","from":[x,y],"to":[nx,ny]})
+                else:
+                    target = board[ny][nx]
+                    if target.side == "river":
+                        # moves that flow through the river
+                        flow = get_river_flow_destinations(board, nx, ny, x, y, player, rows, cols, score_cols)
+                        for d in flow:
+                            moves.append({"action":"move","from":[x,y],"to":d})
                     else:
-                        target = board[ny][nx]
-                        if target.side == "river":
-                            # moves that flow through the river
-                            flow = get_river_flow_destinations(board, nx, ny, x, y, player, rows, cols, score_cols)
-                            for d in flow:
-                                moves.append({"action":"move","from":[x,y],"to":d})
-                        else:
-                            # moves to push the stone pieces (can push self and opponent pieces both)
-                            px,py = nx+dx, ny+dy
-                            if in_bounds(px,py,rows,cols) and board[py][px] is None and not is_opponent_score_cell(px,py,target.owner,rows,cols,score_cols):
-                                moves.append({"action":"push","from":[x,y],"to":[nx,ny],"pushed_to":[px,py]})
-                # flips
-                for ori in ("horizontal","vertical"):
-                    p.side="river"; p.orientation=ori
-                    moves.append({"action":"flip","from":[x,y],"orientation":ori})
-            else:
-                for dx,dy in dirs:
-                    nx,ny = x+dx,y+dy
-                    if not in_bounds(nx,ny,rows,cols): continue
-                    if is_opponent_score_cell(nx,ny,player,rows,cols,score_cols): continue
-                    if board[ny][nx] is None:
-                        moves.append({"action":"move","from":[x,y],"to":[nx,ny]})
+                        # moves to push the stone pieces (can push self and opponent pieces both)
+                        px,py = nx+dx, ny+dy
+                        if in_bounds(px,py,rows,cols) and board[py][px] is None and not is_opponent_score_cell(px,py,target.owner,rows,cols,score_cols):
+                            moves.append({"action":"push","from":[x,y],"to":[nx,ny],"pushed_to":[px,py]})
+            # flips
+            for ori in ("horizontal","vertical"):
+                moves.append({"action":"flip","from":[x,y],"orientation":ori})
+        else:
+            for dx,dy in dirs:
+                nx,ny = x+dx,y+dy
+                if not in_bounds(nx,ny,rows,cols): continue
+                if is_opponent_score_cell(nx,ny,player,rows,cols,score_cols): continue
+                if board[ny][nx] is None:
+                    moves.append({"action":"move","from":[x,y],"to":[nx,ny]})
+                else:
+                    target = board[ny][nx]
+                    if target.side == "river":
+                        # moves that flow through the river
+                        flow = get_river_flow_destinations(board, nx, ny, x, y, player, rows, cols, score_cols)
+                        for d in flow:
+                            moves.append({"action":"move","from":[x,y],"to":d})
                     else:
-                        target = board[ny][nx]
-                        if target.side == "river":
-                            # moves that flow through the river
-                            flow = get_river_flow_destinations(board, nx, ny, x, y, player, rows, cols, score_cols)
-                            for d in flow:
-                                moves.append({"action":"move","from":[x,y],"to":d})
-                        else:
-                            # moves to push the stone pieces (can push self and opponent pieces both)
-                            px,py = nx+dx, ny+dy
-                            if in_bounds(px,py,rows,cols) and board[py][px] is None and not is_opponent_score_cell(px,py,target.owner,rows,cols,score_cols):
-                                moves.append({"action":"push","from":[x,y],"to":[nx,ny],"pushed_to":[px,py]})
-                # flip to stone side
-                moves.append({"action":"flip","from":[x,y]})
-                # rotate
-                new_ori = "vertical" if p.orientation=="horizontal" else "horizontal"
-                p.orientation = new_ori
+                        # moves to push the stone pieces (can push self and opponent pieces both)
+                        px,py = nx+dx, ny+dy
+                        if in_bounds(px,py,rows,cols) and board[py][px] is None and not is_opponent_score_cell(px,py,target.owner,rows,cols,score_cols):
+                            moves.append({"action":"push","from":[x,y],"to":[nx,ny],"pushed_to":[px,py]})
+            # flip to stone side
+            moves.append({"action":"flip","from":[x,y]})
+            # rotate
+            moves.append({"action":"rotate","from":[x,y]})
+    return moves
+
+def _flow_reaches_opponent_score(board:List[List[Optional[Piece]]], x:int, y:int, player:str,
+                                 geo:BoardGeometry) -> bool:
+    """Same safety check validate_and_apply_move runs for flips to river and rotations."""
+    return not geo.blocked[player].isdisjoint(flow_destinations(board, x, y, x, y, player, geo))
+
+def generate_legal_moves(board:List[List[Optional[Piece]]],
+                         player:str, rows:int, cols:int, score_cols:List[int],
+                         tokens:bool=False, pieces:Optional[PieceIndex]=None) -> List[Dict[str,Any]]:
+    """
+    Every move validate_and_apply_move accepts for player, built from compute_valid_targets
+    so that generation and validation cannot disagree. Pushes are emitted as "push" actions
+    only (the equivalent "move"+pushed_to form is not duplicated). The board is left untouched.
+    With tokens=True every move carries a trusted-move token for this position. Given a
+    PieceIndex in sync with board, only player's pieces are visited.
+    """
+    geo = board_geometry(rows, cols, score_cols)
+    moves=[]
+    for x,y in owned_cells(board, player, rows, cols, pieces):
+        p = board[y][x]
+        info = valid_targets(board, x, y, player, geo)
+        for tx,ty in sorted(info['moves']):
+            moves.append({"action":"move","from":[x,y],"to":[tx,ty]})
+        for (tx,ty),pushed in info['pushes']:
+            if pushed in geo.blocked[board[ty][tx].owner]: continue
+            px,py = pushed
+            moves.append({"action":"push","from":[x,y],"to":[tx,ty],"pushed_to":[px,py]})
+        side, ori = p.side, p.orientation
+        if side == "stone":
+            for new_ori in ("horizontal","vertical"):
+                p.side="river"; p.orientation=new_ori
+                unsafe = _flow_reaches_opponent_score(board, x, y, player, geo)
+                p.side=side; p.orientation=ori
+                if not unsafe:
+                    moves.append({"action":"flip","from":[x,y],"orientation":new_ori})
+        else:
+            moves.append({"action":"flip","from":[x,y]})
+            p.orientation = "horizontal" if ori=="vertical" else "vertical"
+            unsafe = _flow_reaches_opponent_score(board, x, y, player, geo)
+            p.orientation = ori
+            if not unsafe:
                 moves.append({"action":"rotate","from":[x,y]})
+    if tokens:
+        issue_tokens(moves, player, position_hash(board, rows, cols))
     return moves
 
 # ---------------- Win check ----------------
-def check_win(board:List[List[Optional[Piece]]], rows:int, cols:int, score_cols:List[int]) -> Optional[str]:
+def check_win(board:List[List[Optional[Piece]]], rows:int, cols:int, score_cols:List[int],
+              win_count:Optional[int]=None) -> Optional[str]:
+    """The player with win_count (default WIN_COUNT) stones in its scoring area, if any."""
+    need = WIN_COUNT if win_count is None else win_count
     top = top_score_row(); bot = bottom_score_row(rows)
     ccount=0; scount=0
     for x in score_cols:
@@ -474,10 +921,142 @@ def check_win(board:List[List[Optional[Piece]]], rows:int, cols:int, score_cols:
         if in_bounds(x, bot, rows, cols):
             q = board[bot][x]
             if q and q.owner=="square" and q.side=="stone": scount+=1
-    if ccount >= WIN_COUNT: return "circle"
-    if scount >= WIN_COUNT: return "square"
+    if ccount >= need: return "circle"
+    if scount >= need: return "square"
     return None
 
+# ---------------- Game state ----------------
+class GameState:
+    """
+    One position of a game: board, geometry, side to move, ply and clocks, with the derived
+    data callers keep asking for (legal moves, piece lists, river components, scoring counts,
+    hash, winner) computed on first use and cached until the board changes. apply() clears
+    the cache and updates `index` (a PieceIndex) in place; code that edits `board` directly
+    must call invalidate(). Cached values are shared: do not modify them.
+
+    Args:
+        board: The board (used in place, not copied)
+        rows, cols: Board dimensions
+        score_cols: Scoring columns (score_cols_for(cols) if None)
+        to_move: Side to move
+        ply: Plies played so far
+        clocks: Remaining seconds per side (TIME_PER_PLAYER each if None)
+    """
+
+    def __init__(self, board:List[List[Optional[Piece]]], rows:int, cols:int, score_cols:Optional[List[int]]=None,
+                 to_move:str="circle", ply:int=0, clocks:Optional[Dict[str,float]]=None):
+        self.board = board
+        self.rows, self.cols = rows, cols
+        self.score_cols = list(score_cols) if score_cols is not None else score_cols_for(cols)
+        self.geo = board_geometry(rows, cols, self.score_cols)
+        self.to_move = to_move
+        self.ply = ply
+        self.clocks = dict(clocks) if clocks else {"circle": float(TIME_PER_PLAYER), "square": float(TIME_PER_PLAYER)}
+        self.index = PieceIndex(board)
+        self._cache:Dict[Any,Any] = {}
+
+    def apply(self, move:Dict[str,Any], trusted:bool=False) -> Tuple[bool,str]:
+        """validate_and_apply_move for the side to move; the side to move stays (see next_turn)."""
+        ok, info = validate_and_apply_move(self.board, move, self.to_move, self.rows, self.cols, self.score_cols,
+                                           trusted, pieces=self.index)
+        if ok:
+            self._cache.clear()
+        return ok, info
+
+    def next_turn(self) -> None:
+        """Hand the move to the other side (after a move, a pass or a rejected move)."""
+        self.to_move = opponent(self.to_move)
+        self.ply += 1
+
+    def invalidate(self) -> None:
+        """Forget all derived data and re-index the board (after editing it directly)."""
+        self.index = PieceIndex(self.board)
+        self._cache.clear()
+
+    def copy(self) -> "GameState":
+        """Independent state on a copy of the board (the cache starts empty)."""
+        return GameState(copy_board(self.board), self.rows, self.cols, self.score_cols, self.to_move, self.ply, self.clocks)
+
+    @property
+    def position_hash(self) -> int:
+        return self._cached("hash", lambda: position_hash(self.board, self.rows, self.cols))
+
+    @property
+    def key(self) -> int:
+        """position_hash with the side to move folded in (repetition and table key)."""
+        return self.position_hash ^ (SIDE_TO_MOVE_KEY if self.to_move == "square" else 0)
+
+    @property
+    def winner(self) -> Optional[str]:
+        return self._cached("winner", lambda: check_win(self.board, self.rows, self.cols, self.score_cols))
+
+    def legal_moves(self, player:Optional[str]=None) -> List[Dict[str,Any]]:
+        """generate_legal_moves for player (default: side to move), with trusted-move tokens."""
+        player = player or self.to_move
+        return self._cached(("moves", player), lambda: generate_legal_moves(
+            self.board, player, self.rows, self.cols, self.score_cols, tokens=True, pieces=self.index))
+
+    def pieces(self, owner:str) -> List[Tuple[int,int]]:
+        """Cells of owner's pieces, in row-major order."""
+        return self._cached(("pieces", owner), lambda: self.index.owned(owner))
+
+    def scoring_pieces(self, player:str) -> int:
+        """count_scoring_pieces (n)."""
+        return self._cached(("n", player), lambda: count_scoring_pieces(
+            self.board, player, self.rows, self.cols, self.score_cols, self.index))
+
+    def reachable_in_one(self, player:str) -> int:
+        """count_reachable_in_one (m)."""
+        return self._cached(("m", player), lambda: count_reachable_in_one(
+            self.board, player, self.rows, self.cols, self.score_cols, self.index))
+
+    def scoring_counts(self, player:str) -> Tuple[int,int]:
+        """(n, m) as used by compute_final_scores and the Adjudicator."""
+        return self.scoring_pieces(player), self.reachable_in_one(player)
+
+    def river_components(self, player:str) -> List[frozenset]:
+        """
+        Groups of river cells (any owner) that a piece of player can flow through in one
+        move: two rivers are joined when one's flow reaches the other across empty cells.
+        """
+        return self._cached(("rivers", player), lambda: self._find_river_components(player))
+
+    # ---------- internals ----------
+
+    def _cached(self, key, compute):
+        cache = self._cache
+        if key not in cache:
+            cache[key] = compute()
+        return cache[key]
+
+    def _find_river_components(self, player:str) -> List[frozenset]:
+        board, rays = self.board, self.geo.rays[player]
+        parent:Dict[Tuple[int,int],Tuple[int,int]] = {}
+
+        def root(c):
+            while parent[c] != c:
+                parent[c] = parent[parent[c]]
+                c = parent[c]
+            return c
+
+        rivers = sorted(self.index.rivers["circle"] | self.index.rivers["square"], key=_row_major)
+        for c in rivers:
+            parent[c] = c
+        for x,y in rivers:
+            dirs = _HORIZONTAL_DIRS if board[y][x].orientation == "horizontal" else _VERTICAL_DIRS
+            for d in dirs:
+                for nx,ny in rays[y][x][d]:
+                    nxt = board[ny][nx]
+                    if nxt is None:
+                        continue
+                    if nxt.side == "river":
+                        parent[root((nx,ny))] = root((x,y))
+                    break
+        groups:Dict[Tuple[int,int],List[Tuple[int,int]]] = {}
+        for c in rivers:
+            groups.setdefault(root(c), []).append(c)
+        return [frozenset(cells) for cells in groups.values()]
+
 # ---------------- ASCII for CLI ----------------
 def board_to_ascii(board:List[List[Optional[Piece]]], rows:int, cols:int, score_cols:List[int]) -> str:
     """Enhanced ASCII representation with better visualization."""
@@ -552,188 +1131,624 @@ def board_to_ascii(board:List[List[Optional[Piece]]], rows:int, cols:int, score_
     
     return result + legend
 
+# ---------------- Adjudication ----------------
+# Optional rules that end a dead game before the turn limit. A verdict's winner (None for
+# a draw) goes through compute_final_scores like any other result.
+class Adjudicator:
+    """
+    Tracks the positions of one game and decides when it may be ended early.
+
+    Args:
+        rows, cols, score_cols: Board geometry
+        repetitions: Draw when a position (with the same side to move) occurs this often; 0 = off
+        quiet_plies: Draw after this many plies without any change to count_scoring_pieces or
+            count_reachable_in_one for either player; 0 = off
+        resign_margin: The trailing side resigns when the leader's (n + m/10) margin, the
+            quantity compute_final_scores uses, is at least this; 0 = off
+        resign_plies: Consecutive plies the margin must hold before the resignation
+    """
+
+    def __init__(self, rows:int, cols:int, score_cols:List[int], repetitions:int=0, quiet_plies:int=0,
+                 resign_margin:float=0.0, resign_plies:int=1):
+        self.rows, self.cols, self.score_cols = rows, cols, score_cols
+        self.repetitions = repetitions
+        self.quiet_plies = quiet_plies
+        self.resign_margin = resign_margin
+        self.resign_plies = max(1, resign_plies)
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.repetitions or self.quiet_plies or self.resign_margin)
+
+    def reset(self) -> None:
+        self.history:Dict[int,int] = {}
+        self.plies = 0
+        self._last_key = None
+        self._progress = None
+        self._quiet = 0
+        self._leader = None
+        self._leading = 0
+
+    def record(self, board:List[List[Optional[Piece]]], to_move:str,
+               state:Optional["GameState"]=None) -> Optional[Dict[str,Any]]:
+        """
+        Record the position with to_move to play; call it once the previous ply is on the board.
+        Returns {"winner": side or None, "reason": text} if the game should end, else None.
+        Calling it again for the same position (a re-prompt, a redrawn frame) is a no-op.
+        With the position's GameState its cached hash and scoring counts are used.
+        """
+        if not self.enabled:
+            return None
+        if state is not None:
+            key = state.key
+        else:
+            key = position_hash(board, self.rows, self.cols) ^ (SIDE_TO_MOVE_KEY if to_move == "square" else 0)
+        if key == self._last_key:
+            return None
+        if self._last_key is not None:
+            self.plies += 1
+        self._last_key = key
+        count = self.history[key] = self.history.get(key, 0) + 1
+        if self.repetitions and count >= self.repetitions:
+            return {"winner": None, "reason": f"position repeated {count} times"}
+        if not (self.quiet_plies or self.resign_margin):
+            return None
+
+        if state is not None:
+            n = {p: state.scoring_pieces(p) for p in ("circle", "square")}
+            m = {p: state.reachable_in_one(p) for p in ("circle", "square")}
+        else:
+            n = {p: count_scoring_pieces(board, p, self.rows, self.cols, self.score_cols) for p in ("circle", "square")}
+            m = {p: count_reachable_in_one(board, p, self.rows, self.cols, self.score_cols) for p in ("circle", "square")}
+        progress = (n["circle"], m["circle"], n["square"], m["square"])
+        self._quiet = self._quiet + 1 if progress == self._progress else 0
+        self._progress = progress
+        if self.quiet_plies and self._quiet >= self.quiet_plies:
+            return {"winner": None, "reason": f"no scoring progress in {self._quiet} plies"}
+
+        if self.resign_margin:
+            margin = (n["circle"] + m["circle"] / 10.0) - (n["square"] + m["square"] / 10.0)
+            leader = ("circle" if margin > 0 else "square") if abs(margin) >= self.resign_margin else None
+            self._leading = self._leading + 1 if leader is not None and leader == self._leader else 1
+            self._leader = leader
+            if leader is not None and self._leading >= self.resign_plies:
+                return {"winner": leader, "reason": f"{opponent(leader).title()} resigns (margin {abs(margin):.1f})"}
+        return None
+
+# ---------------- Agent hooks ----------------
+# Optional agent methods, looked up with getattr so any object with choose() can play.
+def notify_opponent_moved(agent, move:Dict[str,Any]) -> None:
+    """Tell agent which move its opponent just played."""
+    hook = getattr(agent, "opponent_moved", None)
+    if hook: hook(move)
+
+def agent_stats(agent) -> Optional[Dict[str,Any]]:
+    """Search statistics of agent's last choose() (e.g. {"nodes": ...}), if it reports any."""
+    stats = getattr(agent, "last_stats", None)
+    return dict(stats) if stats else None
+
+def close_agents(*agents) -> None:
+    """Let agents release background workers at the end of a game."""
+    for agent in agents:
+        close = getattr(agent, "close", None)
+        if close: close()
+
+# ---------------- Game driver ----------------
+# The one copy of the turn loop: clocks, win/timeout checks, adjudication and the turn
+# limit. Front ends (CLI, GUI, batch runners, loggers) only consume its events.
+class MoveWorker:
+    """
+    One agent choose() running on a daemon thread, so that a front end stays responsive
+    while the agent thinks. The agent searches its own copy of the board. done, elapsed()
+    and progress() may be polled from the front end's thread; interrupt() asks the agent
+    to move now. Agents opt in to the last two with progress() and interrupt() methods.
+    """
+
+    def __init__(self, agent, board:List[List[Optional[Piece]]], rows:int, cols:int, score_cols:List[int],
+                 current_player_time:float, opponent_time:float):
+        self.agent = agent
+        self.move:Optional[Dict[str,Any]] = None
+        self.error:Optional[BaseException] = None
+        self._args = (copy_board(board), rows, cols, score_cols, current_player_time, opponent_time)
+        self._start = time.perf_counter()
+        self._end:Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name=f"choose-{getattr(agent, 'player', '')}", daemon=True)
+        self._thread.start()
+
+    @property
+    def done(self) -> bool:
+        return not self._thread.is_alive()
+
+    def elapsed(self) -> float:
+        """Seconds the agent has been thinking (its total once done)."""
+        return (self._end if self._end is not None else time.perf_counter()) - self._start
+
+    def progress(self) -> Optional[Dict[str,Any]]:
+        """The agent's live report, e.g. {"move": best so far, "depth": ...}; None if it gives none."""
+        report = getattr(self.agent, "progress", None)
+        return report() if report else None
+
+    def interrupt(self) -> None:
+        """Ask the agent to return its best move so far (ignored by agents without interrupt())."""
+        stop = getattr(self.agent, "interrupt", None)
+        if stop and not self.done: stop()
+
+    def wait(self, timeout:Optional[float]=None) -> bool:
+        """Wait up to timeout seconds for choose() to return; True if it has."""
+        self._thread.join(timeout)
+        return self.done
+
+    def result(self) -> Tuple[Optional[Dict[str,Any]],float]:
+        """Wait for choose(): (move, thinking seconds); re-raises what choose() raised."""
+        self._thread.join()
+        if self.error is not None:
+            raise self.error
+        return self.move, self.elapsed()
+
+    # ---------- internals ----------
+
+    def _run(self) -> None:
+        try:
+            self.move = self.agent.choose(*self._args)
+        except BaseException as e:
+            self.error = e
+        finally:
+            self._end = time.perf_counter()
+
+class Game:
+    """
+    Drives one game and reports it as a stream of event dicts.
+
+    Args:
+        agents: {"circle": agent or None, "square": agent or None}; None is a human player
+        rows, cols: Board dimensions
+        time_per_player: Clock of each player in seconds
+        board: Start position (default_start_board if None)
+        first: Side to move first
+        max_turns: The game is drawn once more than this many plies were played
+        adjudication: Keyword arguments for Adjudicator (repetition / early-end rules)
+        threaded: Run AI moves on a MoveWorker thread and report each one with a
+            "thinking" event first (for front ends that keep drawing meanwhile)
+        instruments: Instrumentation wrapped around the agents' choose() (profiling,
+            memtrack); see below
+
+    The position lives in game.state (a GameState); board, current, turn and timers are
+    views of it. play() is a generator. Every event has "type", "turn" and "player" (the side to move)
+    plus the fields below:
+        start         timers
+        turn          timers                      a ply is about to be played
+        thinking      worker, timers              threaded only: an AI is choosing on worker (a
+                                                  MoveWorker); next() waits for its move
+        request_move  timers                      a human must move: send() the move dict
+                                                  (None quits); other events use next()
+        clock         elapsed, timers, stats      thinking time (time.perf_counter) was charged to
+                                                  player; stats is agent_stats() of an AI, else None
+        move          move, info, validate_seconds
+                                                  the move was applied to game.board (every
+                                                  move is fully validated; tokens are ignored)
+        invalid       move, info, validate_seconds
+                                                  rejected; an AI loses its turn, a human is asked again
+        pass          -                           the AI had no move
+        win / timeout / adjudicated / turn_limit / quit
+                      winner (, reason)           the game is over
+        end           winner, reason, scores      final scores from compute_final_scores
+
+    Batch runs with AI players only can simply iterate: for event in game.play(): ...
+    An instrument with an overhead_seconds(agent) method (memtrack.AllocationTracker) reports
+    its own time inside the agent's last choose(); that time is not charged to the clock.
+    Only the instruments passed here are asked, never the agent itself.
+    """
+
+    def __init__(self, agents:Dict[str,Any], rows:int, cols:int, time_per_player:float,
+                 board:Optional[List[List[Optional[Piece]]]]=None, first:str="circle", max_turns:int=1000,
+                 adjudication:Optional[Dict[str,Any]]=None, threaded:bool=False, instruments=()):
+        self.agents = agents
+        self.threaded = threaded
+        self._overheads = [i.overhead_seconds for i in instruments if hasattr(i, "overhead_seconds")]
+        self.rows, self.cols = rows, cols
+        self.score_cols = score_cols_for(cols)
+        self.state = GameState(board if board is not None else default_start_board(rows, cols), rows, cols,
+                               self.score_cols, first, 0, {"circle": time_per_player, "square": time_per_player})
+        self.max_turns = max_turns
+        self.adjudicator = Adjudicator(rows, cols, self.score_cols, **(adjudication or {}))
+        self.winner:Optional[str] = None
+        self.scores:Optional[Dict[str,float]] = None
+
+    @property
+    def board(self) -> List[List[Optional[Piece]]]:
+        return self.state.board
+
+    @property
+    def current(self) -> str:
+        return self.state.to_move
+
+    @property
+    def turn(self) -> int:
+        return self.state.ply
+
+    @property
+    def timers(self) -> Dict[str,float]:
+        return self.state.clocks
+
+    def is_human(self, player:str) -> bool:
+        return self.agents.get(player) is None
+
+    def play(self) -> Iterator[Dict[str,Any]]:
+        board, rows, cols, score_cols = self.board, self.rows, self.cols, self.score_cols
+        yield self._event("start", timers=dict(self.timers))
+        while True:
+            over = self._game_over()
+            if over is not None:
+                self.winner = over["winner"]
+                yield over
+                break
+            yield self._event("turn", timers=dict(self.timers))
+
+            player, other = self.current, opponent(self.current)
+            agent = self.agents.get(player)
+            if agent is not None:
+                if self.threaded:
+                    worker = MoveWorker(agent, board, rows, cols, score_cols, self.timers[player], self.timers[other])
+                    yield self._event("thinking", worker=worker, timers=dict(self.timers))
+                    move, elapsed = worker.result()
+                else:
+                    start = time.perf_counter()
+                    move = agent.choose(board, rows, cols, score_cols, self.timers[player], self.timers[other])
+                    elapsed = time.perf_counter() - start
+                for overhead in self._overheads:
+                    elapsed -= overhead(agent)
+                yield self._charge(elapsed, agent_stats(agent))
+                if self.timers[player] <= 0:
+                    self.winner = other
+                    yield self._event("timeout", winner=other)
+                    break
+                if move is None:
+                    yield self._event("pass")
+                else:
+                    ok, info, spent = self._apply(move)
+                    if ok:
+                        notify_opponent_moved(self.agents.get(other), move)
+                    yield self._event("move" if ok else "invalid", move=move, info=info, validate_seconds=spent)
+            else:
+                while True:
+                    start = time.perf_counter()
+                    move = yield self._event("request_move", timers=dict(self.timers))
+                    yield self._charge(time.perf_counter() - start)
+                    if self.timers[player] <= 0 or move is None:
+                        break
+                    ok, info, spent = self._apply(move)
+                    if ok:
+                        notify_opponent_moved(self.agents.get(other), move)
+                        yield self._event("move", move=move, info=info, validate_seconds=spent)
+                        break
+                    yield self._event("invalid", move=move, info=info, validate_seconds=spent)
+                if self.timers[player] <= 0:
+                    self.winner = other
+                    yield self._event("timeout", winner=other)
+                    break
+                if move is None:
+                    yield self._event("quit", winner=None)
+                    break
+
+            self.state.next_turn()
+
+        self.scores = compute_final_scores(board, self.winner, rows, cols, score_cols, remaining_times=dict(self.timers),
+                                           counts=self.state.scoring_counts)
+        yield self._event("end", winner=self.winner, scores=self.scores, timers=dict(self.timers))
+
+    # ---------- internals ----------
+
+    def _event(self, kind:str, **fields) -> Dict[str,Any]:
+        return dict(type=kind, turn=self.turn, player=self.current, **fields)
+
+    def _charge(self, elapsed:float, stats:Optional[Dict[str,Any]]=None) -> Dict[str,Any]:
+        self.timers[self.current] -= elapsed
+        return self._event("clock", elapsed=elapsed, timers=dict(self.timers), stats=stats)
+
+    def _apply(self, move:Dict[str,Any]) -> Tuple[bool,str,float]:
+        """validate_and_apply_move for the side to move, plus the seconds it took."""
+        start = time.perf_counter()
+        # Players' moves always get the full checks: a trusted-move token on one is dropped
+        ok, info = self.state.apply(display_move(move))
+        return ok, info, time.perf_counter() - start
+
+    def _game_over(self) -> Optional[Dict[str,Any]]:
+        """The event ending the game before the next ply, if any."""
+        w = self.state.winner
+        if w:
+            return self._event("win", winner=w)
+        c, s = self.timers["circle"], self.timers["square"]
+        if c <= 0 or s <= 0:
+            winner = None if (c <= 0 and s <= 0) else ("square" if c <= 0 else "circle")
+            return self._event("timeout", winner=winner)
+        verdict = self.adjudicator.record(self.board, self.current, self.state)
+        if verdict:
+            return self._event("adjudicated", winner=verdict["winner"], reason=verdict["reason"])
+        if self.turn > self.max_turns:
+            return self._event("turn_limit", winner=None)
+        return None
+
 # ---------------- GUI rendering & loop ----------------
-if pygame:
-    pygame.init()
-    FONT = pygame.font.SysFont("arial", 14)
-    BIGFONT = pygame.font.SysFont("arial", 18)
+FONT = BIGFONT = None
+
+def load_pygame() -> bool:
+    """Import and initialise pygame and the GUI fonts; False if pygame is not available."""
+    global pygame, FONT, BIGFONT
+    if pygame is None:
+        try:
+            import pygame as _pygame
+        except Exception:
+            return False
+        pygame = _pygame
+        pygame.init()
+        FONT = pygame.font.SysFont("arial", 14)
+        BIGFONT = pygame.font.SysFont("arial", 18)
+    return True
+
+def create_agents(players:Dict[str,str], circle_strategy:str, square_strategy:str, ponder:bool=False):
+    """Agents for the AI players (None for humans); the factory and agent modules load here."""
+    from agent import get_agent
+    agent_circle = get_agent("circle", circle_strategy, ponder=ponder) if players["circle"]=="ai" else None
+    agent_square = get_agent("square", square_strategy, ponder=ponder) if players["square"]=="ai" else None
+    return agent_circle, agent_square
+
+def create_metrics(players:Dict[str,str], circle_strategy:str, square_strategy:str):
+    """metrics.MoveMetrics labelled with each side's strategy (or "human")."""
+    from metrics import MoveMetrics
+    return MoveMetrics({"circle": circle_strategy if players["circle"]=="ai" else "human",
+                        "square": square_strategy if players["square"]=="ai" else "human"})
+
+CONTROLS = (
+    "Controls:",
+    "M - Move mode",
+    "P - Push mode",
+    "F - Flip (stone ↔ river)",
+    "R - Rotate river",
+    "ESC - Cancel",
+    "S - Save game",
+    "Space - AI: move now",
+)
+_REACH = CELL//2 + 4   # half-size of the square a cell's piece and rings are drawn in
+_SPRITES:Dict[Tuple[str,str,Optional[str]],Any] = {}
+
+def piece_sprite(p:Piece):
+    """Pre-rendered CELL x CELL image of a piece (with its shadow), one per owner/side/orientation."""
+    key = (p.owner, p.side, p.orientation if p.side == "river" else None)
+    sprite = _SPRITES.get(key)
+    if sprite is None:
+        sprite = _SPRITES[key] = _render_piece(*key)
+    return sprite
+
+def _render_piece(owner:str, side:str, orientation:Optional[str]):
+    s = pygame.Surface((CELL, CELL), pygame.SRCALPHA)
+    cx = cy = CELL//2
+    color = CIRCLE_COLOR if owner=="circle" else SQUARE_COLOR
+
+    # Subtle shadow effect
+    pygame.draw.circle(s, SHADOW_COLOR, (cx + 1, cy + 1), CELL//2 - 4)
+
+    # Outer colored ring (thinner)
+    pygame.draw.circle(s, color, (cx, cy), CELL//2 - 4, 3)
+
+    # Larger white inner circle for all pieces
+    pygame.draw.circle(s, STONE_FILL, (cx, cy), CELL//2 - 8)
+
+    if side == "stone":
+        # Stone appearance with subtle colored border around larger white center
+        pygame.draw.circle(s, color, (cx, cy), CELL//2 - 8, 2)
+        # Small center dot for stone identification
+        pygame.draw.circle(s, color, (cx, cy), 3)
+    else:
+        # River appearance - thin rivers inside the larger white circle
+        river_color = RIVER_FILL_CIRCLE if owner == "circle" else RIVER_FILL_SQUARE
+        river_width = 3  # Thinner river
+        river_length = CELL - 20  # Fits inside larger white circle
+        arrow_size = 2
+        if orientation == "horizontal":
+            river_rect = pygame.Rect(cx - river_length//2, cy - river_width//2, river_length, river_width)
+            pygame.draw.rect(s, river_color, river_rect, border_radius=1)
+            # Subtle flow direction indicators, pointing right
+            for i in range(2):
+                arrow_x = cx - river_length//2 + 8 + i * (river_length - 16)
+                pygame.draw.polygon(s, river_color, [(arrow_x, cy - arrow_size), (arrow_x + arrow_size, cy),
+                                                     (arrow_x, cy + arrow_size)])
+        else:
+            river_rect = pygame.Rect(cx - river_width//2, cy - river_length//2, river_width, river_length)
+            pygame.draw.rect(s, river_color, river_rect, border_radius=1)
+            # Subtle flow direction indicators, pointing down
+            for i in range(2):
+                arrow_y = cy - river_length//2 + 8 + i * (river_length - 16)
+                pygame.draw.polygon(s, river_color, [(cx - arrow_size, arrow_y), (cx, arrow_y + arrow_size),
+                                                     (cx + arrow_size, arrow_y)])
+    return s
+
+class BoardRenderer:
+    """
+    Draws the GUI window incrementally. The static parts (board, score areas, grid points)
+    are rendered once to a background surface, pieces are cached sprites and the text
+    panels are surfaces re-rendered only when their text changes. draw() repaints just
+    the cells passed to touch() (e.g. the cells of the last move) or whose highlight or
+    selection changed, and the panels whose text changed (the clocks once a second), and
+    updates only those rectangles of the display; an idle frame costs next to nothing.
+    Every repaint is clipped and layered like a full redraw, so the picture is the same.
+    """
+
+    def __init__(self, screen, rows:int, cols:int, score_cols:List[int]):
+        self.screen = screen
+        self.rows, self.cols, self.score_cols = rows, cols, score_cols
+        self.background = self._render_background()
+        w = screen.get_width()
+        self._panels:Dict[str,Any] = {}   # name -> (rect, surface, content); drawn in insertion order
+        self._set_panel("msg", pygame.Rect(10, rows*CELL + MARGIN + 10, w-20, 35), None)
+        self._set_panel("clock", pygame.Rect(10, 5, 250, 70), None)
+        self._set_panel("controls", pygame.Rect(w-180, 5, 170, len(CONTROLS)*20 + 10), CONTROLS)
+        self._board = None
+        self._selected:Optional[Tuple[int,int]] = None
+        self._highlights:set = set()
+        self._touched:set = set()
+        self._full = True
+
+    def touch(self, cells) -> None:
+        """Repaint these cells (x,y) on the next draw(), e.g. move_cells_touched() of a move just applied."""
+        self._touched.update(cells)
+
+    def invalidate(self) -> None:
+        """Repaint the whole window on the next draw() (first frame, window exposed)."""
+        self._full = True
+
+    def draw(self, board, selected, highlights, msg, timers, current) -> List[Any]:
+        """Bring the window up to date; returns the rectangles that were repainted."""
+        self._board = board
+        highlights = set(highlights)
+        cells = self._touched | (highlights ^ self._highlights)
+        if selected != self._selected:
+            cells.update(c for c in (selected, self._selected) if c)
+        self._touched = set(); self._highlights = highlights; self._selected = selected
+
+        dirty = []
+        if self._set_panel("msg", None, msg):
+            dirty.append(self._panels["msg"][0])
+        if self._set_panel("clock", None, (format_time(timers['circle']), format_time(timers['square']), current)):
+            dirty.append(self._panels["clock"][0])
+        if self._full:
+            self._full = False
+            dirty = [self.screen.get_rect()]
+        else:
+            dirty += [self._cell_rect(x, y) for x,y in cells if in_bounds(x, y, self.rows, self.cols)]
+        for rect in dirty:
+            self._repaint(rect)
+        if dirty:
+            pygame.display.update(dirty)
+        return dirty
+
+    # ---------- internals ----------
+
+    def _cell_rect(self, x:int, y:int):
+        return pygame.Rect(MARGIN + x*CELL - _REACH, MARGIN + y*CELL - _REACH, 2*_REACH, 2*_REACH)
+
+    def _repaint(self, rect) -> None:
+        """Redraw everything inside rect, in full-redraw order: background, rings, pieces, panels."""
+        screen, board = self.screen, self._board
+        screen.set_clip(rect)
+        screen.blit(self.background, rect, rect)
+        x0 = max(0, (rect.left - MARGIN - _REACH)//CELL); x1 = min(self.cols - 1, (rect.right - MARGIN + _REACH)//CELL)
+        y0 = max(0, (rect.top - MARGIN - _REACH)//CELL); y1 = min(self.rows - 1, (rect.bottom - MARGIN + _REACH)//CELL)
+        near = [(x, y) for y in range(y0, y1 + 1) for x in range(x0, x1 + 1)]
+        # Subtle highlight rings, then the selection ring, under the pieces
+        for hx,hy in self._highlights:
+            if x0 <= hx <= x1 and y0 <= hy <= y1:
+                pygame.draw.circle(screen, HIGHLIGHT, (MARGIN + hx*CELL, MARGIN + hy*CELL), 24, 2)
+        if self._selected:
+            sx, sy = self._selected
+            pygame.draw.circle(screen, SELECTED_COLOR, (MARGIN + sx*CELL, MARGIN + sy*CELL), 26, 3)
+        if board is not None:
+            for x,y in near:
+                p = board[y][x]
+                if p:
+                    screen.blit(piece_sprite(p), (MARGIN + x*CELL - CELL//2, MARGIN + y*CELL - CELL//2))
+        for panel_rect, surface, _ in self._panels.values():
+            if surface is not None and panel_rect.colliderect(rect):
+                screen.blit(surface, panel_rect)
+        screen.set_clip(None)
+
+    def _set_panel(self, name:str, rect, content) -> bool:
+        """Re-render a text panel if its content changed; True if it did."""
+        old_rect, surface, old = self._panels.get(name, (rect, None, None))
+        if surface is not None and content == old:
+            return False
+        rect = rect or old_rect
+        self._panels[name] = (rect, self._render_panel(name, rect, content) if content is not None else None, content)
+        return True
+
+    def _render_panel(self, name:str, rect, content):
+        s = pygame.Surface(rect.size, pygame.SRCALPHA)
+        pygame.draw.rect(s, (0, 0, 0), s.get_rect(), border_radius=5)
+        if name == "msg":
+            s.blit(BIGFONT.render(content, True, (255, 255, 255)), (10, 8))   # White text
+        elif name == "clock":
+            circle_time, square_time, current = content
+            turn_color = CIRCLE_COLOR if current == "circle" else SQUARE_COLOR
+            s.blit(FONT.render(f"Circle: {circle_time}", True, CIRCLE_COLOR), (10, 10))
+            s.blit(FONT.render(f"Square: {square_time}", True, SQUARE_COLOR), (10, 30))
+            s.blit(BIGFONT.render(f"Turn: {current.title()}", True, turn_color), (10, 50))
+        else:
+            for i, line in enumerate(content):
+                font = BIGFONT if i == 0 else FONT
+                s.blit(font.render(line, True, (255, 255, 255)), (5, 10 + i*20))   # White text for all instructions
+        return s
+
+    def _render_background(self):
+        rows, cols = self.rows, self.cols
+        bg = pygame.Surface(self.screen.get_size())
+        bg.fill(BG)
+
+        # Draw background with gradient effect
+        board_rect = pygame.Rect(MARGIN-30, MARGIN-30, cols*CELL+60, rows*CELL+60)
+        pygame.draw.rect(bg, BOARD_COLOR, board_rect, border_radius=15)
+
+        # Add subtle border
+        pygame.draw.rect(bg, GRID_COLOR, board_rect, 3, border_radius=15)
+
+        # Scoring areas with subtle design: Circle's at the top, Square's at the bottom
+        for row, color in ((top_score_row(), CIRCLE_COLOR), (bottom_score_row(rows), SQUARE_COLOR)):
+            for x in self.score_cols:
+                r = pygame.Rect(MARGIN + x*CELL - CELL//2, MARGIN + row*CELL - CELL//2, CELL, CELL)
+                # Subtle background
+                s = pygame.Surface((r.w, r.h), pygame.SRCALPHA)
+                s.fill((*color, 20))
+                bg.blit(s, r.topleft)
+                # Subtle border
+                pygame.draw.rect(bg, color, r, 2, border_radius=8)
+
+        # Draw subtle grid points
+        for y in range(rows):
+            for x in range(cols):
+                cx = MARGIN + x*CELL; cy = MARGIN + y*CELL
+                # Smaller, subtle grid points
+                pygame.draw.circle(bg, GRID_COLOR, (cx,cy), 3)
+                pygame.draw.circle(bg, BG, (cx,cy), 1)
+        return bg
 
 def draw_board(screen, board, rows, cols, score_cols, selected, highlights, msg, timers, current):
-    screen.fill(BG)
-    
-    # Draw background with gradient effect
-    board_rect = pygame.Rect(MARGIN-30, MARGIN-30, cols*CELL+60, rows*CELL+60)
-    pygame.draw.rect(screen, BOARD_COLOR, board_rect, border_radius=15)
-    
-    # Add subtle border
-    pygame.draw.rect(screen, GRID_COLOR, board_rect, 3, border_radius=15)
-    
-    # Draw scoring areas with subtle design
-    top = top_score_row(); bot = bottom_score_row(rows)
-    
-    # Circle's scoring area (top) - subtle design
-    for x in score_cols:
-        r = pygame.Rect(MARGIN + x*CELL - CELL//2, MARGIN + top*CELL - CELL//2, CELL, CELL)
-        # Subtle background
-        s = pygame.Surface((r.w, r.h), pygame.SRCALPHA)
-        s.fill((*CIRCLE_COLOR, 20))
-        screen.blit(s, r.topleft)
-        # Subtle border
-        pygame.draw.rect(screen, CIRCLE_COLOR, r, 2, border_radius=8)
-    
-    # Square's scoring area (bottom) - subtle design
-    for x in score_cols:
-        r = pygame.Rect(MARGIN + x*CELL - CELL//2, MARGIN + bot*CELL - CELL//2, CELL, CELL)
-        # Subtle background
-        s = pygame.Surface((r.w, r.h), pygame.SRCALPHA)
-        s.fill((*SQUARE_COLOR, 20))
-        screen.blit(s, r.topleft)
-        # Subtle border
-        pygame.draw.rect(screen, SQUARE_COLOR, r, 2, border_radius=8)
-
-    # Draw subtle grid points
-    for y in range(rows):
-        for x in range(cols):
-            cx = MARGIN + x*CELL; cy = MARGIN + y*CELL
-            # Smaller, subtle grid points
-            pygame.draw.circle(screen, GRID_COLOR, (cx,cy), 3)
-            pygame.draw.circle(screen, BG, (cx,cy), 1)
-
-    # Draw subtle highlights
-    for hx,hy in highlights:
-        center = (MARGIN + hx*CELL, MARGIN + hy*CELL)
-        # Subtle highlight ring
-        pygame.draw.circle(screen, HIGHLIGHT, center, 24, 2)
-
-    # Draw subtle selection indicator
-    if selected:
-        sx, sy = selected
-        center = (MARGIN + sx*CELL, MARGIN + sy*CELL)
-        # Subtle selection ring
-        pygame.draw.circle(screen, SELECTED_COLOR, center, 26, 3)
-
-    # Draw pieces with larger white centers and subtle design
-    for y in range(rows):
-        for x in range(cols):
-            p = board[y][x]
-            if not p: continue
-            cx = MARGIN + x*CELL; cy = MARGIN + y*CELL
-            color = CIRCLE_COLOR if p.owner=="circle" else SQUARE_COLOR
-            
-            # Subtle shadow effect
-            shadow_surf = pygame.Surface((CELL, CELL), pygame.SRCALPHA)
-            pygame.draw.circle(shadow_surf, SHADOW_COLOR, (CELL//2 + 1, CELL//2 + 1), CELL//2 - 4)
-            screen.blit(shadow_surf, (cx - CELL//2, cy - CELL//2))
-            
-            # Outer colored ring (thinner)
-            pygame.draw.circle(screen, color, (cx, cy), CELL//2 - 4, 3)
-            
-            # Larger white inner circle for all pieces
-            pygame.draw.circle(screen, STONE_FILL, (cx, cy), CELL//2 - 8)
-            
-            if p.side == "stone":
-                # Stone appearance with subtle colored border around larger white center
-                pygame.draw.circle(screen, color, (cx, cy), CELL//2 - 8, 2)
-                # Small center dot for stone identification
-                pygame.draw.circle(screen, color, (cx, cy), 3)
-            else:
-                # River appearance - thin rivers inside the larger white circle
-                river_color = RIVER_FILL_CIRCLE if p.owner == "circle" else RIVER_FILL_SQUARE
-                
-                if p.orientation == "horizontal":
-                    # Thin horizontal river inside larger white circle
-                    river_width = 3  # Thinner river
-                    river_length = CELL - 20  # Fits inside larger white circle
-                    river_rect = pygame.Rect(cx - river_length//2, cy - river_width//2, river_length, river_width)
-                    pygame.draw.rect(screen, river_color, river_rect, border_radius=1)
-                    
-                    # Subtle flow direction indicators
-                    arrow_size = 2
-                    for i in range(2):
-                        arrow_x = cx - river_length//2 + 8 + i * (river_length - 16) // 1
-                        # Small arrow pointing right
-                        pygame.draw.polygon(screen, river_color, [
-                            (arrow_x, cy - arrow_size),
-                            (arrow_x + arrow_size, cy),
-                            (arrow_x, cy + arrow_size)
-                        ])
-                else:
-                    # Thin vertical river inside larger white circle
-                    river_width = 3  # Thinner river
-                    river_length = CELL - 20  # Fits inside larger white circle
-                    river_rect = pygame.Rect(cx - river_width//2, cy - river_length//2, river_width, river_length)
-                    pygame.draw.rect(screen, river_color, river_rect, border_radius=1)
-                    
-                    # Subtle flow direction indicators
-                    arrow_size = 2
-                    for i in range(2):
-                        arrow_y = cy - river_length//2 + 8 + i * (river_length - 16) // 1
-                        # Small arrow pointing down
-                        pygame.draw.polygon(screen, river_color, [
-                            (cx - arrow_size, arrow_y),
-                            (cx, arrow_y + arrow_size),
-                            (cx + arrow_size, arrow_y)
-                        ])
-
-    # Improved message display with background
-    msg_bg_rect = pygame.Rect(10, rows*CELL + MARGIN + 10, screen.get_width()-20, 35)
-    pygame.draw.rect(screen, (0,0,0,150), msg_bg_rect, border_radius=5)
-    msg_surf = BIGFONT.render(msg, True, (255, 255, 255))  # White text
-    screen.blit(msg_surf, (20, rows*CELL + MARGIN + 18))
-    
-    # Improved timer display
-    timer_bg = pygame.Rect(10, 5, 250, 70)
-    pygame.draw.rect(screen, (0,0,0,150), timer_bg, border_radius=5)
-    
-    t1 = FONT.render(f"Circle: {format_time(timers['circle'])}", True, CIRCLE_COLOR)
-    t2 = FONT.render(f"Square: {format_time(timers['square'])}", True, SQUARE_COLOR)
-    turn_color = CIRCLE_COLOR if current == "circle" else SQUARE_COLOR
-    turn = BIGFONT.render(f"Turn: {current.title()}", True, turn_color)
-    
-    screen.blit(t1, (20, 15))
-    screen.blit(t2, (20, 35))
-    screen.blit(turn, (20, 55))
-    
-    # Add game instructions in corner
-    instructions = [
-        "Controls:",
-        "M - Move mode",
-        "P - Push mode", 
-        "F - Flip (stone ↔ river)",
-        "R - Rotate river",
-        "ESC - Cancel",
-        "S - Save game"
-    ]
-    
-    inst_bg = pygame.Rect(screen.get_width()-180, 5, 170, len(instructions)*20 + 10)
-    pygame.draw.rect(screen, (0,0,0,120), inst_bg, border_radius=5)
-    
-    for i, instruction in enumerate(instructions):
-        color = (255, 255, 255)  # White text for all instructions
-        font = BIGFONT if i == 0 else FONT
-        inst_surf = font.render(instruction, True, color)
-        screen.blit(inst_surf, (screen.get_width()-175, 15 + i*20))
-    
-    pygame.display.flip()
+    """Draw the whole window once (run_gui keeps a BoardRenderer and redraws incrementally)."""
+    BoardRenderer(screen, rows, cols, score_cols).draw(board, selected, highlights, msg, timers, current)
 
 def format_time(sec:float) -> str:
     if sec < 0: sec = 0
     m = int(sec//60); s = int(sec%60)
     return f"{m:02d}:{s:02d}"
 
+def format_move(move:Dict[str,Any]) -> str:
+    """Short text for a move dict, e.g. "push (3,4)->(3,5)->(3,6)"."""
+    cells = "->".join(f"({move[k][0]},{move[k][1]})" for k in ("from", "to", "pushed_to") if move.get(k))
+    ori = f" {move['orientation']}" if move.get("orientation") else ""
+    return f"{move.get('action', '?')} {cells}{ori}"
+
+def thinking_message(player:str, worker:MoveWorker) -> str:
+    """Status line while an AI thinks: time so far and the best move it reports, if any."""
+    msg = f"AI {player} thinking... {worker.elapsed():.1f}s"
+    report = worker.progress()
+    if report and report.get("move"):
+        msg += f" | best so far: {format_move(report['move'])}"
+        if report.get("depth"): msg += f" (depth {report['depth']})"
+    return msg + " | Space: move now"
+
 def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Optional[str],
-            rows:int, cols:int, time_per_player:float):
-    if not pygame:
+            rows:int, cols:int, time_per_player:float, ponder:bool=False,
+            adjudication:Optional[Dict[str,Any]]=None, metrics_path:Optional[str]=None, instruments=()):
+    if not load_pygame():
         print("pygame not available; use --nogui")
         return
     score_cols = score_cols_for(cols)
-    board = default_start_board(rows, cols)
-    turn=0
+    # The window content was lost (e.g. uncovered): repaint it all
+    expose_events = {getattr(pygame, name) for name in ("VIDEOEXPOSE", "WINDOWEXPOSED") if hasattr(pygame, name)}
 
     window_width = max(800, cols*CELL + MARGIN*2 + 200)
     window_height = max(600, rows*CELL + MARGIN*2 + 100)
     screen = pygame.display.set_mode((window_width, window_height))
     pygame.display.set_caption(f"🎮 River and Stones - {mode.upper()} Mode")  # ADDED: set window caption
+    renderer = BoardRenderer(screen, rows, cols, score_cols)
 
     clock = pygame.time.Clock()
     players = {"circle":"human","square":"human"}
@@ -746,84 +1761,126 @@ def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Option
         else: players={"circle":"human","square":"ai"}
     
     # instantiate agents (they only receive board)
-    agent_circle = get_agent("circle", circle_strategy)
-    agent_square = get_agent("square", square_strategy)
-    agents = {}
-    if players["circle"]=="ai": agents["circle"] = agent_circle
-    if players["square"]=="ai": agents["square"] = agent_square
-
-    timers = {"circle": time_per_player, "square": time_per_player}
-
-    current = "circle"
+    agent_circle, agent_square = create_agents(players, circle_strategy, square_strategy, ponder)
+    for instrument in instruments:   # profiling / allocation tracking wrap the agents' choose()
+        instrument.instrument_agents(agent_circle, agent_square)
+    # AI moves run on a worker thread so that the window keeps drawing and handling input
+    game = Game({"circle": agent_circle, "square": agent_square}, rows, cols, time_per_player,
+                adjudication=adjudication, threaded=True, instruments=instruments)
+    metrics = create_metrics(players, circle_strategy, square_strategy) if metrics_path else None
+    board, timers = game.board, game.timers
+    stream = game.play()
+
+    current = game.current
     selected = None
     highlights = set()
     msg = "Select a piece and choose an action (M/P/F/R). Welcome to River and Stones!"
     action_mode = None
-    winner = None
-    game_scores = None
     push_stage = None
     push_candidate = None
     game_over = False
-
-    turn_start = time.time()
+    waiting = False   # the stream is paused at a request_move for a human player
+    thinking = None   # MoveWorker of the AI move in progress
+    turn_start = time.perf_counter()
+
+    def step(move=None) -> bool:
+        """
+        Run the game until the next ply is done, an AI starts thinking, a human move is needed
+        or the game ends; True if a ply was played.
+        """
+        nonlocal current, msg, game_over, waiting, thinking, turn_start
+        event = stream.send(move) if waiting else next(stream)
+        waiting = False
+        thinking = None
+        while True:
+            if metrics is not None:
+                metrics.observe(event)
+            kind = event["type"]
+            if kind == "move":
+                renderer.touch(move_cells_touched(event["move"]))
+            if kind in ("move", "invalid"):
+                msg = f"AI {event['player']}: {event['info']}" if not game.is_human(event["player"]) else event["info"]
+            elif kind == "pass":
+                msg = f"AI {event['player']}: no moves; pass"
+            elif kind == "win":
+                msg = f"{event['winner'].title()} wins!"
+            elif kind == "timeout":
+                if event["winner"] is None:
+                    print("Both players timed out. Draw.")
+                else:
+                    print(f"{opponent(event['winner']).title()} timed out.")
+            elif kind == "adjudicated":
+                print(f"Adjudicated: {event['reason']}.")
+            elif kind == "turn_limit":
+                print("Turn limit reached -> draw")
+            elif kind == "end":
+                game_over = True
+                scores = event["scores"]
+                if event["winner"] in ("circle","square"):
+                    msg = f"{event['winner'].title()} wins! Scores — Circle: {scores['circle']:.1f}, Square: {scores['square']:.1f}"
+                else:
+                    msg = f"Draw. Scores — Circle: {scores['circle']:.1f}, Square: {scores['square']:.1f}"
+                if metrics is not None:
+                    print("Metrics written to " + " and ".join(metrics.export(metrics_path)))
+                return False
+            elif kind == "request_move":
+                waiting = True
+                current = game.current
+                turn_start = time.perf_counter()
+                return False
+            elif kind == "thinking":
+                thinking = event["worker"]
+                current = game.current
+                return False
+            current = game.current
+            # An AI ply ends the step so that the board is redrawn between AI moves
+            if kind in ("move", "pass") or (kind == "invalid" and not game.is_human(event["player"])):
+                return kind == "move"
+            event = next(stream)
+
+    def submit(m) -> bool:
+        """Play a human move; True if it was accepted (selection state is reset)."""
+        nonlocal selected, highlights, action_mode, push_stage, push_candidate
+        if not step(m):
+            return False
+        selected=None; highlights=set(); action_mode=None; push_stage=None; push_candidate=None
+        return True
 
     while True:
         clock.tick(FPS)
 
-        # Check timeouts
-        if not game_over:
-            if timers["circle"] <= 0 and timers["square"] > 0:
-                winner = "square"; game_over = True
-                print("Circle timed out.")
-            elif timers["square"] <= 0 and timers["circle"] > 0:
-                winner = "circle"; game_over = True
-                print("Square timed out.")
-            elif timers["circle"] <= 0 and timers["square"] <= 0:
-                winner = None; game_over = True
-                print("Both players timed out. Draw.")
-
-        # if not winner:
-        #     timers[current] -= (now - last); last = now
-        #     if timers[current] <= 0:
-        #         winner = opponent(current); msg = f"{current.title()} timed out. {winner.title()} wins!"
-
-        # AI turn (single call)
-        if players[current] == "ai" and not winner and not game_over:
-            ai_start = time.time()
-            agent = agents[current]
-            move = agent.choose(board, rows, cols, score_cols, timers[current], timers[opponent(current)])
-            ai_end = time.time()
-            ai_elapsed = ai_end - ai_start
-            timers[current] -= ai_elapsed
-            if timers[current] <= 0:
-                winner = opponent(current); msg = f"{current.title()} timed out. {winner.title()} wins!"; game_over = True
-            else:
-                if move:
-                    ok, info = validate_and_apply_move(board, move, current, rows, cols, score_cols)
-                    msg = f"AI {current}: {info}"
-                    if ok:
-                        w = check_win(board, rows, cols, score_cols)
-                        if w: winner = w; msg = f"{w.title()} wins!"; game_over = True
-                        current = opponent(current)
-                        selected=None; highlights=set(); action_mode=None; push_stage=None; push_candidate=None
-                        turn_start = time.time()  # NEW: reset timer when switching to next (human) turn
-                    else:
-                        current = opponent(current)
-                        turn_start = time.time()
-                else:
-                    current = opponent(current)
-                    turn_start = time.time()
-            draw_board(screen, board, rows, cols, score_cols, selected, highlights, msg, timers, current)
-            turn += 1
-            if turn > 1000:
-                print("Turn limit reached -> draw"); break
-            continue
+        # AI plies and game-end bookkeeping; a human turn waits for input below. While an AI
+        # thinks on its worker the frames keep coming, with its clock running down.
+        if not game_over and not waiting and (thinking is None or thinking.done):
+            step()
+        shown = timers
+        if thinking is not None:
+            shown = dict(timers); shown[current] -= thinking.elapsed()
+            if shown[current] <= 0:
+                thinking.interrupt()   # lost on time anyway; stop searching
+            msg = thinking_message(current, thinking)
+        elif waiting:
+            shown = dict(timers); shown[current] -= time.perf_counter() - turn_start
 
         for ev in pygame.event.get():
+            if ev.type in expose_events:
+                renderer.invalidate()
             if ev.type == pygame.QUIT:
+                if thinking is not None:
+                    thinking.interrupt(); thinking.wait(2.0)
+                stream.close()
+                close_agents(agent_circle, agent_square)
                 pygame.quit(); return
             if game_over:  # block further moves
                 continue
+            if thinking is not None:
+                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_SPACE:
+                    thinking.interrupt()
+                elif ev.type == pygame.KEYDOWN and ev.key == pygame.K_s:
+                    save_board_to_file(board, "saved_board.json")
+                continue
+            if not waiting:
+                continue
 
             if ev.type == pygame.KEYDOWN:
                 if ev.key == pygame.K_s:
@@ -845,46 +1902,18 @@ def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Option
                 if selected and ev.key == pygame.K_r:
                     sx,sy = selected; p = board[sy][sx]
                     if p and p.owner==current and p.side=="river":
-                        m = {"action":"rotate","from":[sx,sy]}
-                        ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                        msg = info
-                        if ok:
-                            w = check_win(board, rows, cols, score_cols)
-                            if w: winner=w; msg = f"{w.title()} wins!"; game_over = True
-                            current = opponent(current); selected=None; highlights=set(); action_mode=None
+                        submit({"action":"rotate","from":[sx,sy]})
                     else:
                         msg = "Rotate needs selected river piece"
                 if action_mode=="flip" and selected:
                     sx,sy = selected
                     if ev.key == pygame.K_h or ev.key == pygame.K_v:
                         ori = "horizontal" if ev.key==pygame.K_h else "vertical"
-                        m={"action":"flip","from":[sx,sy],"orientation":ori}
-                        ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                        msg = info
-                        if ok:
-                            w = check_win(board, rows, cols, score_cols)
-                            if w: winner=w; msg = f"{w.title()} wins!"; game_over = True
-                            current = opponent(current); selected=None; highlights=set(); action_mode=None
+                        submit({"action":"flip","from":[sx,sy],"orientation":ori})
                     elif ev.key == pygame.K_f:
-                        m={"action":"flip","from":[sx,sy]}
-                        ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                        msg = info
-                        if ok:
-                            w = check_win(board, rows, cols, score_cols)
-                            if w: winner=w; msg = f"{w.title()} wins!"; game_over = True
-                            current = opponent(current); selected=None; highlights=set(); action_mode=None
+                        submit({"action":"flip","from":[sx,sy]})
 
             if ev.type == pygame.MOUSEBUTTONDOWN and ev.button==1:
-                # measure elapsed thinking time before move
-                elapsed = time.time() - turn_start
-                timers[current] -= elapsed
-                if timers[current] <= 0:
-                    winner = opponent(current)
-                    msg = f"{current.title()} timed out. {winner.title()} wins!"
-                    game_over = True
-                    continue
-                turn_start = time.time()
-
                 mx,my = ev.pos
                 rx = round((mx - MARGIN)/CELL); ry = round((my - MARGIN)/CELL)
                 if not in_bounds(rx,ry,rows,cols): continue
@@ -910,15 +1939,7 @@ def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Option
                             else:
                                 dx,dy = rx-sx, ry-sy
                                 m={"action":"move","from":[sx,sy],"to":[rx,ry],"pushed_to":[rx+dx,ry+dy]}
-                            ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                            msg = info
-                            if ok:
-                                w = check_win(board,rows,cols,score_cols)
-                                if w: winner=w; msg=f"{w.title()} wins!"; game_over=True
-                                current = opponent(current)
-                                selected=None; highlights=set(); action_mode=None
-                                push_stage=None; push_candidate=None
-                                turn_start = time.time()  # NEW: reset for next turn
+                            submit(m)
 
                     elif action_mode=="push":
                         info = compute_valid_targets(board,sx,sy,current,rows,cols,score_cols)
@@ -944,28 +1965,13 @@ def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Option
                                     m={"action":"push","from":[sx,sy],
                                        "to":[push_candidate[0],push_candidate[1]],
                                        "pushed_to":[rx,ry]}
-                                    ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                                    msg=info
                                     push_stage=None; push_candidate=None; highlights=set(); action_mode=None
-                                    if ok:
-                                        w = check_win(board,rows,cols,score_cols)
-                                        if w: winner=w; msg=f"{w.title()} wins!"; game_over=True
-                                        current = opponent(current)
-                                        selected=None
-                                        turn_start = time.time()  # NEW
+                                    submit(m)
 
                     elif action_mode=="flip":
                         p = board[sy][sx]
                         if p.side=="river":
-                            m={"action":"flip","from":[sx,sy]}
-                            ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                            msg=info
-                            if ok:
-                                w = check_win(board,rows,cols,score_cols)
-                                if w: winner=w; msg=f"{w.title()} wins!"; game_over=True
-                                current = opponent(current)
-                                selected=None; action_mode=None
-                                turn_start = time.time()  # NEW
+                            submit({"action":"flip","from":[sx,sy]})
                         else:
                             msg = "Press H/V for stone->river in flip mode"
 
@@ -977,14 +1983,7 @@ def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Option
                             else:
                                 dx,dy = rx-sx, ry-sy
                                 m={"action":"move","from":[sx,sy],"to":[rx,ry],"pushed_to":[rx+dx,ry+dy]}
-                            ok,info = validate_and_apply_move(board,m,current,rows,cols,score_cols)
-                            msg=info
-                            if ok:
-                                w = check_win(board,rows,cols,score_cols)
-                                if w: winner=w; msg=f"{w.title()} wins!"; game_over=True
-                                current = opponent(current)
-                                selected=None; highlights=set(); action_mode=None
-                                turn_start = time.time()  # NEW
+                            submit(m)
                         else:
                             newp = board[ry][rx]
                             if newp and newp.owner==current:
@@ -992,188 +1991,190 @@ def run_gui(mode:str, circle_strategy:str, square_strategy:str, load_file:Option
                                 msg=f"Selected {selected}"
                             else:
                                 msg="Invalid click"
-        # turn += 1
-        # print(turn)
-        # if turn > 1000:
-        #     print("Turn limit reached -> draw"); break
-
-        # --- DRAW ---
-        draw_board(screen, board, rows, cols, score_cols, selected, highlights, msg, timers, current)
-
-        if game_over and game_scores is None:
-            game_scores = compute_final_scores(
-                board, winner, rows, cols, score_cols,
-                remaining_times={'circle': timers['circle'], 'square': timers['square']}
-            )
-            if winner in ("circle","square"):
-                msg = f"{winner.title()} wins! Scores — Circle: {game_scores['circle']:.1f}, Square: {game_scores['square']:.1f}"
-            else:
-                msg = f"Draw. Scores — Circle: {game_scores['circle']:.1f}, Square: {game_scores['square']:.1f}"
+
+        # --- DRAW --- (only what changed since the last frame)
+        renderer.draw(board, selected, highlights, msg, shown, current)
 
 
 # ---------------- CLI interactive runner ----------------
-def run_cli(mode:str, circle_strategy:str, square_strategy:str, load_file:Optional[str], rows:int, cols:int, time_per_player:float):
+def run_cli(mode:str, circle_strategy:str, square_strategy:str, load_file:Optional[str], rows:int, cols:int, time_per_player:float,
+            ponder:bool=False, adjudication:Optional[Dict[str,Any]]=None, metrics_path:Optional[str]=None,
+            instruments=()):
     score_cols = score_cols_for(cols)
-    board = default_start_board(rows, cols)
-    agent_circle = get_agent("circle", circle_strategy)
-    agent_square = get_agent("square", square_strategy)
     players = {"circle":"human","square":"human"}
     if mode=="aivai": players={"circle":"ai","square":"ai"}
     elif mode=="hvh": players={"circle":"human","square":"human"}
     else:
         if circle_strategy=="random": players={"circle":"ai","square":"human"}
         else: players={"circle":"human","square":"ai"}
-    
-    current="circle"; winner=None; turn=0
+    agent_circle, agent_square = create_agents(players, circle_strategy, square_strategy, ponder)
+    for instrument in instruments:   # profiling / allocation tracking wrap the agents' choose()
+        instrument.instrument_agents(agent_circle, agent_square)
+    game = Game({"circle": agent_circle, "square": agent_square}, rows, cols, time_per_player,
+                adjudication=adjudication, instruments=instruments)
+    metrics = create_metrics(players, circle_strategy, square_strategy) if metrics_path else None
+    board = game.board
 
     print("🎮 Welcome to River and Stones! 🎮")
     print(f"Mode: {mode.upper()}")
     print(f"Circle: {circle_strategy}, Square: {square_strategy}")
-    
-    # Timers (seconds) - ADDED
-    timers = {"circle": time_per_player, "square": time_per_player}  # ADDED
 
+    stream = game.play()
+    reply = None   # value for the stream: the human's move after a request_move event
     while True:
-        print(board_to_ascii(board, rows, cols, score_cols))
-        
-        w = check_win(board, rows, cols, score_cols)
-        if w:
-            winner = w
-            print(f"\n🎉 WINNER: {w.upper()} 🎉")
-            break
-            
-        # immediate timeout check
-        if timers["circle"] <= 0 and timers["square"] > 0:
-            winner = "square"; print("\nCircle timed out."); break
-        if timers["square"] <= 0 and timers["circle"] > 0:
-            winner = "circle"; print("\nSquare timed out."); break
-        if timers["circle"] <= 0 and timers["square"] <= 0:
-            # both timed out -> draw
-            print("\nBoth players timed out. Game ends as a draw.")
+        try:
+            event = stream.send(reply)
+        except StopIteration:
             break
-
-        print(f"\n{'='*30}")
-        print(f"Turn {turn + 1}: {current.upper()}'s move")
-        print(f"Remaining time — Circle: {format_time(timers['circle'])} | Square: {format_time(timers['square'])}")
-        print(f"{'='*30}")
-        
-        if players[current]=="ai":
-            print(f"🤖 AI {current} is thinking...")
-            agent = agent_circle if current=="circle" else agent_square
-            ai_start = time.time()  # ADDED: measure AI thinking time
-            move = agent.choose(board, rows, cols, score_cols, timers[current], timers[opponent(current)])
-            ai_end = time.time()  # ADDED
-            elapsed = ai_end - ai_start  # ADDED
-            timers[current] -= elapsed  # ADDED: subtract AI think time from clock
-
-            # check timeout after thinking
-            if timers[current] <= 0:
-                winner = opponent(current)
-                print(f"{current.title()} timed out while thinking. {winner.title()} wins!")
-                break
-
-            if move is None:
-                print(f"AI {current} has no moves; pass")
-                current = opponent(current)
-                turn += 1
-                if turn > 1000:
-                    print("Turn limit reached -> draw"); break
-                # do not count the "press enter to continue" as clock time; skip it
-                input("\nPress Enter to continue...")  # keep for readability
-                continue
-            ok,msg = validate_and_apply_move(board, move, current, rows, cols, score_cols)
-            print(f"AI {current} -> {move}")
-            print(f"Result: {msg}")
-            if not ok:
-                current = opponent(current)
-                turn += 1
-                if turn > 1000:
-                    print("Turn limit reached -> draw"); break
-                input("\nPress Enter to continue...")
-                continue
-        else:
-            # Human: measure time spent entering the move so the timer decreases
+        reply = None
+        if metrics is not None:
+            metrics.observe(event)
+        kind, current = event["type"], event["player"]
+        timers = event.get("timers")
+
+        if kind == "turn":
+            if event["turn"] > 0:
+                # Press Enter pause for readability — not counted on either clock
+                try:
+                    _ = input("\nPress Enter to continue...")
+                except KeyboardInterrupt:
+                    pass
+            print(board_to_ascii(board, rows, cols, score_cols))
+            print(f"\n{'='*30}")
+            print(f"Turn {event['turn'] + 1}: {current.upper()}'s move")
+            print(f"Remaining time — Circle: {format_time(timers['circle'])} | Square: {format_time(timers['square'])}")
+            print(f"{'='*30}")
+            if not game.is_human(current):
+                print(f"🤖 AI {current} is thinking...")
+        elif kind == "request_move":
             print("Commands:")
             print("  Move: {'action':'move','from':[x,y],'to':[x,y]}")
             print("  Push: {'action':'push','from':[x,y],'to':[x,y],'pushed_to':[x,y]}")
             print("  Flip: {'action':'flip','from':[x,y],'orientation':'horizontal/vertical'}")
             print("  Rotate: {'action':'rotate','from':[x,y]}")
             print("  'q' to quit")
-            start = time.time()  # ADDED: start timing user input
-            try:
-                s = input(f"\n{current} move JSON: ").strip()
-            except Exception:
-                print("\nInput interrupted. Exiting.")
-                break
-            end = time.time()  # ADDED
-            elapsed = end - start  # ADDED
-            timers[current] -= elapsed  # ADDED: subtract user input time from timer
-
-            # check timeout after user input
-            if timers[current] <= 0:
-                winner = opponent(current)
-                print(f"{current.title()} timed out. {winner.title()} wins!")
-                break
-
-            if s.lower()=="q":
-                break
-            try:
-                move = json.loads(s)
-            except Exception as e:
-                print(f"Bad JSON: {e}"); 
-                # do not change player on bad input, let them try again
-                continue
-            ok,msg = validate_and_apply_move(board, move, current, rows, cols, score_cols)
-            print(f"Result: {msg}")
-            if not ok:
-                continue
-            
-        # after a successful move / AI move attempt, check board win
-        w = check_win(board, rows, cols, score_cols)
-        if w:
-            winner = w
-            print(f"\n🎉 WINNER: {w.upper()} 🎉")
-            break
+            # The clock runs until the reply is sent; a bad JSON line just asks again
+            while True:
+                try:
+                    s = input(f"\n{current} move JSON: ").strip()
+                except Exception:
+                    print("\nInput interrupted. Exiting.")
+                    break
+                if s.lower()=="q":
+                    break
+                try:
+                    reply = json.loads(s)
+                    break
+                except Exception as e:
+                    print(f"Bad JSON: {e}")
+        elif kind == "pass":
+            print(f"AI {current} has no moves; pass")
+        elif kind in ("move", "invalid"):
+            if not game.is_human(current):
+                print(f"AI {current} -> {display_move(event['move'])}")
+            print(f"Result: {event['info']}")
+        elif kind == "win":
+            print(board_to_ascii(board, rows, cols, score_cols))
+            print(f"\n🎉 WINNER: {event['winner'].upper()} 🎉")
+        elif kind == "timeout":
+            if event["winner"] is None:
+                print("\nBoth players timed out. Game ends as a draw.")
+            else:
+                print(f"{opponent(event['winner']).title()} timed out. {event['winner'].title()} wins!")
+        elif kind == "adjudicated":
+            print(f"\nAdjudicated: {event['reason']}.")
+        elif kind == "turn_limit":
+            print("Turn limit reached -> draw")
+        elif kind == "end":
+            winner, final_scores = event["winner"], event["scores"]
 
-        # next player's turn
-        current = opponent(current)
-        turn += 1
-        if turn > 1000:
-            print("Turn limit reached -> draw"); break
+    close_agents(agent_circle, agent_square)
 
-        # Press Enter pause for readability — DO NOT count this time as player's clock (unchanged behavior)
-        try:
-            _ = input("\nPress Enter to continue...")
-        except KeyboardInterrupt:
-            pass
-        
-    # compute and print final scores with remaining times accounted for (CHANGED: pass timers)
-    final_scores = compute_final_scores(board, winner, rows, cols, score_cols,
-                                        remaining_times={'circle': timers['circle'], 'square': timers['square']})
     if winner:
         print(f"\n{winner.title()} wins!")
     else:
         print("\nGame ended in a draw.")
     print(f"Final Scores -> Circle: {final_scores['circle']:.1f} | Square: {final_scores['square']:.1f}\n")
+    if metrics is not None:
+        print(metrics.report())
+        print("Metrics written to " + " and ".join(metrics.export(metrics_path)))
 
 # ---------------- Entrypoint ----------------
 def main():
+    import argparse
     ap = argparse.ArgumentParser()
     ap.add_argument("--mode", choices=["hvh","hvai","aivai"], default="hvai")
-    ap.add_argument("--circle", choices=["random","student","student_cpp"], default="random")
-    ap.add_argument("--square", choices=["random","student","student_cpp"], default="random")
+    ap.add_argument("--circle", choices=["random","student","student_cpp","mcts"], default="random")
+    ap.add_argument("--square", choices=["random","student","student_cpp","mcts"], default="random")
     ap.add_argument("--load", default=None)
+    ap.add_argument("--rows", type=int, default=DEFAULT_ROWS, help=f"Board rows (default: {DEFAULT_ROWS})")
+    ap.add_argument("--cols", type=int, default=DEFAULT_COLS, help=f"Board columns (default: {DEFAULT_COLS})")
+    ap.add_argument("--score-width", type=int, default=SCORE_WIDTH, help=f"Scoring area width (default: {SCORE_WIDTH})")
+    ap.add_argument("--win-count", type=int, default=None, help="Stones needed to win (default: the scoring area width)")
     ap.add_argument("--nogui", action="store_true")
     ap.add_argument("--time", type=float, default=1.0, help="Time per player in minutes (default: 1.0)")
+    ap.add_argument("--ponder", action="store_true", help="Let AI agents that support it think on the opponent's time")
+    ap.add_argument("--repetitions", type=int, default=0, help="Draw on the N-th occurrence of a position (0 = off)")
+    ap.add_argument("--quiet-plies", type=int, default=0, help="Draw after K plies without scoring progress (0 = off)")
+    ap.add_argument("--resign-margin", type=float, default=0.0, help="Resign the trailing side at this (n + m/10) margin (0 = off)")
+    ap.add_argument("--resign-plies", type=int, default=1, help="Plies the resign margin must hold (default: 1)")
+    ap.add_argument("--metrics", default=None, metavar="PREFIX",
+                    help="Write per-move latency metrics to PREFIX.json and PREFIX.prom at the end of the game")
+    ap.add_argument("--profile", nargs="?", const="cprofile", choices=["cprofile","sample"], default=None,
+                    help="Profile agent choose() and engine hot paths (default mode: cprofile)")
+    ap.add_argument("--profile-out", default="profile", metavar="PREFIX", help="Profile report prefix (default: profile)")
+    ap.add_argument("--counters", action="store_true", help="Print the engine counters at the end of the game")
+    ap.add_argument("--trace-alloc", action="store_true",
+                    help="Track memory allocated by every agent move with tracemalloc (slows agents down)")
+    ap.add_argument("--alloc-budget", type=float, default=None, metavar="MB", help="Per-move peak memory budget to report against")
+    ap.add_argument("--alloc-out", default=None, metavar="PATH", help="Write per-move allocation records as JSON")
     args = ap.parse_args()
 
-    rows = DEFAULT_ROWS; cols = DEFAULT_COLS
+    rows = args.rows; cols = args.cols
+    win_count = args.win_count if args.win_count is not None else args.score_width
+    if rows < 9 or cols < 4:
+        ap.error("the board needs at least 9 rows and 4 columns")
+    if not 1 <= args.score_width <= cols:
+        ap.error("--score-width must be between 1 and --cols")
+    if not 1 <= win_count <= args.score_width:
+        ap.error("--win-count must be between 1 and --score-width")
+    configure_geometry(args.score_width, win_count)
     time_per_player = args.time * 60  # Convert minutes to seconds
+    adjudication = dict(repetitions=args.repetitions, quiet_plies=args.quiet_plies,
+                        resign_margin=args.resign_margin, resign_plies=args.resign_plies)
+
+    instruments = []
+    profiler = tracker = None
+    if args.profile:
+        from profiling import ScopedProfiler
+        profiler = ScopedProfiler(args.profile)
+        profiler.start(sys.modules[__name__])
+        instruments.append(profiler)
+    if args.trace_alloc:
+        from memtrack import AllocationTracker
+        budget = int(args.alloc_budget * (1 << 20)) if args.alloc_budget is not None else None
+        tracker = AllocationTracker(budget_bytes=budget)
+        instruments.append(tracker)
+    reset_counters()
 
     if args.nogui:
-        run_cli(args.mode, args.circle, args.square, args.load, rows, cols, time_per_player)
+        run_cli(args.mode, args.circle, args.square, args.load, rows, cols, time_per_player, ponder=args.ponder,
+                adjudication=adjudication, metrics_path=args.metrics, instruments=instruments)
     else:
-        run_gui(args.mode, args.circle, args.square, args.load, rows, cols, time_per_player)
+        run_gui(args.mode, args.circle, args.square, args.load, rows, cols, time_per_player, ponder=args.ponder,
+                adjudication=adjudication, metrics_path=args.metrics, instruments=instruments)
+
+    if profiler is not None:
+        paths = profiler.finish(args.profile_out, format_counters())
+        print("Profile written to " + ", ".join(paths))
+    if tracker is not None:
+        tracker.end_game()
+        tracker.stop()
+        print(tracker.report())
+        if args.alloc_out:
+            print("Allocation records written to " + tracker.export(args.alloc_out))
+    if args.counters:
+        print(format_counters())
 
 if __name__=="__main__":
     main()
@@ -0,0 +1,291 @@
+"""
+River and Stones Game - Monte Carlo Tree Search Agent
+
+UCT search over the engine's legal move generator:
+- Selection with UCB1 (virtual loss lets a batch of leaves be selected at once)
+- Expansion of one untried legal move per visited leaf
+- Random playouts with playout.py's move sampler, run in a process pool
+  (or inline when only one core is used)
+- The tree is kept between moves and re-rooted on the opponent's reply
+- Thinks until timeman's soft limit, or up to the hard limit while the most
+  visited move is not also the best scoring one
+
+Each move reports its rollout throughput (playouts/sec) so batch size and
+worker count can be tuned per machine.
+"""
+
+import os
+import math
+import time
+import random
+import threading
+from typing import List, Dict, Any, Optional, Tuple
+
+from agent import BaseAgent
+from gameEngine import (Piece, generate_legal_moves, check_win, count_scoring_pieces,
+                        opponent)
+from search import make_move, unmake_move
+from playout import random_playout
+from timeman import TimeManager
+
+# ==================== BOARD ENCODING ====================
+# Rollout jobs cross process boundaries, so boards are shipped as plain tuples.
+
+def encode_board(board: List[List[Any]]) -> Tuple[Tuple[Optional[Tuple[str, str, Optional[str]]], ...], ...]:
+    """Encode a board as nested tuples of (owner, side, orientation) or None."""
+    return tuple(tuple((p.owner, p.side, p.orientation) if p else None for p in row) for row in board)
+
+def decode_board(cells) -> List[List[Optional[Piece]]]:
+    """Inverse of encode_board."""
+    return [[Piece(*c) if c else None for c in row] for row in cells]
+
+# ==================== PLAYOUTS ====================
+
+def playout_value(board: List[List[Any]], rows: int, cols: int, score_cols: List[int]) -> float:
+    """Score of an unfinished playout from Circle's point of view, in [0, 1]."""
+    margin = (count_scoring_pieces(board, "circle", rows, cols, score_cols) -
+              count_scoring_pieces(board, "square", rows, cols, score_cols))
+    return min(1.0, max(0.0, 0.5 + 0.125 * margin))
+
+def run_playouts(job: Tuple[Any, str, int, int, List[int], int, int, int]) -> float:
+    """
+    Play random games from an encoded position.
+
+    Args:
+        job: (cells, side_to_move, rows, cols, score_cols, count, max_plies, seed)
+
+    Returns:
+        Sum of the playout results from Circle's point of view
+    """
+    cells, side, rows, cols, score_cols, count, max_plies, seed = job
+    rng = random.Random(seed)
+    total = 0.0
+    for _ in range(count):
+        board = decode_board(cells)
+        winner, _ = random_playout(board, side, rows, cols, score_cols, max_plies, rng)
+        if winner:
+            total += 1.0 if winner == "circle" else 0.0
+        else:
+            total += playout_value(board, rows, cols, score_cols)
+    return total
+
+# ==================== TREE ====================
+
+class MCTSNode:
+    """A node of the search tree; `value` is accumulated for the player who moved into it."""
+
+    __slots__ = ("move", "parent", "player", "children", "untried", "visits", "value", "terminal")
+
+    def __init__(self, move: Optional[Dict[str, Any]], parent: Optional["MCTSNode"], player: str):
+        self.move = move
+        self.parent = parent
+        self.player = player          # side to move at this node
+        self.children: List["MCTSNode"] = []
+        self.untried: Optional[List[Dict[str, Any]]] = None
+        self.visits = 0
+        self.value = 0.0
+        self.terminal: Optional[float] = None   # Circle's result if the game is over here
+
+    def uct_child(self, exploration: float) -> "MCTSNode":
+        log_n = math.log(max(1, self.visits))
+        return max(self.children,
+                   key=lambda c: c.value / c.visits + exploration * math.sqrt(log_n / c.visits))
+
+# ==================== AGENT ====================
+
+class MCTSAgent(BaseAgent):
+    """
+    Monte Carlo tree search agent.
+
+    Args:
+        player: Either "circle" or "square"
+        workers: Rollout processes; defaults to the cores this process may use
+        batch_size: Leaves selected (with virtual loss) per batch of rollouts
+        playouts_per_leaf: Playouts run for every selected leaf
+        max_plies: Playout length cap before the position is scored heuristically
+        exploration: UCT exploration constant
+        moves_to_go: Expected number of remaining moves, passed to the TimeManager
+        verbose: Print the per-move throughput report
+    """
+
+    def __init__(self, player: str, workers: Optional[int] = None, batch_size: Optional[int] = None,
+                 playouts_per_leaf: int = 1, max_plies: int = 60, exploration: float = 1.4,
+                 moves_to_go: int = 60, verbose: bool = True):
+        super().__init__(player)
+        if workers is None:
+            workers = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+        self.workers = max(1, workers)
+        self.batch_size = batch_size or 2 * self.workers
+        self.playouts_per_leaf = playouts_per_leaf
+        self.max_plies = max_plies
+        self.exploration = exploration
+        self.timer = TimeManager(moves_to_go=moves_to_go)
+        self.verbose = verbose
+        self.last_stats: Dict[str, Any] = {}
+        self._pool = None
+        self._root: Optional[MCTSNode] = None
+        self._root_cells = None       # encoded board the kept root node represents
+        self._rng = random.Random()
+        self._interrupted = threading.Event()   # set by interrupt() from the GUI thread
+        self._live_root: Optional[MCTSNode] = None
+
+    def interrupt(self) -> None:
+        """Make a choose() running on another thread stop after the current batch of rollouts."""
+        self._interrupted.set()
+
+    def progress(self) -> Optional[Dict[str, Any]]:
+        """Most visited root move so far while choose() runs (see gameEngine.MoveWorker)."""
+        root = self._live_root
+        children = list(root.children) if root is not None else []
+        if not children:
+            return None
+        best = max(children, key=lambda c: c.visits)
+        return {"move": best.move, "visits": best.visits, "nodes": root.visits}
+
+    def close(self) -> None:
+        """Shut down the rollout process pool."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def choose(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int], current_player_time: float, opponent_time: float) -> Optional[Dict[str, Any]]:
+        start = time.perf_counter()
+        legal_moves = self.timer.start_for_position(board, self.player, rows, cols, score_cols,
+                                                    current_player_time, opponent_time)
+        root, reused = self._reroot(board, rows, cols, score_cols)
+        if root.untried is None:
+            root.untried = legal_moves
+            self._rng.shuffle(root.untried)
+        if not root.untried and not root.children:
+            return None
+        if self.timer.hard_limit <= 0:
+            # No time left to search: play instantly, from the reused tree if there is one
+            self.last_stats = {"playouts": 0, "nodes": 0, "seconds": time.perf_counter() - start,
+                               "playouts_per_sec": 0.0, "root_visits": root.visits, "tree_reused": reused}
+            if root.children:
+                return max(root.children, key=lambda c: c.visits).move
+            return root.untried[0]
+
+        playouts = 0
+        self._interrupted.clear()
+        self._live_root = root
+        try:
+            while True:
+                playouts += self._run_batch(root, board, rows, cols, score_cols)
+                if self.timer.should_stop() or self._interrupted.is_set():
+                    break
+                if self.timer.soft_expired() and self._settled(root):
+                    break
+        finally:
+            self._live_root = None
+
+        best = max(root.children, key=lambda c: c.visits)
+        elapsed = time.perf_counter() - start
+        self.last_stats = {"playouts": playouts, "nodes": playouts, "seconds": elapsed,
+                           "playouts_per_sec": playouts / elapsed if elapsed > 0 else 0.0,
+                           "root_visits": root.visits, "tree_reused": reused}
+        if self.verbose:
+            print(f"[mcts] {self.player}: {playouts} playouts in {elapsed:.2f}s "
+                  f"({self.last_stats['playouts_per_sec']:.0f}/s), root visits {root.visits}"
+                  f"{', reused tree' if reused else ''}")
+
+        # Keep the subtree under our move; the opponent's reply picks the next root.
+        best.parent = None
+        self._root = best
+        undo = make_move(board, best.move, self.player, rows, cols, score_cols, trusted=True)
+        self._root_cells = encode_board(board)
+        unmake_move(board, undo)
+        return best.move
+
+    # ---------- internals ----------
+
+    @staticmethod
+    def _settled(root: MCTSNode) -> bool:
+        """True when the most visited root move also has the best mean value."""
+        if not root.children:
+            return True
+        most_visited = max(root.children, key=lambda c: c.visits)
+        best_value = max(root.children, key=lambda c: c.value / c.visits if c.visits else 0.0)
+        return most_visited is best_value
+
+    def _reroot(self, board, rows, cols, score_cols) -> Tuple[MCTSNode, bool]:
+        """Find the node for the current position below the kept root, or start a new tree."""
+        old, old_cells = self._root, self._root_cells
+        self._root = None
+        if old is not None and old_cells is not None:
+            target = encode_board(board)
+            scratch = decode_board(old_cells)
+            for child in old.children:
+                undo = make_move(scratch, child.move, old.player, rows, cols, score_cols, trusted=True)
+                if undo is None:
+                    continue
+                matched = encode_board(scratch) == target
+                unmake_move(scratch, undo)
+                if matched and child.player == self.player:
+                    child.parent = None
+                    return child, True
+        return MCTSNode(None, None, self.player), False
+
+    def _select(self, root: MCTSNode, board, rows, cols, score_cols) -> Tuple[MCTSNode, List[Any]]:
+        """Descend with UCT and expand one child, applying moves in place. Adds virtual loss."""
+        node = root
+        undos = []
+        node.visits += 1
+        while node.terminal is None:
+            if node.untried is None:
+                node.untried = generate_legal_moves(board, node.player, rows, cols, score_cols)
+                self._rng.shuffle(node.untried)
+            if node.untried:
+                move = node.untried.pop()
+                undo = make_move(board, move, node.player, rows, cols, score_cols, trusted=True)
+                if undo is None:
+                    continue
+                undos.append(undo)
+                child = MCTSNode(move, node, opponent(node.player))
+                node.children.append(child)
+                node = child
+                node.visits += 1
+                break
+            if not node.children:
+                break
+            node = node.uct_child(self.exploration)
+            undos.append(make_move(board, node.move, node.parent.player, rows, cols, score_cols, trusted=True))
+            node.visits += 1
+        if node.terminal is None:
+            winner = check_win(board, rows, cols, score_cols)
+            if winner:
+                node.terminal = 1.0 if winner == "circle" else 0.0
+        return node, undos
+
+    def _run_batch(self, root: MCTSNode, board, rows, cols, score_cols) -> int:
+        leaves = []
+        jobs = []
+        for _ in range(self.batch_size):
+            leaf, undos = self._select(root, board, rows, cols, score_cols)
+            if leaf.terminal is None:
+                jobs.append((encode_board(board), leaf.player, rows, cols, list(score_cols),
+                             self.playouts_per_leaf, self.max_plies, self._rng.getrandbits(32)))
+            leaves.append(leaf)
+            for undo in reversed(undos):
+                unmake_move(board, undo)
+
+        if self.workers > 1 and len(jobs) > 1:
+            if self._pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            results = iter(self._pool.map(run_playouts, jobs))
+        else:
+            results = iter(map(run_playouts, jobs))
+
+        for leaf in leaves:
+            if leaf.terminal is not None:
+                circle_score = leaf.terminal
+            else:
+                circle_score = next(results) / self.playouts_per_leaf
+            node = leaf
+            while node is not None:
+                if node.parent is not None:
+                    mover = node.parent.player
+                    node.value += circle_score if mover == "circle" else 1.0 - circle_score
+                node = node.parent
+        return len(jobs) * self.playouts_per_leaf
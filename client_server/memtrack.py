@@ -0,0 +1,153 @@
+"""
+River and Stones Game - Allocation Tracking
+
+Opt-in tracemalloc instrumentation of agent moves. Around every choose()
+call the tracer's traces and peak are reset, so that afterwards
+- peak_bytes is the highest memory the move had allocated at any point
+  (transient churn such as board deep copies shows up here)
+- retained_bytes is what the move allocated and did not free
+- the top allocation sites are read from a snapshot of the retained blocks
+
+Moves are summarised per game and over the whole match (all games seen by
+the tracker), and can be checked against a per-move peak budget. Tracing
+slows agents down, so use it for measurement runs only (the tracer's own
+bookkeeping is kept off their clocks).
+
+    python gameEngine.py --mode aivai --circle student --nogui --trace-alloc --alloc-budget 64
+"""
+
+import os
+import json
+import time
+import tracemalloc
+from typing import List, Dict, Any, Optional, Callable
+
+class AllocationTracker:
+    """
+    Per-move allocation statistics for instrumented agents.
+
+    Args:
+        top: Allocation sites kept per move and per summary
+        nframes: Traceback depth recorded by tracemalloc (1 = allocation line only)
+        budget_bytes: Per-move peak budget; moves above it are counted as violations
+    """
+
+    def __init__(self, top: int = 5, nframes: int = 1, budget_bytes: Optional[int] = None):
+        self.top = top
+        self.nframes = nframes
+        self.budget_bytes = budget_bytes
+        self.game = 0
+        self.moves: List[Dict[str, Any]] = []
+        self.games: List[Dict[str, Any]] = []
+        self._overhead: Dict[int, float] = {}   # id(agent) -> tracer seconds in its last choose()
+        self._filters = [tracemalloc.Filter(False, tracemalloc.__file__),
+                         tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                         tracemalloc.Filter(False, "<unknown>")]
+
+    def instrument_agents(self, *agents) -> None:
+        """Trace the choose() of each agent (None entries, i.e. humans, are skipped)."""
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.nframes)
+        for agent in agents:
+            if agent is not None:
+                agent.choose = self.wrap(agent.choose, type(agent).__name__, getattr(agent, "player", "?"), agent)
+
+    def wrap(self, fn: Callable, name: str, player: str, agent: Any = None) -> Callable:
+        """
+        fn, with one move record added per call. The tracer's own time (clearing traces,
+        snapshots) is kept here for overhead_seconds(agent).
+        """
+        tracker = self
+
+        def traced_choose(*args, **kwargs):
+            start = time.perf_counter()
+            tracemalloc.clear_traces()
+            tracemalloc.reset_peak()
+            overhead = time.perf_counter() - start
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                start = time.perf_counter()
+                tracker._record(name, player)
+                if agent is not None:
+                    tracker._overhead[id(agent)] = overhead + time.perf_counter() - start
+
+        traced_choose.__wrapped__ = fn
+        return traced_choose
+
+    def overhead_seconds(self, agent: Any) -> float:
+        """
+        Tracer seconds inside agent's last traced choose(), reported once: gameEngine.Game
+        does not charge them to the agent's clock.
+        """
+        return self._overhead.pop(id(agent), 0.0)
+
+    def end_game(self) -> Dict[str, Any]:
+        """Close the current game; returns its summary."""
+        summary = self._summarise([m for m in self.moves if m["game"] == self.game])
+        summary["game"] = self.game
+        self.games.append(summary)
+        self.game += 1
+        return summary
+
+    def stop(self) -> None:
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def summary(self) -> Dict[str, Any]:
+        """{"match": totals over all moves, "games": per-game summaries, "moves": per-move records}"""
+        return {"budget_bytes": self.budget_bytes, "match": self._summarise(self.moves),
+                "games": self.games, "moves": self.moves}
+
+    def export(self, path: str) -> str:
+        with open(path, "w") as fh:
+            json.dump(self.summary(), fh, indent=2)
+        return path
+
+    def report(self) -> str:
+        """Per-agent match summary: moves, peak and retained bytes, budget violations, top sites."""
+        lines = ["Allocations per move:"]
+        for agent, stats in self._summarise(self.moves)["agents"].items():
+            line = (f"  {agent:24s} moves {stats['moves']:4d}  peak max {_mb(stats['peak_max'])}"
+                    f"  mean {_mb(stats['peak_mean'])}  retained total {_mb(stats['retained_total'])}")
+            if self.budget_bytes is not None:
+                line += f"  over budget {stats['over_budget']}"
+            lines.append(line)
+            for site in stats["top_sites"]:
+                lines.append(f"      {_mb(site['bytes'])} in {site['count']:7d} blocks  {site['site']}")
+        return "\n".join(lines)
+
+    # ---------- internals ----------
+
+    def _record(self, name: str, player: str) -> None:
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(self._filters)
+        sites = [{"site": f"{os.path.basename(s.traceback[0].filename)}:{s.traceback[0].lineno}",
+                  "bytes": s.size, "count": s.count}
+                 for s in snapshot.statistics("lineno")[:self.top]]
+        self.moves.append({"game": self.game, "agent": f"{name} ({player})", "retained_bytes": current,
+                           "peak_bytes": peak, "top_sites": sites})
+
+    def _summarise(self, moves: List[Dict[str, Any]]) -> Dict[str, Any]:
+        agents: Dict[str, Dict[str, Any]] = {}
+        for agent in sorted({m["agent"] for m in moves}):
+            own = [m for m in moves if m["agent"] == agent]
+            peaks = [m["peak_bytes"] for m in own]
+            sites: Dict[str, Dict[str, Any]] = {}
+            for m in own:
+                for site in m["top_sites"]:
+                    total = sites.setdefault(site["site"], {"site": site["site"], "bytes": 0, "count": 0})
+                    total["bytes"] += site["bytes"]
+                    total["count"] += site["count"]
+            agents[agent] = {
+                "moves": len(own),
+                "peak_max": max(peaks),
+                "peak_mean": sum(peaks) / len(peaks),
+                "retained_total": sum(m["retained_bytes"] for m in own),
+                "over_budget": sum(1 for p in peaks if self.budget_bytes is not None and p > self.budget_bytes),
+                "top_sites": sorted(sites.values(), key=lambda s: -s["bytes"])[:self.top],
+            }
+        return {"moves": len(moves), "agents": agents}
+
+def _mb(n: float) -> str:
+    return f"{n / (1 << 20):8.2f} MB"
@@ -0,0 +1,188 @@
+"""
+River and Stones Game - Move Metrics
+
+Per-move latency instrumentation fed from gameEngine.Game's event stream:
+- think time of every move (the "clock" event, measured with time.perf_counter)
+- engine validation time of every submitted move ("move"/"invalid" events)
+- nodes and nodes/sec for agents that report search statistics (last_stats)
+
+Samples are grouped per agent (strategy name and side) and summarised as
+p50/p95/p99. At the end of a run they are exported as JSON and as a
+Prometheus text file, so latency regressions between agent builds can be
+tracked by diffing the JSON or scraping the .prom file.
+
+    metrics = MoveMetrics({"circle": "student", "square": "random"})
+    for event in game.play():
+        metrics.observe(event)
+    metrics.export("run")          # run.json and run.prom
+
+Run this file to play a few headless games and print the summary.
+"""
+
+import json
+import math
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+# metric name -> (unit suffix used in the Prometheus name, help text)
+SERIES = {
+    "think": ("seconds", "Agent think time per move"),
+    "validate": ("seconds", "Engine validation time per submitted move"),
+    "nodes": ("", "Search nodes per move (agents reporting last_stats)"),
+    "nps": ("", "Search nodes per second of think time"),
+}
+
+class LatencyHistogram:
+    """Samples of one series; quantiles are exact (nearest rank), games have at most ~1000 moves."""
+
+    def __init__(self):
+        self.samples: List[float] = []
+        self.total = 0.0
+
+    def add(self, value: float) -> None:
+        self.samples.append(value)
+        self.total += value
+
+    @property
+    def count(self) -> int:
+        return len(self.samples)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[max(0, math.ceil(q * len(ordered)) - 1)]
+
+    def summary(self) -> Dict[str, float]:
+        out = {"count": self.count, "sum": self.total,
+               "mean": self.total / self.count if self.count else 0.0,
+               "max": max(self.samples) if self.samples else 0.0}
+        for q in QUANTILES:
+            out[f"p{round(q * 100)}"] = self.quantile(q)
+        return out
+
+class MoveMetrics:
+    """
+    Per-agent move metrics for one or more games.
+
+    Args:
+        names: Agent name per side, e.g. {"circle": "student", "square": "random"};
+            humans can be named "human"
+    """
+
+    def __init__(self, names: Dict[str, str]):
+        self.names = dict(names)
+        self.series: Dict[Tuple[str, str], Dict[str, LatencyHistogram]] = {}
+        self.games = 0
+        self.started = time.time()
+
+    def observe(self, event: Dict[str, Any]) -> None:
+        """Feed one gameEngine.Game event; unrelated events are ignored."""
+        kind = event["type"]
+        if kind == "clock":
+            elapsed = event["elapsed"]
+            self._add(event["player"], "think", elapsed)
+            nodes = (event.get("stats") or {}).get("nodes")
+            if nodes is not None:
+                self._add(event["player"], "nodes", float(nodes))
+                if elapsed > 0:
+                    self._add(event["player"], "nps", nodes / elapsed)
+        elif kind in ("move", "invalid") and "validate_seconds" in event:
+            self._add(event["player"], "validate", event["validate_seconds"])
+        elif kind == "end":
+            self.games += 1
+
+    def summary(self) -> Dict[str, Any]:
+        """{"games", "agents": [{"agent", "player", <series>: {count, sum, mean, max, p50, p95, p99}}]}"""
+        agents = []
+        for (name, player), series in sorted(self.series.items()):
+            entry = {"agent": name, "player": player}
+            entry.update({metric: hist.summary() for metric, hist in series.items()})
+            agents.append(entry)
+        return {"games": self.games, "started": self.started, "agents": agents}
+
+    def to_json(self) -> str:
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition: one summary (quantiles, _sum, _count) per series and agent."""
+        lines = ["# HELP river_games_total Games observed", "# TYPE river_games_total counter",
+                 f"river_games_total {self.games}"]
+        for metric, (unit, help_text) in SERIES.items():
+            name = f"river_move_{metric}" + (f"_{unit}" if unit else "")
+            rows = [(key, series[metric]) for key, series in sorted(self.series.items()) if metric in series]
+            if not rows:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} summary"]
+            for (agent, player), hist in rows:
+                labels = f'agent="{agent}",player="{player}"'
+                for q in QUANTILES:
+                    lines.append(f'{name}{{{labels},quantile="{q}"}} {hist.quantile(q):.9g}')
+                lines.append(f"{name}_sum{{{labels}}} {hist.total:.9g}")
+                lines.append(f"{name}_count{{{labels}}} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, prefix: str) -> Tuple[str, str]:
+        """Write prefix.json and prefix.prom; returns both paths."""
+        paths = (prefix + ".json", prefix + ".prom")
+        with open(paths[0], "w") as fh:
+            fh.write(self.to_json())
+        with open(paths[1], "w") as fh:
+            fh.write(self.to_prometheus())
+        return paths
+
+    def report(self) -> str:
+        """Short human-readable table of think-time quantiles and nodes/sec."""
+        lines = []
+        for (name, player), series in sorted(self.series.items()):
+            think = series.get("think")
+            if think is None:
+                continue
+            line = (f"{name:12s} {player:6s} moves {think.count:4d}  think p50 {think.quantile(0.5) * 1000:8.1f} ms"
+                    f"  p95 {think.quantile(0.95) * 1000:8.1f} ms  p99 {think.quantile(0.99) * 1000:8.1f} ms")
+            if "nps" in series:
+                line += f"  nps p50 {series['nps'].quantile(0.5):9.0f}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    # ---------- internals ----------
+
+    def _add(self, player: str, metric: str, value: float) -> None:
+        key = (self.names.get(player, player), player)
+        series = self.series.setdefault(key, {})
+        hist = series.get(metric)
+        if hist is None:
+            hist = series[metric] = LatencyHistogram()
+        hist.add(value)
+
+# ==================== BENCHMARK ====================
+
+def benchmark_agents(circle: str = "student", square: str = "random", games: int = 2, seconds: float = 60.0,
+                     prefix: Optional[str] = None) -> MoveMetrics:
+    """Play headless games between two strategies and collect their move metrics."""
+    from gameEngine import Game, create_agents, close_agents, DEFAULT_ROWS, DEFAULT_COLS
+
+    metrics = MoveMetrics({"circle": circle, "square": square})
+    for _ in range(games):
+        agent_circle, agent_square = create_agents({"circle": "ai", "square": "ai"}, circle, square)
+        game = Game({"circle": agent_circle, "square": agent_square}, DEFAULT_ROWS, DEFAULT_COLS, seconds,
+                    adjudication=dict(quiet_plies=100))
+        for event in game.play():
+            metrics.observe(event)
+        close_agents(agent_circle, agent_square)
+    if prefix:
+        metrics.export(prefix)
+    return metrics
+
+if __name__ == "__main__":
+    import argparse
+    ap = argparse.ArgumentParser(description="Headless games with per-move metrics")
+    ap.add_argument("--circle", default="student")
+    ap.add_argument("--square", default="random")
+    ap.add_argument("--games", type=int, default=2)
+    ap.add_argument("--time", type=float, default=1.0, help="Time per player in minutes")
+    ap.add_argument("--out", default=None, help="Write OUT.json and OUT.prom")
+    args = ap.parse_args()
+    print(benchmark_agents(args.circle, args.square, args.games, args.time * 60, args.out).report())
@@ -0,0 +1,219 @@
+"""
+River and Stones Game - Staged Move Generation
+
+Yields a player's legal moves lazily, best candidates first, so that an
+alpha-beta node that cuts off early never pays for the later stages:
+1. hash move (e.g. the previous iteration's PV move) and any priority moves
+   (killers, counter move), if given
+2. steps onto the player's own scoring cells
+3. pushes (stone pushes, then river pushes, which need a river-flow walk)
+4. river-flow jumps, landings on own scoring cells first
+5. plain steps
+6. flips and rotates (each needs a flow safety check)
+
+Together the stages yield exactly the moves of generate_legal_moves (in a
+different order, each once). Hash and priority moves come from other
+positions, so each is first checked with is_generated(): validate_and_apply_move
+alone would accept moves the generator never produces (a "move" to any empty
+cell). The board must be in
+the same state whenever the generator is resumed (make/unmake between yields
+is fine).
+
+    for move in staged_moves(board, player, rows, cols, score_cols, hash_move=pv_move):
+        ...
+"""
+
+from typing import List, Dict, Any, Optional, Tuple, Iterator, Callable
+
+from gameEngine import (BoardGeometry, PieceIndex, board_geometry, flow_destinations, valid_targets, owned_cells,
+                        _flow_reaches_opponent_score)
+
+STAGES = ("hash", "scoring", "pushes", "flow", "steps", "flips")
+
+MoveKey = Tuple[Any, ...]
+
+def move_key(move: Dict[str, Any]) -> MoveKey:
+    """Hashable identity of a move on the fields the engine reads."""
+    def cell(key: str) -> Optional[Tuple[int, int]]:
+        pos = move.get(key)
+        return (int(pos[0]), int(pos[1])) if pos else None
+    return (move.get("action"), cell("from"), cell("to"), cell("pushed_to"), move.get("orientation"))
+
+def staged_moves(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                 hash_move: Optional[Dict[str, Any]] = None,
+                 priority: Optional[List[Dict[str, Any]]] = None,
+                 key: Optional[Callable[[Dict[str, Any]], float]] = None,
+                 stats: Optional[Dict[str, int]] = None,
+                 pieces: Optional[PieceIndex] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Generate player's legal moves stage by stage (see module docstring).
+
+    Args:
+        board: Current board (left untouched)
+        player: Side to move
+        rows, cols: Board dimensions
+        score_cols: Scoring column indices
+        hash_move: Move to try before generating anything
+        priority: Further moves to try right after the hash move (e.g. killers from
+            ordering.MoveOrdering); like the hash move, only yielded if legal here
+        key: Optional score; each stage is then generated whole and yielded best first
+        stats: Optional counter dict; each stage entered increments stats[stage]
+        pieces: PieceIndex of board, if the caller keeps one (saves scanning the board)
+    """
+    geo = board_geometry(rows, cols, score_cols)
+    first = ([hash_move] if hash_move is not None else []) + list(priority or [])
+    skip = set()
+    for move in first:
+        k = move_key(move)
+        if k not in skip and _is_generated(board, move, player, geo):
+            skip.add(k)
+            _count(stats, "hash")
+            yield move
+
+    pieces = owned_cells(board, player, rows, cols, pieces)
+    # (from, to) of "move" actions already yielded; steps and river jumps can reach the same cell
+    done = set()
+    stages = (("scoring", _scoring), ("pushes", _pushes), ("flow", _flow), ("steps", _steps), ("flips", _flips))
+    for name, stage in stages:
+        _count(stats, name)
+        moves = stage(board, pieces, done, player, geo)
+        if key is not None:
+            moves = sorted(moves, key=key, reverse=True)
+        for move in moves:
+            if not skip or move_key(move) not in skip:
+                yield move
+
+def is_generated(board: List[List[Any]], move: Dict[str, Any], player: str, rows: int, cols: int,
+                 score_cols: List[int]) -> bool:
+    """True if generate_legal_moves would produce move in this position; checks only the moving piece."""
+    return _is_generated(board, move, player, board_geometry(rows, cols, score_cols))
+
+def _is_generated(board: List[List[Any]], move: Dict[str, Any], player: str, geo: BoardGeometry) -> bool:
+    try:
+        fx, fy = int(move["from"][0]), int(move["from"][1])
+    except (KeyError, TypeError, IndexError, ValueError):
+        return False
+    if not geo.in_bounds(fx, fy):
+        return False
+    p = board[fy][fx]
+    if p is None or p.owner != player:
+        return False
+    action = move.get("action")
+    if action in ("move", "push"):
+        info = valid_targets(board, fx, fy, player, geo)
+        to = tuple(int(v) for v in move.get("to") or ())
+        if action == "move":
+            return to in info["moves"]
+        pushed = tuple(int(v) for v in move.get("pushed_to") or ())
+        if (to, pushed) not in info["pushes"]:
+            return False
+        return pushed not in geo.blocked[board[to[1]][to[0]].owner]
+    if action == "flip":
+        if p.side == "river":
+            return move.get("orientation") is None   # the generator's form of flipping back to a stone
+        if move.get("orientation") not in ("horizontal", "vertical"):
+            return False
+        return not _unsafe_as(board, p, fx, fy, "river", move["orientation"], player, geo)
+    if action == "rotate":
+        if p.side != "river":
+            return False
+        new_ori = "horizontal" if p.orientation == "vertical" else "vertical"
+        return not _unsafe_as(board, p, fx, fy, "river", new_ori, player, geo)
+    return False
+
+# ==================== STAGES ====================
+# Each stage takes (board, pieces, done, player, geo) and yields moves.
+
+def _scoring(board, pieces, done, player, geo):
+    own = geo.own_score[player]
+    for x, y in pieces:
+        for tx, ty in _empty_neighbours(board, x, y, player, geo):
+            if (tx, ty) in own:
+                done.add((x, y, tx, ty))
+                yield {"action": "move", "from": [x, y], "to": [tx, ty]}
+
+def _pushes(board, pieces, done, player, geo):
+    blocked = geo.blocked[player]
+    river_pushers = []
+    for x, y in pieces:
+        p = board[y][x]
+        for dx, dy, tx, ty in geo.neighbours[y][x]:
+            target = board[ty][tx] if (tx, ty) not in blocked else None
+            if target is None or target.side == "river":
+                continue
+            if p.side == "river":
+                river_pushers.append((x, y, tx, ty, target.owner))
+                continue
+            px, py = tx + dx, ty + dy
+            # Neither the pusher's nor the pushed piece's opponent scoring cells may be entered
+            if geo.in_bounds(px, py) and board[py][px] is None \
+                    and (px, py) not in blocked and (px, py) not in geo.blocked[target.owner]:
+                yield {"action": "push", "from": [x, y], "to": [tx, ty], "pushed_to": [px, py]}
+    for x, y, tx, ty, pushed_owner in river_pushers:
+        pushed_blocked = geo.blocked[pushed_owner]
+        for px, py in flow_destinations(board, tx, ty, x, y, pushed_owner, geo, river_push=True):
+            if (px, py) not in pushed_blocked:
+                yield {"action": "push", "from": [x, y], "to": [tx, ty], "pushed_to": [px, py]}
+
+def _flow(board, pieces, done, player, geo):
+    blocked, own = geo.blocked[player], geo.own_score[player]
+    for x, y in pieces:
+        for dx, dy, tx, ty in geo.neighbours[y][x]:
+            target = board[ty][tx] if (tx, ty) not in blocked else None
+            if target is None or target.side != "river":
+                continue
+            flow = flow_destinations(board, tx, ty, x, y, player, geo)
+            flow.sort(key=lambda d: d not in own)
+            for fx, fy in flow:
+                if (x, y, fx, fy) not in done:
+                    done.add((x, y, fx, fy))
+                    yield {"action": "move", "from": [x, y], "to": [fx, fy]}
+
+def _steps(board, pieces, done, player, geo):
+    for x, y in pieces:
+        for tx, ty in _empty_neighbours(board, x, y, player, geo):
+            if (x, y, tx, ty) not in done:
+                done.add((x, y, tx, ty))
+                yield {"action": "move", "from": [x, y], "to": [tx, ty]}
+
+def _flips(board, pieces, done, player, geo):
+    for x, y in pieces:
+        p = board[y][x]
+        side, ori = p.side, p.orientation
+        if side == "stone":
+            for new_ori in ("horizontal", "vertical"):
+                p.side = "river"; p.orientation = new_ori
+                unsafe = _flow_reaches_opponent_score(board, x, y, player, geo)
+                p.side = side; p.orientation = ori
+                if not unsafe:
+                    yield {"action": "flip", "from": [x, y], "orientation": new_ori}
+        else:
+            yield {"action": "flip", "from": [x, y]}
+            p.orientation = "horizontal" if ori == "vertical" else "vertical"
+            unsafe = _flow_reaches_opponent_score(board, x, y, player, geo)
+            p.orientation = ori
+            if not unsafe:
+                yield {"action": "rotate", "from": [x, y]}
+
+# ==================== HELPERS ====================
+
+def _unsafe_as(board, p, x: int, y: int, side: str, orientation: str, player: str, geo: BoardGeometry) -> bool:
+    """Would piece p, turned into (side, orientation), let flow reach the opponent's scoring cells?"""
+    old = p.side, p.orientation
+    p.side, p.orientation = side, orientation
+    try:
+        return _flow_reaches_opponent_score(board, x, y, player, geo)
+    finally:
+        p.side, p.orientation = old
+
+def _count(stats: Optional[Dict[str, int]], stage: str) -> None:
+    if stats is not None:
+        stats[stage] = stats.get(stage, 0) + 1
+
+def _empty_neighbours(board: List[List[Any]], x: int, y: int, player: str,
+                      geo: BoardGeometry) -> Iterator[Tuple[int, int]]:
+    """Adjacent empty cells the piece at (x, y) may step to."""
+    blocked = geo.blocked[player]
+    for dx, dy, tx, ty in geo.neighbours[y][x]:
+        if board[ty][tx] is None and (tx, ty) not in blocked:
+            yield tx, ty
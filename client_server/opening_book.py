@@ -0,0 +1,326 @@
+"""
+River and Stones Game - Opening Book
+
+A shared opening book keyed by (position hash, colour to move) that holds
+weighted candidate moves. The position hash is gameEngine.position_hash, which
+the C++ agent computes identically, so Python and C++ agents read the same file.
+The hash covers only the pieces, so a book is built for one scoring geometry
+(scoring-area width and stones needed to win, see gameEngine.configure_geometry)
+and is not loaded for any other.
+
+File format (little-endian):
+    header : magic b"RSOB", version u16, score width u8, win count u8, record count u32
+    record : hash u64, colour u8 (0 circle, 1 square), action u8
+             (0 move, 1 push, 2 flip, 3 rotate), fx fy tx ty px py i8 (-1 unused),
+             orientation u8 (0 none, 1 horizontal, 2 vertical), pad u8, weight u16
+Records are sorted by (hash, colour) and then by descending weight. The file is
+memory-mapped and probed by binary search, so a lookup is O(log n) and only the
+touched pages are read. Version 1 files have no geometry (reserved u16 of zero)
+and were built for the default one.
+
+Build a book from game archives and/or offline search:
+    python opening_book.py build --out opening_book.bin --games games.jsonl
+    python opening_book.py build --out opening_book.bin --search-plies 4 --search-time 2
+    python opening_book.py build --out wide.bin --score-width 6 --search-plies 4
+An archive holds one JSON game per line: {"rows": 13, "cols": 12, "winner": "circle",
+"moves": [move, ...]} with moves alternating from Circle, or entries of the form
+{"player": "square", "move": move}.
+"""
+
+import os
+import mmap
+import json
+import random
+import struct
+import argparse
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+from gameEngine import (position_hash, default_start_board, score_cols_for, validate_and_apply_move,
+                        check_win, opponent, configure_geometry, score_width, win_count,
+                        DEFAULT_ROWS, DEFAULT_COLS)
+
+MAGIC = b"RSOB"
+VERSION = 2
+VERSION_1_GEOMETRY = (4, 4)   # (score width, win count) every version 1 book was built for
+HEADER = struct.Struct("<4sHBBI")
+RECORD = struct.Struct("<QBBbbbbbbBBH")
+KEY = struct.Struct("<QB")
+
+COLOURS = ("circle", "square")
+ACTIONS = ("move", "push", "flip", "rotate")
+ORIENTATIONS = (None, "horizontal", "vertical")
+
+DEFAULT_BOOK_PATH = os.environ.get("RIVER_STONES_BOOK",
+                                   os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"))
+
+# ==================== MOVE ENCODING ====================
+
+def encode_move(move: Dict[str, Any]) -> Tuple[int, int, int, int, int, int, int, int]:
+    """(action, fx, fy, tx, ty, px, py, orientation) fields of a book record."""
+    fr = move.get("from") or (-1, -1)
+    to = move.get("to") or (-1, -1)
+    pushed = move.get("pushed_to") or (-1, -1)
+    ori = move.get("orientation") if move.get("action") == "flip" else None
+    return (ACTIONS.index(move["action"]), int(fr[0]), int(fr[1]), int(to[0]), int(to[1]),
+            int(pushed[0]), int(pushed[1]), ORIENTATIONS.index(ori) if ori in ORIENTATIONS else 0)
+
+def decode_move(fields: Tuple[int, ...]) -> Dict[str, Any]:
+    """Inverse of encode_move."""
+    action, fx, fy, tx, ty, px, py, ori = fields
+    move: Dict[str, Any] = {"action": ACTIONS[action], "from": [fx, fy]}
+    if action in (0, 1):
+        move["to"] = [tx, ty]
+    if action == 1:
+        move["pushed_to"] = [px, py]
+    if action == 2 and ori:
+        move["orientation"] = ORIENTATIONS[ori]
+    return move
+
+# ==================== READER ====================
+
+class OpeningBook:
+    """Memory-mapped, read-only view of a book file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as fh:
+            size = os.fstat(fh.fileno()).st_size
+            if size < HEADER.size:
+                raise ValueError(f"{path}: not an opening book")
+            self._map = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, width, wins, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version not in (1, VERSION):
+            raise ValueError(f"{path}: unsupported opening book (magic {magic!r}, version {version})")
+        if HEADER.size + count * RECORD.size > size:
+            raise ValueError(f"{path}: truncated opening book")
+        self.count = count
+        self.geometry = VERSION_1_GEOMETRY if version == 1 else (width, wins)
+
+    def __len__(self) -> int:
+        return self.count
+
+    def close(self) -> None:
+        self._map.close()
+
+    def _key_at(self, i: int) -> Tuple[int, int]:
+        return KEY.unpack_from(self._map, HEADER.size + i * RECORD.size)
+
+    def lookup(self, pos_hash: int, colour: str) -> List[Tuple[Dict[str, Any], int]]:
+        """Candidate (move, weight) pairs for a position, best first."""
+        key = (pos_hash, COLOURS.index(colour))
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._key_at(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        out = []
+        i = lo
+        while i < self.count and self._key_at(i) == key:
+            rec = RECORD.unpack_from(self._map, HEADER.size + i * RECORD.size)
+            out.append((decode_move(rec[2:10]), rec[11]))
+            i += 1
+        return out
+
+    def probe(self, board: List[List[Any]], player: str, rows: int, cols: int) -> List[Tuple[Dict[str, Any], int]]:
+        """Candidate moves for player in the given position."""
+        return self.lookup(position_hash(board, rows, cols), player)
+
+    def choose_move(self, board: List[List[Any]], player: str, rows: int, cols: int,
+                    rng: Optional[random.Random] = None) -> Optional[Dict[str, Any]]:
+        """A weighted random candidate for the position, or None when out of book."""
+        candidates = self.probe(board, player, rows, cols)
+        if not candidates:
+            return None
+        rng = rng or random
+        total = sum(w for _, w in candidates)
+        if total <= 0:
+            return candidates[0][0]
+        pick = rng.random() * total
+        for move, weight in candidates:
+            pick -= weight
+            if pick < 0:
+                return move
+        return candidates[-1][0]
+
+_BOOKS: Dict[str, Optional[OpeningBook]] = {}
+
+def load_book(path: Optional[str] = None) -> Optional[OpeningBook]:
+    """
+    Open (once per process) the book at path, or the default book; None if there is
+    none or it was built for another scoring geometry than the current one.
+    """
+    path = path or DEFAULT_BOOK_PATH
+    if path not in _BOOKS:
+        try:
+            _BOOKS[path] = OpeningBook(path) if os.path.exists(path) else None
+        except (OSError, ValueError) as e:
+            print(f"Warning: ignoring opening book {path}: {e}")
+            _BOOKS[path] = None
+    book = _BOOKS[path]
+    if book is not None and book.geometry != (score_width(), win_count()):
+        return None
+    return book
+
+# ==================== BUILDER ====================
+
+class BookBuilder:
+    """
+    Accumulates weighted (position, colour, move) entries and writes a sorted book file
+    for the scoring geometry current when it was created.
+    """
+
+    def __init__(self, rows: int = DEFAULT_ROWS, cols: int = DEFAULT_COLS):
+        self.rows = rows
+        self.cols = cols
+        self.score_cols = score_cols_for(cols)
+        self.geometry = (score_width(), win_count())
+        self.weights: Dict[Tuple[int, int, Tuple[int, ...]], int] = {}
+
+    def add(self, pos_hash: int, colour: str, move: Dict[str, Any], weight: int = 1) -> None:
+        key = (pos_hash, COLOURS.index(colour), encode_move(move))
+        self.weights[key] = self.weights.get(key, 0) + weight
+
+    def add_game(self, moves: Iterable[Any], winner: Optional[str] = None, max_plies: int = 16) -> int:
+        """
+        Replay an archived game from the start position and record its first max_plies moves.
+        Moves by the eventual winner count 3, drawn games 2, losing moves 1.
+
+        Returns:
+            Number of positions recorded
+        """
+        rows, cols, score_cols = self.rows, self.cols, self.score_cols
+        board = default_start_board(rows, cols)
+        player = "circle"
+        added = 0
+        for ply, entry in enumerate(moves):
+            if ply >= max_plies:
+                break
+            if isinstance(entry, dict) and "move" in entry:
+                player = entry.get("player", player)
+                move = entry["move"]
+            else:
+                move = entry
+            h = position_hash(board, rows, cols)
+            ok, _ = validate_and_apply_move(board, move, player, rows, cols, score_cols)
+            if not ok:
+                break
+            weight = 2 if winner is None else (3 if winner == player else 1)
+            self.add(h, player, move, weight)
+            added += 1
+            if check_win(board, rows, cols, score_cols):
+                break
+            player = opponent(player)
+        return added
+
+    def add_archive(self, path: str, max_plies: int = 16) -> int:
+        """Add every game of a JSON Lines archive; returns the number of games read."""
+        games = 0
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                line = line.strip()
+                if not line:
+                    continue
+                game = json.loads(line)
+                if game.get("rows", self.rows) != self.rows or game.get("cols", self.cols) != self.cols:
+                    continue
+                self.add_game(game.get("moves", []), game.get("winner"), max_plies)
+                games += 1
+        return games
+
+    def add_search(self, plies: int, time_per_position: float = 1.0, branch: int = 1) -> int:
+        """
+        Expand the book by offline alpha-beta search from the start position: the
+        best `branch` moves of every position are recorded and followed for `plies` plies.
+
+        Returns:
+            Number of positions searched
+        """
+        from search import AlphaBetaSearch, make_move, unmake_move
+        from gameEngine import generate_legal_moves
+
+        rows, cols, score_cols = self.rows, self.cols, self.score_cols
+        searcher = AlphaBetaSearch()
+        board = default_start_board(rows, cols)
+        searched = 0
+
+        def expand(player: str, depth_left: int) -> None:
+            nonlocal searched
+            if depth_left == 0 or check_win(board, rows, cols, score_cols):
+                return
+            h = position_hash(board, rows, cols)
+            remaining = generate_legal_moves(board, player, rows, cols, score_cols)
+            picks = []
+            for rank in range(branch):
+                if not remaining:
+                    break
+                best = searcher.search(board, player, rows, cols, score_cols, time_per_position,
+                                       root_moves=remaining)
+                searched += 1
+                if best is None:
+                    break
+                picks.append(best)
+                self.add(h, player, best, branch - rank)
+                remaining = [m for m in remaining if encode_move(m) != encode_move(best)]
+            for move in picks:
+                undo = make_move(board, move, player, rows, cols, score_cols, trusted=True)
+                if undo is None:
+                    continue
+                expand(opponent(player), depth_left - 1)
+                unmake_move(board, undo)
+
+        expand("circle", plies)
+        return searched
+
+    def write(self, path: str) -> int:
+        """Write the book sorted for binary search; returns the number of records."""
+        records = sorted(self.weights.items(), key=lambda kv: (kv[0][0], kv[0][1], -kv[1]))
+        with open(path, "wb") as fh:
+            fh.write(HEADER.pack(MAGIC, VERSION, *self.geometry, len(records)))
+            for (pos_hash, colour, fields), weight in records:
+                fh.write(RECORD.pack(pos_hash, colour, *fields, 0, min(weight, 0xFFFF)))
+        return len(records)
+
+# ==================== CLI ====================
+
+def main():
+    ap = argparse.ArgumentParser(description="Build or inspect a River and Stones opening book")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build")
+    b.add_argument("--out", default=DEFAULT_BOOK_PATH)
+    b.add_argument("--games", nargs="*", default=[], help="JSON Lines game archives")
+    b.add_argument("--max-plies", type=int, default=16, help="Plies recorded per archived game")
+    b.add_argument("--search-plies", type=int, default=0, help="Plies to expand by offline search")
+    b.add_argument("--search-time", type=float, default=1.0, help="Seconds of search per position")
+    b.add_argument("--search-branch", type=int, default=1, help="Best moves recorded and followed per position")
+    b.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    b.add_argument("--cols", type=int, default=DEFAULT_COLS)
+    b.add_argument("--score-width", type=int, default=None, help="Scoring area width (default: the engine's)")
+    b.add_argument("--win-count", type=int, default=None, help="Stones needed to win (default: the scoring area width)")
+    s = sub.add_parser("show")
+    s.add_argument("--book", default=DEFAULT_BOOK_PATH)
+    s.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    s.add_argument("--cols", type=int, default=DEFAULT_COLS)
+    args = ap.parse_args()
+
+    if args.cmd == "build":
+        if args.score_width is not None or args.win_count is not None:
+            width = args.score_width if args.score_width is not None else score_width()
+            configure_geometry(width, args.win_count if args.win_count is not None else width)
+        builder = BookBuilder(args.rows, args.cols)
+        for path in args.games:
+            print(f"{path}: {builder.add_archive(path, args.max_plies)} games")
+        if args.search_plies:
+            searched = builder.add_search(args.search_plies, args.search_time, args.search_branch)
+            print(f"search: {searched} positions")
+        print(f"wrote {builder.write(args.out)} records to {args.out}")
+    else:
+        book = OpeningBook(args.book)
+        board = default_start_board(args.rows, args.cols)
+        print(f"{args.book}: {len(book)} records, score width {book.geometry[0]}, win count {book.geometry[1]}")
+        for move, weight in book.probe(board, "circle", args.rows, args.cols):
+            print(f"  start position, circle: {move} (weight {weight})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+"""
+River and Stones Game - Move Ordering Heuristics
+
+Search-independent ordering state for any alpha-beta search built on the
+engine's move generators (the C++ agent keeps the same tables):
+- Killer moves: per ply, the last quiet moves that caused a beta cutoff
+- History table: cutoff bonus (depth squared) per (action, from-cell, to-cell)
+- Butterfly table: how often each (action, from-cell, to-cell) was searched,
+  so that moves are ranked by history / butterfly (relative history)
+- Counter moves: the move that last refuted each opponent move
+
+Moves are identified by move_index(). The history and butterfly tables are
+dicts holding only the moves actually searched: a dense table would need
+4 * (rows*cols)^2 entries (580k on the default board, 67M on 64x64) and
+would be rebuilt on every aging. History is halved between searches so that
+old results fade.
+
+    ordering = MoveOrdering(rows, cols)
+    priority = ordering.priority_moves(ply, previous_move)
+    ...
+    ordering.searched(move)
+    ordering.cutoff(move, ply, depth, previous_move)
+
+Run this file to compare fixed-depth search nodes with and without it.
+"""
+
+import random
+import time
+from typing import List, Dict, Any, Optional
+
+ACTIONS = {"move": 0, "push": 1, "flip": 2, "rotate": 3}
+
+class MoveOrdering:
+    """
+    Killer, history/butterfly and counter-move tables for one board size.
+
+    Args:
+        rows, cols: Board dimensions
+        max_ply: Deepest ply with killer slots
+        killer_slots: Killer moves kept per ply
+    """
+
+    def __init__(self, rows: int, cols: int, max_ply: int = 64, killer_slots: int = 2):
+        self.rows, self.cols = rows, cols
+        self.max_ply = max_ply
+        self.killer_slots = killer_slots
+        self.history: Dict[int, float] = {}
+        self.butterfly: Dict[int, float] = {}
+        self.killers: List[List[Dict[str, Any]]] = [[] for _ in range(max_ply)]
+        self.counters: Dict[int, Dict[str, Any]] = {}
+
+    def move_index(self, move: Dict[str, Any]) -> int:
+        """Table index of a move: (action, from-cell, to-cell); flips and rotates use their own cell as target."""
+        cells = self.rows * self.cols
+        fx, fy = move["from"]
+        to = move.get("to") or move["from"]
+        return (ACTIONS[move["action"]] * cells + int(fy) * self.cols + int(fx)) * cells + int(to[1]) * self.cols + int(to[0])
+
+    def score(self, move: Dict[str, Any]) -> float:
+        """Relative history score of a move (higher is tried earlier)."""
+        i = self.move_index(move)
+        return self.history.get(i, 0.0) / (1.0 + self.butterfly.get(i, 0.0))
+
+    def priority_moves(self, ply: int, previous: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Killers for ply, then the counter move to previous; to be tried right after the hash move."""
+        moves = list(self.killers[ply]) if ply < self.max_ply else []
+        if previous is not None:
+            counter = self.counters.get(self.move_index(previous))
+            if counter is not None and counter not in moves:
+                moves.append(counter)
+        return moves
+
+    def order(self, moves: List[Dict[str, Any]], ply: int, previous: Optional[Dict[str, Any]] = None,
+              hash_move: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Sort a full move list: hash move, killers, counter move, then by relative history."""
+        from movegen import move_key
+        rank = {}
+        for r, m in enumerate(([hash_move] if hash_move is not None else []) + self.priority_moves(ply, previous)):
+            rank.setdefault(move_key(m), r)
+        first = len(rank)
+        return sorted(moves, key=lambda m: (rank.get(move_key(m), first), -self.score(m)))
+
+    def searched(self, move: Dict[str, Any]) -> None:
+        """Count a move searched without (yet) causing a cutoff."""
+        i = self.move_index(move)
+        self.butterfly[i] = self.butterfly.get(i, 0.0) + 1.0
+
+    def cutoff(self, move: Dict[str, Any], ply: int, depth: int, previous: Optional[Dict[str, Any]] = None) -> None:
+        """Record a move that caused a beta cutoff."""
+        i = self.move_index(move)
+        self.history[i] = self.history.get(i, 0.0) + depth * depth
+        if ply < self.max_ply:
+            killers = self.killers[ply]
+            if move not in killers:
+                killers.insert(0, move)
+                del killers[self.killer_slots:]
+        if previous is not None:
+            self.counters[self.move_index(previous)] = move
+
+    def new_search(self) -> None:
+        """Age the tables before a new search: halve history, drop killers (their plies now mean other positions)."""
+        self.history = {i: h * 0.5 for i, h in self.history.items()}
+        self.butterfly = {i: b * 0.5 for i, b in self.butterfly.items()}
+        for killers in self.killers:
+            killers.clear()
+
+    def clear(self) -> None:
+        self.history.clear()
+        self.butterfly.clear()
+        for killers in self.killers:
+            killers.clear()
+        self.counters.clear()
+
+# ==================== BENCHMARK ====================
+
+def standard_positions(count: int = 12, seed: int = 7) -> List[Any]:
+    """Reproducible mid-game positions: random games from the start position, 10-40 plies in."""
+    from gameEngine import default_start_board, score_cols_for, generate_legal_moves, validate_and_apply_move, \
+        check_win, opponent, DEFAULT_ROWS, DEFAULT_COLS
+
+    rows, cols = DEFAULT_ROWS, DEFAULT_COLS
+    score_cols = score_cols_for(cols)
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        board, player = default_start_board(rows, cols), "circle"
+        for _ in range(rng.randint(10, 40)):
+            moves = generate_legal_moves(board, player, rows, cols, score_cols)
+            if not moves:
+                break
+            validate_and_apply_move(board, rng.choice(moves), player, rows, cols, score_cols)
+            player = opponent(player)
+        if check_win(board, rows, cols, score_cols) is None:
+            positions.append((board, player))
+    return positions
+
+def benchmark_ordering(count: int = 12, depth: int = 3, seed: int = 7) -> None:
+    """Fixed-depth searches over standard_positions() with each ordering scheme; prints nodes and time."""
+    import copy
+    from gameEngine import score_cols_for, DEFAULT_ROWS, DEFAULT_COLS
+    from search import AlphaBetaSearch
+
+    rows, cols = DEFAULT_ROWS, DEFAULT_COLS
+    score_cols = score_cols_for(cols)
+    positions = standard_positions(count, seed)
+    schemes = [
+        ("generation order + PV move", dict(staged=False, ordering=False)),
+        ("staged", dict(staged=True, ordering=False)),
+        ("generation order + heuristics", dict(staged=False, ordering=True)),
+        ("staged + heuristics", dict(staged=True, ordering=True)),
+    ]
+    baseline = None
+    for name, kwargs in schemes:
+        searcher = AlphaBetaSearch(**kwargs)
+        nodes = 0
+        start = time.perf_counter()
+        for board, player in positions:
+            searcher.search(copy.deepcopy(board), player, rows, cols, score_cols, float("inf"), max_depth=depth)
+            nodes += searcher.nodes
+        elapsed = time.perf_counter() - start
+        baseline = baseline or nodes
+        print(f"{name:32s} {nodes:9d} nodes ({100.0 * nodes / baseline:5.1f}%)  {elapsed:6.2f}s")
+
+if __name__ == "__main__":
+    benchmark_ordering()
@@ -0,0 +1,195 @@
+"""
+River and Stones Game - Fast Random Playouts
+
+Samples a single legal move without generating the full move list:
+pick one of the player's pieces and one of its action slots (four step/push
+directions, flip, and rotate for rivers), check that draw locally against the
+same rules compute_valid_targets and validate_and_apply_move enforce, and retry
+on failure. Only a move that lands on a river pays for a river-flow walk.
+
+Piece locations are tracked per owner so no full-board scan is needed per ply.
+"""
+
+import random
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+from gameEngine import (BoardGeometry, board_geometry, flow_destinations, generate_legal_moves, check_win,
+                        opponent, _flow_reaches_opponent_score, DIRECTIONS)
+
+# Relative acceptance weights per action kind; uniform over draws by default
+DEFAULT_WEIGHTS = {"move": 1.0, "push": 1.0, "flip": 1.0, "rotate": 1.0}
+
+# ==================== PIECE TRACKING ====================
+
+def find_pieces(board: List[List[Any]], rows: int, cols: int) -> Dict[str, List[Tuple[int, int]]]:
+    """Scan the board once and return the piece locations of each owner."""
+    pieces = {"circle": [], "square": []}
+    for y in range(rows):
+        for x in range(cols):
+            p = board[y][x]
+            if p:
+                pieces[p.owner].append((x, y))
+    return pieces
+
+def apply_sampled_move(board: List[List[Any]], move: Dict[str, Any], player: str,
+                       pieces: Dict[str, List[Tuple[int, int]]]) -> None:
+    """
+    Apply a move produced by sample_move without re-validating it, keeping
+    `pieces` in sync. Mirrors the board updates of validate_and_apply_move.
+    """
+    action = move["action"]
+    fx, fy = move["from"]
+    piece = board[fy][fx]
+    if action == "move":
+        tx, ty = move["to"]
+        board[ty][tx] = piece; board[fy][fx] = None
+        own = pieces[player]; own[own.index((fx, fy))] = (tx, ty)
+    elif action == "push":
+        tx, ty = move["to"]; px, py = move["pushed_to"]
+        pushed = board[ty][tx]
+        board[py][px] = pushed; board[ty][tx] = piece; board[fy][fx] = None
+        other = pieces[pushed.owner]; other[other.index((tx, ty))] = (px, py)
+        own = pieces[player]; own[own.index((fx, fy))] = (tx, ty)
+        if piece.side == "river":
+            piece.side = "stone"; piece.orientation = None
+    elif action == "flip":
+        if piece.side == "stone":
+            piece.side = "river"; piece.orientation = move["orientation"]
+        else:
+            piece.side = "stone"; piece.orientation = None
+    elif action == "rotate":
+        piece.orientation = "horizontal" if piece.orientation == "vertical" else "vertical"
+
+# ==================== SAMPLING ====================
+
+def _try_draw(board, x: int, y: int, slot: int, player: str, geo: BoardGeometry,
+              rng: random.Random) -> Optional[Dict[str, Any]]:
+    """Check one (piece, slot) draw; return the legal move it names or None."""
+    p = board[y][x]
+    if slot < 4:
+        dx, dy = DIRECTIONS[slot]
+        tx, ty = x + dx, y + dy
+        if not geo.in_bounds(tx, ty) or (tx, ty) in geo.blocked[player]:
+            return None
+        target = board[ty][tx]
+        if target is None:
+            return {"action": "move", "from": [x, y], "to": [tx, ty]}
+        if target.side == "river":
+            flow = flow_destinations(board, tx, ty, x, y, player, geo)
+            if not flow:
+                return None
+            d = rng.choice(flow)
+            return {"action": "move", "from": [x, y], "to": [d[0], d[1]]}
+        owner = target.owner
+        if p.side == "stone":
+            px, py = tx + dx, ty + dy
+            if (geo.in_bounds(px, py) and board[py][px] is None
+                    and (px, py) not in geo.blocked[player] and (px, py) not in geo.blocked[owner]):
+                return {"action": "push", "from": [x, y], "to": [tx, ty], "pushed_to": [px, py]}
+            return None
+        blocked = geo.blocked[owner]
+        flow = [d for d in flow_destinations(board, tx, ty, x, y, owner, geo, river_push=True) if d not in blocked]
+        if not flow:
+            return None
+        d = rng.choice(flow)
+        return {"action": "push", "from": [x, y], "to": [tx, ty], "pushed_to": [d[0], d[1]]}
+
+    side, ori = p.side, p.orientation
+    if slot == 4:
+        if side == "river":
+            return {"action": "flip", "from": [x, y]}
+        new_ori = "horizontal" if rng.random() < 0.5 else "vertical"
+        p.side = "river"; p.orientation = new_ori
+        unsafe = _flow_reaches_opponent_score(board, x, y, player, geo)
+        p.side = side; p.orientation = ori
+        return None if unsafe else {"action": "flip", "from": [x, y], "orientation": new_ori}
+
+    p.orientation = "horizontal" if ori == "vertical" else "vertical"
+    unsafe = _flow_reaches_opponent_score(board, x, y, player, geo)
+    p.orientation = ori
+    return None if unsafe else {"action": "rotate", "from": [x, y]}
+
+def sample_move(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                pieces: Dict[str, List[Tuple[int, int]]], rng: Optional[random.Random] = None,
+                weights: Optional[Dict[str, float]] = None, max_tries: int = 64) -> Optional[Dict[str, Any]]:
+    """
+    Sample one legal move for player by rejection sampling.
+
+    Args:
+        board: Current board state (not modified)
+        player: Side to move
+        rows, cols: Board dimensions
+        score_cols: Scoring column indices
+        pieces: Piece locations per owner (see find_pieces)
+        rng: Random generator; the module-level one by default
+        weights: Relative acceptance weight per action kind ("move", "push", "flip", "rotate")
+        max_tries: Draws before falling back to full move generation
+
+    Returns:
+        A legal move, or None if the player has none
+    """
+    rng = rng or random
+    geo = board_geometry(rows, cols, score_cols)
+    own = pieces[player]
+    if not own:
+        return None
+    wmax = 0.0
+    if weights:
+        wmax = max(weights.values())
+    for _ in range(max_tries):
+        x, y = own[int(rng.random() * len(own))]
+        slots = 6 if board[y][x].side == "river" else 5
+        move = _try_draw(board, x, y, int(rng.random() * slots), player, geo, rng)
+        if move is None:
+            continue
+        if weights and rng.random() * wmax >= weights.get(move["action"], 0.0):
+            continue
+        return move
+    moves = generate_legal_moves(board, player, rows, cols, score_cols)
+    return rng.choice(moves) if moves else None
+
+def random_playout(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                   max_plies: int, rng: Optional[random.Random] = None,
+                   weights: Optional[Dict[str, float]] = None) -> Tuple[Optional[str], int]:
+    """
+    Play random moves in place until someone wins or max_plies is reached.
+
+    Returns:
+        (winner or None, plies played)
+    """
+    pieces = find_pieces(board, rows, cols)
+    for ply in range(max_plies):
+        move = sample_move(board, player, rows, cols, score_cols, pieces, rng, weights)
+        if move is None:
+            return None, ply
+        apply_sampled_move(board, move, player, pieces)
+        winner = check_win(board, rows, cols, score_cols)
+        if winner:
+            return winner, ply + 1
+        player = opponent(player)
+    return None, max_plies
+
+# ==================== BENCHMARK ====================
+
+def benchmark_playouts(games: int = 200, max_plies: int = 1000, seed: int = 0) -> None:
+    """Time full random games from the start position and report the cost per ply."""
+    from gameEngine import default_start_board, score_cols_for, DEFAULT_ROWS, DEFAULT_COLS
+
+    rows, cols = DEFAULT_ROWS, DEFAULT_COLS
+    score_cols = score_cols_for(cols)
+    rng = random.Random(seed)
+    plies = 0
+    wins = 0
+    start = time.perf_counter()
+    for _ in range(games):
+        board = default_start_board(rows, cols)
+        winner, n = random_playout(board, "circle", rows, cols, score_cols, max_plies, rng)
+        plies += n
+        wins += winner is not None
+    elapsed = time.perf_counter() - start
+    print(f"{games} games, {plies} plies, {wins} decided in {elapsed:.2f}s "
+          f"-> {1e6 * elapsed / max(1, plies):.1f} us/ply, {games / elapsed:.1f} games/s")
+
+if __name__ == "__main__":
+    benchmark_playouts()
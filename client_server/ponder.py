@@ -0,0 +1,150 @@
+"""
+River and Stones Game - Pondering
+
+Keeps an agent searching while the opponent thinks. After choosing a move the
+agent predicts the opponent's reply (the second move of its principal
+variation) and a persistent worker process searches the position after that
+reply. When the agent is next asked to move:
+- hit: the current position is the pondered one, and the worker's completed
+  (depth, score, pv) seeds iterative deepening, which resumes one ply deeper
+- miss: the pondered result is discarded
+
+A process is used rather than a thread so the opponent, which runs in the
+same engine process, does not lose CPU time to the GIL; it needs a spare core
+for the same reason. The engine reports the
+actual reply through opponent_moved(), which stops a mispredicted ponder early.
+"""
+
+import os
+import time
+import multiprocessing
+from typing import List, Dict, Any, Optional, Tuple
+
+from gameEngine import position_hash
+from search import AlphaBetaSearch, same_move
+
+Prior = Tuple[int, float, List[Dict[str, Any]]]
+
+def available_cores() -> int:
+    """Cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+# ==================== WORKER ====================
+
+def _ponder_worker(conn, active_job, search_kwargs: Dict[str, Any]) -> None:
+    """
+    Run searches sent over conn until told to quit; each job ends with one result
+    message. A job stops as soon as the shared active_job value no longer names it.
+    """
+    searcher = AlphaBetaSearch(**search_kwargs)
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job[0] == "quit":
+            return
+        _, job_id, board, player, rows, cols, score_cols, time_limit = job
+        try:
+            searcher.search(board, player, rows, cols, score_cols, time_limit,
+                            stop=lambda: active_job.value != job_id)
+            result = (searcher.completed_depth, searcher.best_score, searcher.pv, searcher.nodes)
+        except Exception as e:
+            print(f"Warning: ponder search failed: {e}")
+            result = (0, 0.0, [], 0)
+        conn.send(("result", job_id) + result)
+
+# ==================== PONDERER ====================
+
+class Ponderer:
+    """
+    Owns the ponder worker process of one agent.
+
+    Args:
+        search_kwargs: Arguments for the worker's AlphaBetaSearch (picklable)
+        stop_timeout: Seconds to wait for the worker to hand back its result
+    """
+
+    def __init__(self, search_kwargs: Optional[Dict[str, Any]] = None, stop_timeout: float = 1.0):
+        ctx = multiprocessing.get_context()
+        self._conn, child = ctx.Pipe()
+        self._active = ctx.Value("i", 0, lock=False)   # id of the job the worker may run, 0 for none
+        self._proc = ctx.Process(target=_ponder_worker, args=(child, self._active, search_kwargs or {}), daemon=True)
+        self._proc.start()
+        child.close()
+        self.stop_timeout = stop_timeout
+        self._job = 0
+        self._pending: Optional[Tuple[int, int, Dict[str, Any]]] = None   # (job id, position hash, predicted reply)
+        self.hits = 0
+        self.misses = 0
+        self.last_result: Optional[Tuple[int, float, List[Dict[str, Any]], int]] = None
+
+    def start(self, board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+              predicted_reply: Dict[str, Any], time_limit: float) -> None:
+        """
+        Start pondering. board is the position after our move and the predicted
+        reply, with player (us) to move; it is sent to the worker, not kept.
+        """
+        self._finish()
+        self._job += 1
+        self._active.value = self._job
+        self._conn.send(("search", self._job, board, player, rows, cols, list(score_cols), time_limit))
+        self._pending = (self._job, position_hash(board, rows, cols), predicted_reply)
+
+    def notify(self, move: Dict[str, Any]) -> None:
+        """The opponent played move: stop a ponder that predicted something else."""
+        if self._pending is not None and not same_move(move, self._pending[2]):
+            self._active.value = 0
+
+    def take(self, board: List[List[Any]], rows: int, cols: int) -> Optional[Prior]:
+        """
+        Stop pondering and return (depth, score, pv) if the worker pondered this
+        exact position, otherwise None.
+        """
+        pending = self._pending
+        result = self._finish()
+        if pending is None:
+            return None
+        if result is None or position_hash(board, rows, cols) != pending[1]:
+            self.misses += 1
+            return None
+        self.hits += 1
+        depth, score, pv, _ = result
+        return (depth, score, pv) if depth > 0 and pv else None
+
+    def close(self) -> None:
+        """Stop the worker process."""
+        if self._proc is None:
+            return
+        self._finish()
+        try:
+            self._conn.send(("quit",))
+        except (OSError, BrokenPipeError):
+            pass
+        self._proc.join(timeout=self.stop_timeout)
+        if self._proc.is_alive():
+            self._proc.terminate()
+        self._conn.close()
+        self._proc = None
+
+    # ---------- internals ----------
+
+    def _finish(self) -> Optional[Tuple[int, float, List[Dict[str, Any]], int]]:
+        """Stop the pending job (if any) and collect its result."""
+        if self._pending is None:
+            return None
+        job_id = self._pending[0]
+        self._pending = None
+        self._active.value = 0
+        deadline = time.perf_counter() + self.stop_timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or not self._conn.poll(remaining):
+                print("Warning: ponder worker did not stop in time")
+                return None
+            msg = self._conn.recv()
+            if msg[0] == "result" and msg[1] == job_id:
+                self.last_result = msg[2:]
+                return self.last_result
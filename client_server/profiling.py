@@ -0,0 +1,216 @@
+"""
+River and Stones Game - Scoped Profiling
+
+Profiles a match only while it is inside the calls that matter:
+- agent choose() (everything an agent does to pick a move)
+- the engine's validate_and_apply_move, generate_all_moves and
+  flow_destinations (also when called outside an agent, e.g. by scoring or
+  adjudication)
+
+Two modes:
+- "cprofile": deterministic cProfile, enabled on entering the scope and
+  disabled on leaving it. Writes PREFIX.prof (for pstats / snakeviz) and a
+  per-function report PREFIX.txt.
+- "sample": a SIGPROF sampling profiler (a sampling thread where setitimer is
+  not available, or for scoped calls on other threads, e.g. the GUI's agent
+  worker) with much lower overhead. Writes PREFIX.txt with self/total
+  samples per function and PREFIX.collapsed, one "frame;frame;frame count"
+  line per stack, which flamegraph.pl, speedscope and inferno read directly.
+
+    python gameEngine.py --mode aivai --circle student --nogui --profile sample --profile-out prof
+"""
+
+import os
+import sys
+import time
+import signal
+import threading
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+ENGINE_SCOPE = ("validate_and_apply_move", "generate_all_moves", "flow_destinations")
+
+MODES = ("cprofile", "sample")
+
+class ScopedProfiler:
+    """
+    Profiler that only records inside scoped calls.
+
+    Args:
+        mode: "cprofile" or "sample"
+        interval: Sampling interval in seconds (sample mode)
+    """
+
+    def __init__(self, mode: str = "cprofile", interval: float = 0.001):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profile mode: {mode}. Available: {', '.join(MODES)}")
+        self.mode = mode
+        self.interval = interval
+        self.depth = 0                  # nesting depth of scoped calls in progress
+        self.scoped_seconds = 0.0
+        self.stacks: Dict[Tuple[str, ...], int] = {}
+        self._profile = None
+        self._entered = 0.0
+        self._patched: List[Tuple[Any, str, Any]] = []
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._thread_id = threading.get_ident()   # thread of the scoped call in progress
+        self._signals = False
+        self._scoped_code = self.wrap(len).__code__   # shared by every wrapper, marks scope entry in stacks
+        if mode == "cprofile":
+            import cProfile
+            self._profile = cProfile.Profile()
+
+    def start(self, engine=None) -> None:
+        """Scope the engine functions (module gameEngine by default) and start sampling."""
+        if engine is None:
+            import gameEngine as engine
+        for name in ENGINE_SCOPE:
+            self._patch(engine, name)
+        if self.mode == "sample":
+            if hasattr(signal, "setitimer") and threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGPROF, self._on_signal)
+                signal.setitimer(signal.ITIMER_PROF, self.interval, self.interval)
+                self._signals = True
+            else:
+                self._start_sampler()
+
+    def instrument_agents(self, *agents) -> None:
+        """Scope the choose() of each agent (None entries, i.e. humans, are skipped)."""
+        for agent in agents:
+            if agent is not None:
+                agent.choose = self.wrap(agent.choose)
+
+    def wrap(self, fn: Callable) -> Callable:
+        """fn, profiled while it runs."""
+        profiler = self
+
+        def _scoped_call(*args, **kwargs):
+            profiler._enter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                profiler._exit()
+
+        _scoped_call.__wrapped__ = fn
+        _scoped_call.__name__ = getattr(fn, "__name__", "scoped")
+        return _scoped_call
+
+    def stop(self) -> None:
+        """Stop sampling and restore the engine functions."""
+        if self.mode == "sample":
+            if self._sampler is not None:
+                self._stop.set()
+                self._sampler.join()
+                self._sampler = None
+            if self._signals:
+                signal.setitimer(signal.ITIMER_PROF, 0, 0)
+                signal.signal(signal.SIGPROF, signal.SIG_DFL)
+                self._signals = False
+        for module, name, original in reversed(self._patched):
+            setattr(module, name, original)
+        self._patched.clear()
+
+    def write(self, prefix: str, counters: Optional[str] = None) -> List[str]:
+        """Write the reports for this mode (see module docstring); counters text is appended to PREFIX.txt."""
+        paths = []
+        report = prefix + ".txt"
+        with open(report, "w") as fh:
+            fh.write(f"Scoped profile ({self.mode}), {self.scoped_seconds:.3f}s inside scoped calls\n\n")
+            if self.mode == "cprofile":
+                import pstats
+                self._profile.dump_stats(prefix + ".prof")
+                paths.append(prefix + ".prof")
+                stats = pstats.Stats(self._profile, stream=fh)
+                stats.sort_stats("cumulative").print_stats(40)
+                stats.sort_stats("tottime").print_stats(40)
+            else:
+                fh.write(self.function_report())
+                with open(prefix + ".collapsed", "w") as out:
+                    out.write(self.collapsed())
+                paths.append(prefix + ".collapsed")
+            if counters:
+                fh.write("\n" + counters + "\n")
+        paths.insert(0, report)
+        return paths
+
+    def finish(self, prefix: str, counters: Optional[str] = None) -> List[str]:
+        self.stop()
+        return self.write(prefix, counters)
+
+    def collapsed(self) -> str:
+        """Sampled stacks in collapsed (folded) format, root first."""
+        return "".join(f"{';'.join(stack)} {count}\n"
+                       for stack, count in sorted(self.stacks.items(), key=lambda item: -item[1]))
+
+    def function_report(self, top: int = 40) -> str:
+        """Self and total (inclusive) samples per function."""
+        total = sum(self.stacks.values())
+        own: Dict[str, int] = {}
+        inclusive: Dict[str, int] = {}
+        for stack, count in self.stacks.items():
+            own[stack[-1]] = own.get(stack[-1], 0) + count
+            for frame in set(stack):
+                inclusive[frame] = inclusive.get(frame, 0) + count
+        lines = [f"{total} samples every {self.interval * 1000:.1f} ms",
+                 f"{'self':>8s} {'self%':>6s} {'total':>8s} {'total%':>6s}  function"]
+        for frame, count in sorted(own.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"{count:8d} {100.0 * count / max(1, total):5.1f}% {inclusive[frame]:8d} "
+                         f"{100.0 * inclusive[frame] / max(1, total):5.1f}%  {frame}")
+        return "\n".join(lines) + "\n"
+
+    # ---------- internals ----------
+
+    def _patch(self, module, name: str) -> None:
+        original = getattr(module, name)
+        self._patched.append((module, name, original))
+        setattr(module, name, self.wrap(original))
+
+    def _enter(self) -> None:
+        self.depth += 1
+        if self.depth == 1:
+            self._entered = time.perf_counter()
+            self._thread_id = threading.get_ident()
+            # SIGPROF only interrupts the main thread: sample other threads (the GUI runs
+            # agents on a worker) from a sampling thread
+            if self.mode == "sample" and self._sampler is None and threading.current_thread() is not threading.main_thread():
+                self._start_sampler()
+            if self._profile is not None:
+                self._profile.enable()
+
+    def _exit(self) -> None:
+        self.depth -= 1
+        if self.depth == 0:
+            if self._profile is not None:
+                self._profile.disable()
+            self.scoped_seconds += time.perf_counter() - self._entered
+
+    def _on_signal(self, signum, frame) -> None:
+        if self.depth > 0 and self._thread_id == threading.get_ident():
+            self._record(frame)
+
+    def _start_sampler(self) -> None:
+        self._sampler = threading.Thread(target=self._sample_loop, daemon=True)
+        self._sampler.start()
+
+    def _sample_loop(self) -> None:
+        main = threading.main_thread().ident
+        while not self._stop.wait(self.interval):
+            if self.depth > 0 and not (self._signals and self._thread_id == main):
+                frame = sys._current_frames().get(self._thread_id)
+                if frame is not None:
+                    self._record(frame)
+
+    def _record(self, frame) -> None:
+        """Add the stack of frame, up to the outermost scoped call, to the collapsed stacks."""
+        stack = []
+        outermost = 0
+        while frame is not None:
+            code = frame.f_code
+            if code is self._scoped_code:
+                outermost = len(stack)
+            else:
+                stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+            frame = frame.f_back
+        stack = tuple(reversed(stack[:outermost] or stack))
+        if stack:
+            self.stacks[stack] = self.stacks.get(stack, 0) + 1
@@ -0,0 +1,389 @@
+"""
+River and Stones Game - Alpha-Beta Search
+
+Reusable game-tree search for Python agents:
+- Negamax alpha-beta over the engine's legal move generator
+- Iterative deepening with the previous principal variation searched first
+- Principal-variation search (null-window probes for non-PV moves)
+- Aspiration windows around the previous iteration's score
+- Soft/hard per-move deadlines from timeman.TimeManager
+- Staged lazy move generation (see movegen.py): interior nodes try the PV move,
+  killers and counter move, then scoring moves and pushes, before paying for
+  river-flow expansion
+- Killer, history and counter-move heuristics (see ordering.py)
+- Optional batched evaluation of frontier nodes (see features.py): all children
+  of a depth-1 node are expanded and scored in one vectorized call
+
+Moves are made and unmade in place on the board passed in, so no board copies
+are created during search. The board is always restored before returning, even
+when the time budget runs out in the middle of an iteration.
+"""
+
+import time
+import inspect
+import functools
+import numpy as np
+from typing import List, Dict, Any, Optional, Tuple, Callable
+
+from gameEngine import validate_and_apply_move, generate_legal_moves, check_win, opponent, PieceIndex
+from student_agent import basic_evaluate_board
+from timeman import TimeManager
+from movegen import staged_moves
+from ordering import MoveOrdering
+
+# Evaluator signature: (board, player, rows, cols, score_cols) -> score from player's point of view.
+# Evaluators with a `pieces` keyword are passed the search's PieceIndex of the board.
+Evaluator = Callable[[List[List[Any]], str, int, int, List[int]], float]
+
+WIN_SCORE = 1_000_000.0
+INFINITY = float("inf")
+
+# ==================== IN-PLACE MAKE / UNMAKE ====================
+
+def make_move(board: List[List[Any]], move: Dict[str, Any], player: str,
+              rows: int, cols: int, score_cols: List[int],
+              trusted: bool = False, pieces: Optional[PieceIndex] = None) -> Optional[List[Tuple[int, int, Any, Any, Any]]]:
+    """
+    Validate and apply a move in place. trusted=True skips validation and is only for
+    moves generated for this exact board (see validate_and_apply_move). A PieceIndex of
+    the board passed as pieces is updated with it (pass the same index to unmake_move).
+
+    Returns:
+        An undo record for unmake_move, or None if the move is illegal (the board is unchanged).
+    """
+    undo = []
+    for key in ("from", "to", "pushed_to"):
+        pos = move.get(key)
+        if not pos:
+            continue
+        x, y = int(pos[0]), int(pos[1])
+        if 0 <= x < cols and 0 <= y < rows:
+            piece = board[y][x]
+            undo.append((x, y, piece,
+                         piece.side if piece else None,
+                         piece.orientation if piece else None))
+    ok, _ = validate_and_apply_move(board, move, player, rows, cols, score_cols, trusted, pieces=pieces)
+    if not ok:
+        return None
+    return undo
+
+def unmake_move(board: List[List[Any]], undo: List[Tuple[int, int, Any, Any, Any]],
+                pieces: Optional[PieceIndex] = None) -> None:
+    """Restore every cell (and piece state) touched by make_move, and pieces if given."""
+    for x, y, piece, side, orientation in undo:
+        board[y][x] = piece
+        if piece is not None:
+            piece.side = side
+            piece.orientation = orientation
+    if pieces is not None:
+        pieces.update(board, [(x, y) for x, y, _, _, _ in undo])
+
+def same_move(a: Optional[Dict[str, Any]], b: Optional[Dict[str, Any]]) -> bool:
+    """Compare two move dicts on the fields the engine reads."""
+    if a is None or b is None:
+        return False
+    for key in ("action", "from", "to", "pushed_to", "orientation"):
+        va, vb = a.get(key), b.get(key)
+        if va is not None and not isinstance(va, str):
+            va = [int(v) for v in va]
+        if vb is not None and not isinstance(vb, str):
+            vb = [int(v) for v in vb]
+        if va != vb:
+            return False
+    return True
+
+def _accepts_pieces(evaluate: Callable) -> bool:
+    """True if evaluate takes a `pieces` keyword (a PieceIndex of the board)."""
+    try:
+        return "pieces" in inspect.signature(evaluate).parameters
+    except (TypeError, ValueError):
+        return False
+
+class SearchTimeout(Exception):
+    """Raised inside the search when the time budget is exhausted."""
+
+# ==================== SEARCH ====================
+
+class AlphaBetaSearch:
+    """
+    Iterative-deepening negamax with PVS and aspiration windows.
+
+    Args:
+        evaluate: Static evaluator, called for the side to move at leaf nodes
+        max_depth: Upper bound on the iterative-deepening depth
+        aspiration: Half-width of the aspiration window around the previous score
+        timer: TimeManager used by best_move (a default one is created)
+        batch_weights: features.py weights function equivalent to evaluate; when given,
+            frontier nodes score all their children with one batched call
+        staged: Generate interior-node moves lazily with movegen.staged_moves; when False,
+            the full legal move list is built with the PV move moved to the front
+        ordering: Use killer, history and counter-move tables (kept across searches)
+    """
+
+    def __init__(self, evaluate: Evaluator = basic_evaluate_board, max_depth: int = 32,
+                 aspiration: float = 50.0, timer: Optional[TimeManager] = None,
+                 batch_weights: Optional[Callable] = None, staged: bool = True, ordering: bool = True):
+        self.evaluate = evaluate
+        self._evaluate_takes_pieces = _accepts_pieces(evaluate)
+        self.staged = staged
+        self.use_ordering = ordering
+        self.ordering: Optional[MoveOrdering] = None
+        self.batch_weights = batch_weights
+        self._batch = None
+        self._stop = None
+        self.max_depth = max_depth
+        self.aspiration = aspiration
+        self.timer = timer or TimeManager()
+        self._timer = self.timer
+        self.nodes = 0
+        self.completed_depth = 0
+        self.best_score = 0.0
+        self.pv: List[Dict[str, Any]] = []
+
+
+    def search(self, board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+               time_limit: float, max_depth: Optional[int] = None,
+               root_moves: Optional[List[Dict[str, Any]]] = None,
+               stop: Optional[Callable[[], bool]] = None,
+               prior: Optional[Tuple[int, float, List[Dict[str, Any]]]] = None,
+               timer: Optional[TimeManager] = None) -> Optional[Dict[str, Any]]:
+        """
+        Search the position for player and return the best move found within time_limit seconds.
+        With a started timer, time_limit is ignored: no iteration starts after its soft
+        limit and the search aborts at its hard limit.
+        root_moves restricts the moves considered at the root (all legal moves by default).
+        stop is polled with the clock and ends the search early when it returns True.
+        prior is a (depth, score, pv) result already computed for this exact position
+        (e.g. by pondering); iterative deepening then resumes at depth + 1.
+
+        Returns:
+            The best move, or None if the player has no legal move
+        """
+        self._board, self._rows, self._cols, self._score_cols = board, rows, cols, score_cols
+        self._pieces = PieceIndex(board)
+        self._leaf = (functools.partial(self.evaluate, pieces=self._pieces) if self._evaluate_takes_pieces
+                      else self.evaluate)
+        if self.batch_weights is not None:
+            from features import get_batch_evaluator  # features imports this module
+            self._batch = get_batch_evaluator(rows, cols, score_cols, self.batch_weights)
+        self._timer = timer if timer is not None else TimeManager.fixed(time_limit)
+        self._stop = stop
+        self._ordering = None
+        if self.use_ordering:
+            if self.ordering is None or (self.ordering.rows, self.ordering.cols) != (rows, cols):
+                self.ordering = MoveOrdering(rows, cols)
+            else:
+                self.ordering.new_search()
+            self._ordering = self.ordering
+        self._line: List[Dict[str, Any]] = []
+        self.nodes = 0
+        self.completed_depth = 0
+        self._pv_table: List[List[Dict[str, Any]]] = []
+        prev_pv: List[Dict[str, Any]] = []
+
+        self._root_trusted = root_moves is None
+        if root_moves is None:
+            root_moves = generate_legal_moves(board, player, rows, cols, score_cols, pieces=self._pieces)
+        if not root_moves:
+            return None
+        best_move = root_moves[0]
+        score = 0.0
+        limit = min(self.max_depth, max_depth) if max_depth else self.max_depth
+        first_depth = 1
+        if prior is not None and prior[0] > 0 and prior[2] and any(same_move(prior[2][0], m) for m in root_moves):
+            self.completed_depth, score, prev_pv = prior[0], prior[1], list(prior[2])
+            self.best_score, self.pv = score, prev_pv
+            best_move = prev_pv[0]
+            first_depth = prior[0] + 1
+        if self._timer.hard_limit <= 0:
+            return best_move   # no time left to search: play instantly
+
+        for depth in range(first_depth, limit + 1):
+            if depth > first_depth and not self._timer.can_deepen():
+                break
+            self._prev_pv = prev_pv
+            try:
+                if depth == 1:
+                    score = self._root(root_moves, depth, -INFINITY, INFINITY, player)
+                else:
+                    alpha, beta = score - self.aspiration, score + self.aspiration
+                    while True:
+                        score = self._root(root_moves, depth, alpha, beta, player)
+                        if score <= alpha:
+                            alpha = -INFINITY
+                        elif score >= beta:
+                            beta = INFINITY
+                        else:
+                            break
+            except SearchTimeout:
+                # The PV move is searched first, so a move that replaced it in the
+                # unfinished iteration was proven better and can be used.
+                if self._root_best is not None and self._root_first_done:
+                    best_move = self._root_best
+                break
+            prev_pv = self._pv_table[0][:] if self._pv_table else [self._root_best]
+            best_move = prev_pv[0]
+            self.best_score = score
+            self.completed_depth = depth
+            self.pv = prev_pv
+            self._timer.iteration_done()
+            if abs(score) >= WIN_SCORE - 1000:
+                break
+        return best_move
+
+    def best_move(self, board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                  current_player_time: float, opponent_time: float,
+                  prior: Optional[Tuple[int, float, List[Dict[str, Any]]]] = None) -> Optional[Dict[str, Any]]:
+        """Search with deadlines set by self.timer from the clocks the engine passes to choose()."""
+        moves = self.timer.start_for_position(board, player, rows, cols, score_cols,
+                                              current_player_time, opponent_time)
+        return self.search(board, player, rows, cols, score_cols, self.timer.hard_limit,
+                           root_moves=moves, prior=prior, timer=self.timer)
+
+    # ---------- internals ----------
+
+    def _check_time(self) -> None:
+        if self._timer.should_stop() or (self._stop is not None and self._stop()):
+            raise SearchTimeout()
+
+    def _order(self, moves: List[Dict[str, Any]], ply: int) -> List[Dict[str, Any]]:
+        """Put the previous iteration's PV move for this ply first."""
+        if ply < len(self._prev_pv):
+            pv_move = self._prev_pv[ply]
+            for i, m in enumerate(moves):
+                if same_move(m, pv_move):
+                    if i:
+                        moves = [m] + moves[:i] + moves[i + 1:]
+                    break
+        return moves
+
+    def _ensure_pv_ply(self, ply: int) -> None:
+        while len(self._pv_table) <= ply:
+            self._pv_table.append([])
+
+    def _root(self, moves: List[Dict[str, Any]], depth: int, alpha: float, beta: float, player: str) -> float:
+        self._root_best = None
+        self._root_first_done = False
+        self._ensure_pv_ply(0)
+        ordered = self._order(moves, 0)
+        best = -INFINITY
+        first = True
+        for move in ordered:
+            score = self._child(move, depth, alpha, beta, player, 0, first, self._root_trusted)
+            if score is None:
+                continue
+            if first:
+                self._root_first_done = True
+            first = False
+            if score > best:
+                best = score
+                self._root_best = move
+                self._pv_table[0] = [move] + self._child_pv(1)
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                break
+        return best
+
+    def _child_pv(self, ply: int) -> List[Dict[str, Any]]:
+        return self._pv_table[ply][:] if ply < len(self._pv_table) else []
+
+    def _child(self, move: Dict[str, Any], depth: int, alpha: float, beta: float,
+               side: str, ply: int, first: bool, trusted: bool = True) -> Optional[float]:
+        """
+        Make move, search the child with PVS windows, unmake. None if the move is illegal.
+        Moves from the node's own generator are trusted; only caller-supplied root moves are checked.
+        """
+        board, pieces = self._board, self._pieces
+        undo = make_move(board, move, side, self._rows, self._cols, self._score_cols, trusted, pieces)
+        if undo is None:
+            return None
+        line = self._line
+        del line[ply:]
+        line.append(move)
+        try:
+            opp = opponent(side)
+            if first:
+                return -self._negamax(depth - 1, -beta, -alpha, opp, ply + 1)
+            score = -self._negamax(depth - 1, -alpha - 1e-6, -alpha, opp, ply + 1)
+            if alpha < score < beta:
+                score = -self._negamax(depth - 1, -beta, -alpha, opp, ply + 1)
+            return score
+        finally:
+            unmake_move(board, undo, pieces)
+
+    def _negamax(self, depth: int, alpha: float, beta: float, side: str, ply: int) -> float:
+        self.nodes += 1
+        if (self.nodes & 63) == 0:
+            self._check_time()
+        self._ensure_pv_ply(ply)
+        self._pv_table[ply] = []
+
+        board, rows, cols, score_cols = self._board, self._rows, self._cols, self._score_cols
+        pieces = self._pieces
+        winner = check_win(board, rows, cols, score_cols)
+        if winner:
+            return (WIN_SCORE - ply) if winner == side else -(WIN_SCORE - ply)
+        if depth <= 0:
+            return self._leaf(board, side, rows, cols, score_cols)
+
+        if depth == 1 and self._batch is not None:
+            moves = generate_legal_moves(board, side, rows, cols, score_cols, pieces=pieces)
+            if not moves:
+                return self._leaf(board, side, rows, cols, score_cols)
+            return self._frontier(moves, alpha, side, ply)
+        ordering = self._ordering
+        pv_move = self._prev_pv[ply] if ply < len(self._prev_pv) else None
+        previous = self._line[ply - 1] if 0 < ply <= len(self._line) else None
+        if self.staged:
+            if ordering is not None:
+                moves = staged_moves(board, side, rows, cols, score_cols, hash_move=pv_move,
+                                     priority=ordering.priority_moves(ply, previous), key=ordering.score,
+                                     pieces=pieces)
+            else:
+                moves = staged_moves(board, side, rows, cols, score_cols, hash_move=pv_move, pieces=pieces)
+        elif ordering is not None:
+            moves = ordering.order(generate_legal_moves(board, side, rows, cols, score_cols, pieces=pieces),
+                                   ply, previous, pv_move)
+        else:
+            moves = self._order(generate_legal_moves(board, side, rows, cols, score_cols, pieces=pieces), ply)
+
+        best = -INFINITY
+        first = True
+        for move in moves:
+            score = self._child(move, depth, alpha, beta, side, ply, first)
+            if score is None:
+                continue
+            first = False
+            if score > best:
+                best = score
+                if score > alpha:
+                    self._pv_table[ply] = [move] + self._child_pv(ply + 1)
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                if ordering is not None:
+                    ordering.cutoff(move, ply, depth, previous)
+                break
+            if ordering is not None:
+                ordering.searched(move)
+        if first:
+            return self._leaf(board, side, rows, cols, score_cols)
+        return best
+
+    def _frontier(self, moves: List[Dict[str, Any]], alpha: float, side: str, ply: int) -> float:
+        """Depth-1 node: score every child with one batched evaluation instead of recursing."""
+        board = self._board
+        opp = opponent(side)
+        child_scores, winners = self._batch.evaluate_children(board, moves, opp, self._pieces)
+        self.nodes += len(moves)
+        self._check_time()
+        # Same values _negamax gives the children, negated to this node's point of view
+        mate = WIN_SCORE - (ply + 1)
+        side_wins = 1 if side == "circle" else -1
+        scores = np.where(winners == side_wins, mate, np.where(winners == -side_wins, -mate, -child_scores))
+        i = int(np.argmax(scores))
+        best = float(scores[i])
+        if best > alpha:
+            self._pv_table[ply] = [moves[i]]
+        return best
@@ -16,7 +16,8 @@ You may add any helper methods and modify the evaluation function as needed.
 """
 
 import random
-import copy
+import threading
+from gameEngine import copy_board, GameState, PieceIndex, owned_cells, score_cols_for   # scoring columns follow --score-width
 from typing import List, Dict, Any, Optional, Tuple
 from abc import ABC, abstractmethod
 
@@ -27,12 +28,6 @@ def in_bounds(x: int, y: int, rows: int, cols: int) -> bool:
     """Check if coordinates are within board boundaries."""
     return 0 <= x < cols and 0 <= y < rows
 
-def score_cols_for(cols: int) -> List[int]:
-    """Get the column indices for scoring areas."""
-    w = 4
-    start = max(0, (cols - w) // 2)
-    return list(range(start, start + w))
-
 def top_score_row() -> int:
     """Get the row index for Circle's scoring area."""
     return 2
@@ -117,7 +112,8 @@ def get_valid_moves_for_piece(board, x: int, y: int, player: str, rows: int, col
     
     return moves
 
-def generate_all_moves(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int]) -> List[Dict[str, Any]]:
+def generate_all_moves(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                       pieces: Optional[PieceIndex] = None) -> List[Dict[str, Any]]:
     """
     Generate all legal moves for the current player.
     
@@ -126,18 +122,16 @@ def generate_all_moves(board: List[List[Any]], player: str, rows: int, cols: int
         player: Current player ("circle" or "square")
         rows, cols: Board dimensions
         score_cols: Scoring column indices
+        pieces: PieceIndex of board; its cells are used instead of scanning the board
     
     Returns:
         List of all valid move dictionaries
     """
     all_moves = []
     
-    for y in range(rows):
-        for x in range(cols):
-            piece = board[y][x]
-            if piece and piece.owner == player:
-                piece_moves = get_valid_moves_for_piece(board, x, y, player, rows, cols, score_cols)
-                all_moves.extend(piece_moves)
+    for x, y in owned_cells(board, player, rows, cols, pieces):
+        piece_moves = get_valid_moves_for_piece(board, x, y, player, rows, cols, score_cols)
+        all_moves.extend(piece_moves)
     
     return all_moves
 
@@ -160,12 +154,14 @@ def count_stones_in_scoring_area(board: List[List[Any]], player: str, rows: int,
     
     return count
 
-def basic_evaluate_board(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int]) -> float:
+def basic_evaluate_board(board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                         pieces: Optional[PieceIndex] = None) -> float:
     """
     Basic board evaluation function.
     
     Returns a score where higher values are better for the given player.
     Students can use this as a starting point and improve it.
+    pieces is an optional PieceIndex of the board; with it only the player's stones are visited.
     """
     score = 0.0
     opponent = get_opponent(player)
@@ -178,6 +174,11 @@ def basic_evaluate_board(board: List[List[Any]], player: str, rows: int, cols: i
     score -= opponent_scoring_stones * 100  
     
     # Count total pieces and positional factors
+    if pieces is not None:
+        # Same terms in the same (row-major) order as the scan below
+        for y in sorted(y for _, y in pieces.stones[player]):
+            score += (rows - y) * 0.1 if player == "circle" else y * 0.1
+        return score
     for y in range(rows):
         for x in range(cols):
             piece = board[y][x]
@@ -207,12 +208,12 @@ def simulate_move(board: List[List[Any]], move: Dict[str, Any], player: str, row
     # Import the game engine's move validation function
     try:
         from gameEngine import validate_and_apply_move
-        board_copy = copy.deepcopy(board)
+        board_copy = copy_board(board)
         success, message = validate_and_apply_move(board_copy, move, player, rows, cols, score_cols)
         return success, board_copy if success else message
     except ImportError:
         # Fallback to basic simulation if game engine not available
-        return True, copy.deepcopy(board)
+        return True, copy_board(board)
 
 # ==================== BASE AGENT CLASS ====================
 
@@ -247,8 +248,12 @@ class StudentAgent(BaseAgent):
     """
     Student Agent Implementation
     
-    TODO: Implement your AI agent for the River and Stones game.
-    The goal is to get 4 of your stones into the opponent's scoring area.
+    Plays from the shared opening book while in book. Near a win it first asks
+    the endgame threat solver (see endgame.py) for a forced win, then searches
+    with iterative-deepening alpha-beta (see search.py), using basic_evaluate_board
+    at the leaves and soft/hard per-move deadlines from timeman.TimeManager.
+    With ponder=True it keeps searching the predicted reply on the opponent's
+    clock (see ponder.py) and resumes from that work when the prediction hits.
     
     You have access to these utility functions:
     - generate_all_moves(): Get all legal moves for current player
@@ -257,9 +262,53 @@ class StudentAgent(BaseAgent):
     - count_stones_in_scoring_area(): Count stones in scoring positions
     """
     
-    def __init__(self, player: str):
+    def __init__(self, player: str, ponder: bool = False):
         super().__init__(player)
-        # TODO: Add any initialization you need
+        # Imported here so that importing this module stays cheap (see bench_startup.py)
+        from search import AlphaBetaSearch
+        from opening_book import load_book
+        from endgame import EndgameSolver
+        from features import basic_weights
+        # basic_weights is basic_evaluate_board as weight planes: frontier nodes are scored in batches
+        search_kwargs = dict(evaluate=basic_evaluate_board, batch_weights=basic_weights)
+        self.search = AlphaBetaSearch(**search_kwargs)
+        self.timer = self.search.timer   # per-move soft/hard deadlines
+        self.book = load_book()
+        self.endgame = EndgameSolver(max_depth=3)
+        self.endgame_share = 0.25   # fraction of the soft time limit given to the solver
+        self.ponderer = None
+        self.last_stats: Dict[str, Any] = {}   # nodes searched for the last move (see gameEngine.agent_stats)
+        self._interrupted = threading.Event()   # set by interrupt() from the GUI thread
+        self._searching = False
+        if ponder:
+            from ponder import Ponderer, available_cores
+            if available_cores() > 1:
+                self.ponderer = Ponderer(search_kwargs)
+            else:
+                print("Pondering needs a spare core; running without it.")
+    
+    def opponent_moved(self, move: Dict[str, Any]) -> None:
+        """Called by the engine with the opponent's move; stops a mispredicted ponder."""
+        if self.ponderer is not None:
+            self.ponderer.notify(move)
+    
+    def close(self) -> None:
+        """Release the ponder worker."""
+        if self.ponderer is not None:
+            self.ponderer.close()
+            self.ponderer = None
+    
+    def interrupt(self) -> None:
+        """Make a choose() running on another thread return the search's best move so far."""
+        self._interrupted.set()
+    
+    def progress(self) -> Optional[Dict[str, Any]]:
+        """Best move of the deepest completed iteration while the search runs (see gameEngine.MoveWorker)."""
+        search = self.search
+        pv = search.pv
+        if not self._searching or not search.completed_depth or not pv:
+            return None
+        return {"move": pv[0], "depth": search.completed_depth, "score": search.best_score, "nodes": search.nodes}
     
     def choose(self, board: List[List[Any]], rows: int, cols: int, score_cols: List[int], current_player_time: float, opponent_time: float) -> Optional[Dict[str, Any]]:
         """
@@ -269,17 +318,63 @@ class StudentAgent(BaseAgent):
             board: 2D list representing the game board
             rows, cols: Board dimensions  
             score_cols: Column indices for scoring areas
+            current_player_time: Remaining time for this player (in seconds)
+            opponent_time: Remaining time for the opponent (in seconds)
             
         Returns:
             Dictionary representing your chosen move
         """
-        moves = generate_all_moves(board, self.player, rows, cols, score_cols)
+        # One GameState for the whole turn: legal moves and scoring counts are computed once
+        state = GameState(board, rows, cols, score_cols, self.player,
+                          clocks={self.player: current_player_time, self.opponent: opponent_time})
+        # Started first so that everything below counts against this move's deadlines
+        legal_moves = self.timer.start_for_state(state, current_player_time, opponent_time)
+        prior = self.ponderer.take(board, rows, cols) if self.ponderer is not None else None
+        self.last_stats = {"nodes": 0}
+        self._interrupted.clear()
         
-        if not moves:
-            return None
+        if self.book is not None:
+            move = self.book.choose_move(board, self.player, rows, cols)
+            if move is not None and simulate_move(board, move, self.player, rows, cols, score_cols)[0]:
+                return move
         
-        # TODO: Replace random selection with your AI algorithm
-        return random.choice(moves)
+        if state.scoring_pieces(self.player) >= 2 and self.timer.hard_limit > 0:
+            from endgame import WIN
+            budget = self.timer.soft_limit * self.endgame_share
+            status, move, _ = self.endgame.solve(board, self.player, rows, cols, score_cols, budget)
+            self.last_stats["nodes"] += self.endgame.nodes
+            if status == WIN:
+                return move
+        
+        self._searching = True
+        try:
+            move = self.search.search(board, self.player, rows, cols, score_cols, self.timer.hard_limit,
+                                      root_moves=legal_moves, prior=prior, timer=self.timer,
+                                      stop=self._interrupted.is_set)
+        finally:
+            self._searching = False
+        self.last_stats["nodes"] += self.search.nodes
+        self.last_stats["depth"] = self.search.completed_depth
+        if move is not None:
+            if self.ponderer is not None:
+                self._start_pondering(board, move, rows, cols, score_cols, opponent_time)
+            return move
+        
+        return random.choice(legal_moves) if legal_moves else None
+
+    def _start_pondering(self, board: List[List[Any]], move: Dict[str, Any], rows: int, cols: int,
+                         score_cols: List[int], opponent_time: float) -> None:
+        """Ponder the position after move and the reply predicted by the search's principal variation."""
+        from search import make_move, same_move
+        pv = self.search.pv
+        if len(pv) < 2 or not same_move(pv[0], move):
+            return
+        scratch = copy_board(board)
+        if make_move(scratch, move, self.player, rows, cols, score_cols) is None:
+            return
+        if make_move(scratch, pv[1], self.opponent, rows, cols, score_cols) is None:
+            return
+        self.ponderer.start(scratch, self.player, rows, cols, score_cols, pv[1], opponent_time)
 
 # ==================== TESTING HELPERS ====================
 
@@ -1,8 +1,24 @@
+import os
 import build.student_agent_module as student_agent
+from gameEngine import score_cols_for, score_width, win_count   # scoring geometry follows --score-width
 from abc import ABC, abstractmethod
 from typing import List, Dict, Any, Optional
 
 
+def default_thread_count() -> int:
+    """Number of search threads: STUDENT_AGENT_THREADS if set, else the cores this process may use."""
+    env = os.environ.get("STUDENT_AGENT_THREADS")
+    if env:
+        return max(1, int(env))
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+def default_book_path() -> str:
+    """Opening book shared with the Python agents: RIVER_STONES_BOOK if set, else opening_book.bin beside this file."""
+    return os.environ.get("RIVER_STONES_BOOK",
+                          os.path.join(os.path.dirname(os.path.abspath(__file__)), "opening_book.bin"))
+
 def get_opponent(player: str) -> str:
     return "square" if player == "circle" else "circle"
 
@@ -10,12 +26,6 @@ def in_bounds(x: int, y: int, rows: int, cols: int) -> bool:
     """Check if coordinates are within board boundaries."""
     return 0 <= x < cols and 0 <= y < rows
 
-def score_cols_for(cols: int) -> List[int]:
-    """Get the column indices for scoring areas."""
-    w = 4
-    start = max(0, (cols - w) // 2)
-    return list(range(start, start + w))
-
 def top_score_row() -> int:
     """Get the row index for Circle's scoring area."""
     return 2
@@ -52,10 +62,13 @@ class BaseAgent(ABC):
         pass
 
 class StudentAgent(BaseAgent):
-    def __init__(self, player: str):
+    def __init__(self, player: str, threads: Optional[int] = None):
         super().__init__(player)
 
-        self.agent = student_agent.StudentAgent(player)
+        self.threads = threads if threads is not None else default_thread_count()
+        self.agent = student_agent.StudentAgent(player, self.threads)
+        book = default_book_path()
+        self.book_loaded = os.path.exists(book) and self.agent.load_opening_book(book, score_width(), win_count())
 
     def choose(self, game_state: dict,  rows: int, cols: int, score_cols: List[int], current_player_time: float, opponent_time: float) -> Optional[Dict[str, Any]]:
         #board = game_state["board"]
@@ -0,0 +1,279 @@
+"""
+River and Stones Game - Time Management
+
+Turns the clocks the engine passes to choose() into per-move deadlines:
+- soft limit: the time the move should take; iterative searches do not start
+  an iteration that is not expected to finish before it
+- hard limit: the most the move may take; searches abort at it
+
+The budget is the remaining time spread over the moves expected to remain
+(fewer as the game goes on, but never fewer than a share of the own moves left
+before the turn cap, since games can run to it), plus part of any lead on the
+opponent's clock, scaled up for complex positions (many legal moves, a scoring
+threat for either side) and down to almost nothing for forced moves. A reserve
+is never spent: a fixed part plus the per-move overhead (move generation,
+engine validation) of every move that may still have to be played. Below the
+reserve both limits are zero and the agent should play instantly.
+
+    timer = TimeManager()
+    moves = timer.start_for_position(board, player, rows, cols, score_cols,
+                                     current_player_time, opponent_time)
+    while timer.can_deepen():
+        ...   # one iteration, polling timer.should_stop() inside
+        timer.iteration_done()
+
+`python timeman.py` plays simulated games to the turn cap on a virtual clock
+and reports the lowest clock reached (a regression run for long games);
+`python timeman.py --game student student` plays a real headless game.
+"""
+
+import math
+import time
+import argparse
+from typing import List, Dict, Any, Optional, Callable
+
+from gameEngine import GameState, win_count
+
+def is_threat(board: List[List[Any]], rows: int, cols: int, score_cols: List[int], missing: int = 2) -> bool:
+    """True when either side is at most `missing` stones from winning."""
+    return state_is_threat(GameState(board, rows, cols, score_cols), missing)
+
+def state_is_threat(state: GameState, missing: int = 2) -> bool:
+    """is_threat on a GameState (uses its cached scoring counts)."""
+    return any(state.scoring_pieces(side) >= win_count() - missing for side in ("circle", "square"))
+
+class TimeManager:
+    """
+    Soft/hard per-move deadlines from the remaining clocks.
+
+    Args:
+        moves_to_go: Expected number of own moves left at the start of the game
+        min_moves_to_go: Floor for the expected number of moves left
+        reserve: Seconds of the clock never planned for
+        max_fraction: Largest share of the usable clock one move may take (hard limit)
+        hard_factor: Hard limit as a multiple of the soft limit
+        typical_moves: Legal move count of an average position
+        threat_factor: Soft limit multiplier when either side threatens to score
+        min_time: Smallest soft limit
+        deepen_fraction: Share of the soft limit after which no new search iteration
+            starts, while no iteration times are known to predict the next one from
+        max_plies: Turn cap of the game (gameEngine.Game's max_turns); the game is
+            budgeted as if it might last that long
+        cap_fraction: Share of the own moves left before the turn cap always budgeted for
+        move_overhead: Seconds charged per move outside the search (move generation,
+            engine validation), reserved for every own move left before the turn cap
+        growth: Expected time ratio of consecutive iterations until two were measured
+        clock: Time source (time.perf_counter; a virtual clock for simulations)
+    """
+
+    def __init__(self, moves_to_go: int = 60, min_moves_to_go: int = 20, reserve: float = 0.5,
+                 max_fraction: float = 0.25, hard_factor: float = 2.0, typical_moves: int = 60,
+                 threat_factor: float = 1.5, min_time: float = 0.01, deepen_fraction: float = 0.5,
+                 max_plies: int = 1000, cap_fraction: float = 0.25, move_overhead: float = 0.005,
+                 growth: float = 4.0, clock: Callable[[], float] = time.perf_counter):
+        self.moves_to_go = moves_to_go
+        self.min_moves_to_go = min_moves_to_go
+        self.reserve = reserve
+        self.max_fraction = max_fraction
+        self.hard_factor = hard_factor
+        self.typical_moves = typical_moves
+        self.threat_factor = threat_factor
+        self.min_time = min_time
+        self.deepen_fraction = deepen_fraction
+        self.max_plies = max_plies
+        self.cap_fraction = cap_fraction
+        self.move_overhead = move_overhead
+        self.growth = growth
+        self._clock = clock
+        self.moves_made = 0
+        self.soft_limit = 0.0
+        self.hard_limit = 0.0
+        self._iterations: List[float] = []   # elapsed() at the end of each completed iteration
+        self._start = clock()
+        self._soft_deadline = self._start
+        self._hard_deadline = self._start
+
+    @classmethod
+    def fixed(cls, seconds: float) -> "TimeManager":
+        """A timer with soft = hard = seconds, started now."""
+        timer = cls()
+        timer.start_fixed(seconds)
+        return timer
+
+    def start_fixed(self, seconds: float) -> None:
+        self._set(max(0.0, seconds), max(0.0, seconds))
+
+    def start(self, current_player_time: float, opponent_time: float, legal_moves: Optional[int] = None,
+              threat: bool = False) -> None:
+        """
+        Start timing a move.
+
+        Args:
+            current_player_time: Remaining time of the player to move (seconds)
+            opponent_time: Remaining time of the opponent (seconds)
+            legal_moves: Number of legal moves, if known
+            threat: True when either side is close to scoring
+        """
+        self.moves_made += 1
+        # Own moves still to play if the game runs to the turn cap, this one included
+        moves_to_cap = max(1, self.max_plies // 2 - self.moves_made + 1)
+        usable = current_player_time - self.reserve - self.move_overhead * moves_to_cap
+        if usable <= 0:
+            self._set(0.0, 0.0)   # inside the reserve: play instantly
+            return
+        if legal_moves is not None and legal_moves <= 1:
+            self._set(min(self.min_time, usable), min(self.min_time, usable))
+            return
+
+        expected = max(self.min_moves_to_go, self.moves_to_go - self.moves_made // 2,
+                       int(moves_to_cap * self.cap_fraction))
+        moves_left = max(1, min(moves_to_cap, expected))
+        soft = usable / moves_left
+        if current_player_time > opponent_time:
+            soft += (current_player_time - opponent_time) / (2 * moves_left)
+        if legal_moves:
+            soft *= min(1.5, max(0.6, math.sqrt(legal_moves / self.typical_moves)))
+        if threat:
+            soft *= self.threat_factor
+
+        hard = min(soft * self.hard_factor, usable * self.max_fraction)
+        soft = max(min(soft, hard), min(self.min_time, usable))
+        self._set(soft, max(hard, soft))
+
+    def start_for_position(self, board: List[List[Any]], player: str, rows: int, cols: int, score_cols: List[int],
+                           current_player_time: float, opponent_time: float) -> List[Dict[str, Any]]:
+        """
+        start() with the complexity measured on the position; returns the legal moves it
+        generated, with trusted-move tokens so that a search applying them does not validate
+        them again (Game itself ignores tokens and validates the move returned).
+        """
+        return self.start_for_state(GameState(board, rows, cols, score_cols, player),
+                                    current_player_time, opponent_time)
+
+    def start_for_state(self, state: GameState, current_player_time: float, opponent_time: float) -> List[Dict[str, Any]]:
+        """start_for_position on a GameState, whose cached legal moves and scoring counts it uses."""
+        moves = state.legal_moves()
+        self.start(current_player_time, opponent_time, legal_moves=len(moves), threat=state_is_threat(state))
+        return moves
+
+    def elapsed(self) -> float:
+        return self._clock() - self._start
+
+    def remaining(self) -> float:
+        """Seconds until the hard deadline."""
+        return self._hard_deadline - self._clock()
+
+    def should_stop(self) -> bool:
+        """True once the hard deadline has passed; cheap enough for inner search loops."""
+        return self._clock() >= self._hard_deadline
+
+    def soft_expired(self) -> bool:
+        """True once the soft deadline has passed: do not start new work."""
+        return self._clock() >= self._soft_deadline
+
+    def iteration_done(self) -> None:
+        """Record that an iterative-deepening iteration just completed (see can_deepen)."""
+        self._iterations.append(self.elapsed())
+
+    def can_deepen(self) -> bool:
+        """
+        True if another iterative-deepening iteration is expected to finish before the soft
+        limit: the last iteration's time times the growth between the last two.
+        """
+        elapsed, done = self.elapsed(), self._iterations
+        if not done:
+            return elapsed < self.soft_limit * self.deepen_fraction
+        last = done[-1] - (done[-2] if len(done) > 1 else 0.0)
+        before = (done[-2] - (done[-3] if len(done) > 2 else 0.0)) if len(done) > 1 else 0.0
+        # Iterations of a millisecond or less are too noisy to measure the growth
+        growth = max(1.0, last / before) if before > 1e-3 else self.growth
+        return elapsed + last * growth < self.soft_limit
+
+    # ---------- internals ----------
+
+    def _set(self, soft: float, hard: float) -> None:
+        self.soft_limit = soft
+        self.hard_limit = hard
+        self._iterations = []
+        self._start = self._clock()
+        self._soft_deadline = self._start + soft
+        self._hard_deadline = self._start + hard
+
+# ==================== LONG-GAME REGRESSION ====================
+
+class _VirtualClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+def simulate_game(time_per_player: float = 60.0, plies: int = 1000, overhead: float = 0.002,
+                  first_iteration: float = 0.002, branching: float = 5.0, legal_moves: int = 60,
+                  **timer_kwargs) -> Dict[str, Any]:
+    """
+    One side's clock over a game that runs to the turn cap, on a virtual clock: every move
+    pays `overhead` outside the search and searches iteratively, iteration d taking
+    first_iteration * branching**(d-1) seconds, until can_deepen() says no or the hard
+    deadline cuts an iteration short. Both sides are assumed to use the same time.
+
+    Returns:
+        {"flagged_at": own move that ran out of time or None, "lowest": lowest clock,
+         "first": mean seconds of the first 20 moves, "last": mean of the last 20}
+    """
+    clock = _VirtualClock()
+    timer = TimeManager(clock=clock, max_plies=plies, **timer_kwargs)
+    remaining, lowest, spent = time_per_player, time_per_player, []
+    for move in range(1, plies // 2 + 1):
+        started = clock.now
+        clock.now += overhead / 2   # before the timer starts (state, legal moves)
+        timer.start(remaining, remaining, legal_moves=legal_moves)
+        depth = 1
+        while timer.hard_limit > 0 and (depth == 1 or timer.can_deepen()):
+            cost = first_iteration * branching ** (depth - 1)
+            if timer.elapsed() + cost >= timer.hard_limit:
+                clock.now += timer.remaining()   # aborted at the hard deadline
+                break
+            clock.now += cost
+            timer.iteration_done()
+            depth += 1
+        clock.now += overhead / 2   # returning the move, engine validation
+        spent.append(clock.now - started)
+        remaining -= spent[-1]
+        lowest = min(lowest, remaining)
+        if remaining <= 0:
+            return {"flagged_at": move, "lowest": remaining, "first": sum(spent[:20]) / 20, "last": sum(spent[-20:]) / 20}
+    return {"flagged_at": None, "lowest": lowest, "first": sum(spent[:20]) / 20, "last": sum(spent[-20:]) / 20}
+
+def play_long_game(circle: str, square: str, time_per_player: float) -> Dict[str, Any]:
+    """A real headless game without early ends: result, plies played and each side's lowest clock."""
+    from gameEngine import Game, create_agents, close_agents, DEFAULT_ROWS, DEFAULT_COLS
+    agents = create_agents({"circle": "ai", "square": "ai"}, circle, square)
+    game = Game({"circle": agents[0], "square": agents[1]}, DEFAULT_ROWS, DEFAULT_COLS, time_per_player)
+    lowest = {"circle": time_per_player, "square": time_per_player}
+    reason = None
+    for event in game.play():
+        if event["type"] == "clock":
+            lowest[event["player"]] = min(lowest[event["player"]], event["timers"][event["player"]])
+        elif event["type"] in ("win", "timeout", "adjudicated", "turn_limit", "quit"):
+            reason = event["type"]
+    close_agents(*agents)
+    return {"result": reason, "winner": game.winner, "plies": game.turn, "lowest": lowest}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Long-game time management regression")
+    ap.add_argument("--game", nargs=2, metavar=("CIRCLE", "SQUARE"), help="Play a real headless game with these strategies")
+    ap.add_argument("--time", type=float, default=60.0, help="Clock of each player in seconds")
+    args = ap.parse_args()
+    if args.game:
+        print(play_long_game(args.game[0], args.game[1], args.time))
+    else:
+        failed = False
+        for overhead in (0.002, 0.005, 0.01):
+            for branching in (3.0, 5.0, 8.0):
+                r = simulate_game(args.time, overhead=overhead, branching=branching)
+                failed |= r["flagged_at"] is not None
+                print(f"overhead {overhead * 1000:4.0f} ms  branching {branching:3.0f}:  "
+                      + (f"FLAGGED at own move {r['flagged_at']}" if r["flagged_at"] else f"lowest clock {r['lowest']:6.2f}s")
+                      + f"   first moves {r['first']:.3f}s  last moves {r['last']:.3f}s")
+        print("FAIL" if failed else "ok: no time losses up to the turn cap")